@@ -0,0 +1,116 @@
+"""
+Reference data cache
+====================
+Classes, sections, sessions and subjects change a few times a year but are
+needed by almost every page (dropdowns, selected filter labels). This module
+keeps one snapshot of all four tables, plus id -> object maps, in process
+memory, one per school (``myproject.tenancy``).
+
+Coherence between workers uses a version token in Django's cache
+(``CACHES['default']``): saving or deleting any of the four models bumps the
+token (see ``academic.signals``) and every process reloads its snapshot the
+next time it sees a different token. With the default per-process LocMemCache
+other workers cannot see the bump, so snapshots also expire after
+``REFERENCE_CACHE_TIMEOUT`` seconds; configure a shared cache backend to make
+invalidation immediate everywhere.
+"""
+
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+
+from myproject.routers import use_primary
+from myproject.tenancy.context import all_tenants, current_tenant, use_tenant
+
+from .models import Class, Section, Session, Subject
+
+
+VERSION_KEY = 'academic:reference-version'
+DEFAULT_TIMEOUT = 300
+
+
+class ReferenceData:
+    """One consistent snapshot of the academic reference tables."""
+
+    def __init__(self, version):
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+        self.classes = list(Class.objects.order_by('class_code'))
+        self.sections = list(Section.objects.order_by('name'))
+        self.sessions = list(Session.objects.order_by('-start_date'))
+        self.subjects = list(Subject.objects.order_by('name'))
+
+        self.class_map = {obj.id: obj for obj in self.classes}
+        self.section_map = {obj.id: obj for obj in self.sections}
+        self.session_map = {obj.id: obj for obj in self.sessions}
+        self.subject_map = {obj.id: obj for obj in self.subjects}
+
+    def get_class(self, pk):
+        return self.class_map.get(pk) if pk else None
+
+    def get_section(self, pk):
+        return self.section_map.get(pk) if pk else None
+
+    def get_session(self, pk):
+        return self.session_map.get(pk) if pk else None
+
+    def get_subject(self, pk):
+        return self.subject_map.get(pk) if pk else None
+
+
+_snapshots = {}   # school slug (None: the default school) -> ReferenceData
+_lock = threading.Lock()
+
+
+def _timeout():
+    return getattr(settings, 'REFERENCE_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def _current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def get_reference_data():
+    """Return the current snapshot, reloading it if it is stale."""
+    tenant = current_tenant()
+    version = _current_version()
+    snapshot = _snapshots.get(tenant)
+    if (
+        snapshot is not None
+        and snapshot.version == version
+        and time.monotonic() - snapshot.loaded_at < _timeout()
+    ):
+        return snapshot
+
+    with _lock:
+        snapshot = _snapshots.get(tenant)
+        if snapshot is None or snapshot.version != version or time.monotonic() - snapshot.loaded_at >= _timeout():
+            with use_primary():
+                snapshot = ReferenceData(version)
+            _snapshots[tenant] = snapshot
+    return snapshot
+
+
+def invalidate_reference_data():
+    """Drop this process's snapshot and tell every other worker to reload."""
+    cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    _snapshots.pop(current_tenant(), None)
+
+
+def warm_reference_data():
+    """Load every school's snapshot ahead of the first request (no-op before migrations)."""
+    for tenant in all_tenants():
+        try:
+            with use_tenant(tenant):
+                get_reference_data()
+        except DatabaseError:
+            pass
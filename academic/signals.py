@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_reference_data
+from .models import Class, Section, Session, Subject
+
+
+@receiver([post_save, post_delete], sender=Class)
+@receiver([post_save, post_delete], sender=Section)
+@receiver([post_save, post_delete], sender=Session)
+@receiver([post_save, post_delete], sender=Subject)
+def reference_data_changed(sender, **kwargs):
+    # Bump after commit so other workers never reload pre-commit data under the new version.
+    transaction.on_commit(invalidate_reference_data)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User
+from .models import User, IdSequence
 
 
 @admin.register(User)
@@ -50,3 +50,10 @@ class CustomUserAdmin(UserAdmin):
             ),
         }),
     )
+
+
+@admin.register(IdSequence)
+class IdSequenceAdmin(admin.ModelAdmin):
+    list_display = ("key", "last_value", "updated_at")
+    search_fields = ("key",)
+    readonly_fields = ("updated_at",)
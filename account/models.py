@@ -1,6 +1,5 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
-from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -61,37 +60,36 @@ class User(AbstractUser):
     def save(self, *args, **kwargs):
         # শুধু প্রথমবার তৈরি হওয়ার সময়েই user_id generate হবে
         if not self.user_id and self.user_type:
-            now = timezone.now()
-            year = now.strftime("%y")   # 2025 -> "25"
-            month = now.strftime("%m")  # 03 -> "03"
-
-            # Role অনুযায়ী digit map
-            role_map = {
-                "Admin": "99",
-                "Teacher": "88",
-            }
-            role_digit = role_map.get(self.user_type, "0")
-
-            # Final prefix: YYMMR  (e.g. 25031, 25032, 25033)
-            prefix = f"{year}{month}{role_digit}"
-
-            # এই prefix দিয়ে শুরু হওয়া সর্বশেষ user খুঁজে বের করি
-            last = (
-                User.objects
-                .filter(user_id__startswith=prefix)
-                .order_by("-user_id")
-                .first()
-            )
-
-            if last and last.user_id and last.user_id[len(prefix):].isdigit():
-                counter = int(last.user_id[len(prefix):]) + 1
-            else:
-                counter = 1
+            from .sequences import allocate_user_ids
 
             # Final user_id: YYMMR + 4 digit (e.g. 250310001)
-            self.user_id = f"{prefix}{counter:04d}"
+            self.user_id = allocate_user_ids(self.user_type)[0]
 
         super().save(*args, **kwargs)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Password reset looks users up by email.
+            models.Index(fields=['email'], name='account_user_email_idx'),
+        ]
+
     def __str__(self):
         return f"{self.username} ({self.user_id})"
+
+
+class IdSequence(models.Model):
+    """
+    Per-prefix counter behind the generated IDs and usernames.
+
+    One row per key (e.g. "user_id:25039", "admission_no:ADM-2503").
+    """
+    key = models.CharField(max_length=50, unique=True)
+    last_value = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "ID Sequence"
+        verbose_name_plural = "ID Sequences"
+
+    def __str__(self):
+        return f"{self.key} = {self.last_value}"
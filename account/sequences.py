@@ -0,0 +1,160 @@
+"""
+ID sequences
+============
+Hands out the human-friendly IDs used across the project:
+
+    User.user_id              YYMMR####     (e.g. 2503990001)
+    StudentInfo.student_user_id  YYMMCC####  (e.g. 2503010001)
+    StudentInfo.admission_no  ADM-YYMM-####
+    generated usernames       admin1, teacher1, student1, ...
+
+Every prefix owns one IdSequence row. Allocation is a single
+``UPDATE ... SET last_value = last_value + n`` followed by a primary-key read,
+so it costs the same no matter how many users exist and two writers can never
+receive the same number. Passing ``count`` reserves a whole block at once for
+bulk inserts.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import IdSequence, User
+
+
+# Role digit used in User.user_id (YYMM + R)
+ROLE_DIGITS = {
+    "Admin": "99",
+    "Teacher": "88",
+}
+
+
+def _year_month(now=None):
+    now = now or timezone.now()
+    return now.strftime("%y%m")   # 2025-03 -> "2503"
+
+
+def _max_suffix(values, prefix, width=None):
+    """Largest numeric suffix among ``values`` that start with ``prefix``."""
+    highest = 0
+    for value in values:
+        if not value or not value.startswith(prefix):
+            continue
+        suffix = value[len(prefix):]
+        if not suffix.isdigit() or (width and len(suffix) != width):
+            continue
+        highest = max(highest, int(suffix))
+    return highest
+
+
+def reserve(key, count=1, seed=None):
+    """
+    Reserve ``count`` consecutive values for ``key`` and return them as a range.
+
+    ``seed`` is called only the first time a key is used, to continue numbering
+    from data that was created before the sequence row existed.
+    """
+    if count < 1:
+        raise ValueError("count must be at least 1.")
+
+    for _ in range(3):
+        with transaction.atomic():
+            updated = IdSequence.objects.filter(key=key).update(
+                last_value=F('last_value') + count,
+                updated_at=timezone.now(),
+            )
+            if updated:
+                last_value = IdSequence.objects.filter(key=key).values_list('last_value', flat=True).get()
+                return range(last_value - count + 1, last_value + 1)
+
+        start = seed() if seed else 0
+        try:
+            with transaction.atomic():
+                IdSequence.objects.create(key=key, last_value=start + count)
+            return range(start + 1, start + count + 1)
+        except IntegrityError:
+            # Another writer created the row first; bump it instead.
+            continue
+
+    raise RuntimeError(f"Could not reserve values for sequence '{key}'.")
+
+
+def peek(key, seed=None):
+    """Return the value the next ``reserve`` call would hand out, without reserving it."""
+    last_value = IdSequence.objects.filter(key=key).values_list('last_value', flat=True).first()
+    if last_value is None:
+        last_value = seed() if seed else 0
+    return last_value + 1
+
+
+# ============================================================================
+# ID FORMATS
+# ============================================================================
+
+def allocate_user_ids(user_type, count=1, now=None):
+    """User.user_id values: YYMM + role digit + 4 digit counter."""
+    prefix = f"{_year_month(now)}{ROLE_DIGITS.get(user_type, '0')}"
+
+    def seed():
+        values = User.objects.filter(user_id__startswith=prefix).values_list('user_id', flat=True)
+        return _max_suffix(values, prefix, width=4)
+
+    return [f"{prefix}{n:04d}" for n in reserve(f"user_id:{prefix}", count, seed)]
+
+
+def allocate_student_user_ids(class_code, count=1, now=None):
+    """StudentInfo.student_user_id values: YYMM + class code + 4 digit counter."""
+    from student.models import StudentInfo
+
+    prefix = f"{_year_month(now)}{class_code:02d}"
+
+    def seed():
+        values = StudentInfo.objects.filter(
+            student_user_id__startswith=prefix
+        ).values_list('student_user_id', flat=True)
+        return _max_suffix(values, prefix, width=4)
+
+    return [f"{prefix}{n:04d}" for n in reserve(f"student_user_id:{prefix}", count, seed)]
+
+
+def allocate_admission_nos(count=1, now=None):
+    """StudentInfo.admission_no values: ADM-YYMM-0001."""
+    from student.models import StudentInfo
+
+    prefix = f"ADM-{_year_month(now)}"
+
+    def seed():
+        values = StudentInfo.objects.filter(
+            admission_no__startswith=prefix
+        ).values_list('admission_no', flat=True)
+        return _max_suffix(values, f"{prefix}-")
+
+    return [f"{prefix}-{n:04d}" for n in reserve(f"admission_no:{prefix}", count, seed)]
+
+
+def _username_seed(base):
+    def seed():
+        values = User.objects.filter(username__startswith=base).values_list('username', flat=True)
+        return _max_suffix(values, base)
+    return seed
+
+
+def allocate_usernames(base, count=1):
+    """
+    Usernames of the form base1, base2, ... (e.g. student12).
+
+    Names that were already taken by hand are skipped, so the result always
+    holds ``count`` unused usernames.
+    """
+    usernames = []
+    while len(usernames) < count:
+        needed = count - len(usernames)
+        candidates = [f"{base}{n}" for n in reserve(f"username:{base}", needed, _username_seed(base))]
+        taken = set(User.objects.filter(username__in=candidates).values_list('username', flat=True))
+        usernames.extend(name for name in candidates if name not in taken)
+    return usernames
+
+
+def peek_username(base):
+    """Preview of the next generated username (not reserved)."""
+    return f"{base}{peek(f'username:{base}', _username_seed(base))}"
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import send_mail
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from administration.jobs import task
+
+
+User = get_user_model()
+
+
+@task(max_attempts=5)
+def send_password_reset_email(user_id, base_url):
+    """
+    E-mail a reset link to ``user_id``. The token is made here, not in the
+    request, so it never sits in the jobs table.
+    """
+    user = User.objects.filter(pk=user_id).first()
+    if user is None or not user.email:
+        return
+
+    token = default_token_generator.make_token(user)
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    reset_url = f"{base_url}/reset-password/{uid}/{token}/"
+
+    subject = 'Password Reset Request - Student Management System'
+    message = f"""
+Hello {user.first_name} {user.last_name},
+
+You requested to reset your password for your Student Management System account.
+
+Please click the link below to reset your password:
+{reset_url}
+
+This link will expire in 24 hours.
+
+If you did not request this password reset, please ignore this email.
+
+User ID: {user.user_id}
+Username: {user.username}
+
+Best regards,
+Student Management System Team
+        """
+
+    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [user.email], fail_silently=False)
@@ -1,3 +1,99 @@
-from django.test import TestCase
+import threading
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from .models import IdSequence, User
+from .sequences import allocate_usernames, peek, peek_username, reserve
+
+
+class ReserveTests(TestCase):
+    def test_first_use_starts_after_seed(self):
+        self.assertEqual(list(reserve('test:a', 3, seed=lambda: 41)), [42, 43, 44])
+        self.assertEqual(IdSequence.objects.get(key='test:a').last_value, 44)
+
+    def test_consecutive_reservations_do_not_overlap(self):
+        first = reserve('test:b', 2)
+        second = reserve('test:b', 3)
+        self.assertEqual(list(first), [1, 2])
+        self.assertEqual(list(second), [3, 4, 5])
+
+    def test_seed_is_only_called_for_a_new_key(self):
+        calls = []
+
+        def seed():
+            calls.append(1)
+            return 10
+
+        reserve('test:c', seed=seed)
+        reserve('test:c', seed=seed)
+        self.assertEqual(len(calls), 1)
+
+    def test_lost_create_race_bumps_the_winner_row(self):
+        # The seed runs between the failed UPDATE and the INSERT; another
+        # writer creating the row right then makes the INSERT fail.
+        def seed():
+            IdSequence.objects.create(key='test:d', last_value=7)
+            return 0
+
+        self.assertEqual(list(reserve('test:d', 2, seed=seed)), [8, 9])
+        self.assertEqual(IdSequence.objects.get(key='test:d').last_value, 9)
+
+    def test_peek_does_not_reserve(self):
+        self.assertEqual(peek('test:e', seed=lambda: 4), 5)
+        self.assertEqual(peek('test:e', seed=lambda: 4), 5)
+        self.assertEqual(list(reserve('test:e', seed=lambda: 4)), [5])
+        self.assertEqual(peek('test:e'), 6)
+
+    def test_count_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            reserve('test:f', 0)
+
+
+class AllocateUsernamesTests(TestCase):
+    def test_continues_after_existing_usernames(self):
+        User.objects.create(username='student7')
+        self.assertEqual(peek_username('student'), 'student8')
+        self.assertEqual(allocate_usernames('student', 2), ['student8', 'student9'])
+
+    def test_skips_names_taken_by_hand(self):
+        allocate_usernames('teacher')
+        User.objects.create(username='teacher2')
+        User.objects.create(username='teacher3')
+        self.assertEqual(allocate_usernames('teacher', 2), ['teacher4', 'teacher5'])
+
+
+class ConcurrentReserveTests(TransactionTestCase):
+    THREADS = 4
+    ROUNDS = 10
+
+    def setUp(self):
+        if connection.is_in_memory_db():
+            self.skipTest('Needs a test database file that several connections can share.')
+
+    def test_threads_never_receive_the_same_value(self):
+        reserve('test:concurrent')
+        results = []
+        errors = []
+        start = threading.Barrier(self.THREADS)
+
+        def worker():
+            try:
+                start.wait()
+                for _ in range(self.ROUNDS):
+                    results.extend(reserve('test:concurrent', 2))
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        expected = self.THREADS * self.ROUNDS * 2
+        self.assertEqual(sorted(results), list(range(2, expected + 2)))
+        self.assertEqual(IdSequence.objects.get(key='test:concurrent').last_value, expected + 1)
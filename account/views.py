@@ -5,11 +5,11 @@ from django.http import HttpResponse
 from .models import User
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.tokens import default_token_generator
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
-from django.utils.encoding import force_bytes, force_str
-from django.core.mail import send_mail
-from django.conf import settings
+from django.utils.http import urlsafe_base64_decode
+from django.utils.encoding import force_str
 from django.contrib.sites.shortcuts import get_current_site
+from django.urls import get_script_prefix
+from .tasks import send_password_reset_email
 
 
 
@@ -159,48 +159,13 @@ def forgot_password(request):
             messages.success(request, 'If your email is registered, you will receive a password reset link shortly.')
             return render(request, 'forgot_password.html')
 
-        # Generate password reset token
-        token = default_token_generator.make_token(user)
-        uid = urlsafe_base64_encode(force_bytes(user.pk))
-
-        # Build reset password URL
+        # Sent as a job: right after this request commits in eager mode, or
+        # by the worker, so a slow SMTP server never holds up the request.
         current_site = get_current_site(request)
-        reset_url = f"{request.scheme}://{current_site.domain}/reset-password/{uid}/{token}/"
-
-        # Send email
-        subject = 'Password Reset Request - Student Management System'
-        message = f"""
-Hello {user.first_name} {user.last_name},
-
-You requested to reset your password for your Student Management System account.
-
-Please click the link below to reset your password:
-{reset_url}
-
-This link will expire in 24 hours.
-
-If you did not request this password reset, please ignore this email.
-
-User ID: {user.user_id}
-Username: {user.username}
-
-Best regards,
-Student Management System Team
-        """
-
-        try:
-            send_mail(
-                subject,
-                message,
-                settings.DEFAULT_FROM_EMAIL,
-                [email],
-                fail_silently=False,
-            )
-            messages.success(request, 'Password reset link has been sent to your email address.')
-        except Exception as e:
-            # If email fails, show the reset link directly (for development)
-            messages.warning(request, f'Could not send email. Reset link: {reset_url}')
-            print(f"Email error: {str(e)}")
+        # The script prefix carries a /<school>/ path prefix (myproject.tenancy).
+        base_url = f"{request.scheme}://{current_site.domain}{get_script_prefix().rstrip('/')}"
+        send_password_reset_email.delay(user.pk, base_url)
+        messages.success(request, 'If your email is registered, you will receive a password reset link shortly.')
 
         return render(request, 'forgot_password.html')
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import AdminProfile
+from .models import AdminProfile, Announcement, Job
 
 
 @admin.register(AdminProfile)
@@ -53,3 +53,20 @@ class AdminProfileAdmin(admin.ModelAdmin):
     )
 
     readonly_fields = ('admin_user_id', 'created_at', 'updated_at')   # ID auto-fill hobe edit na
+
+
+@admin.register(Announcement)
+class AnnouncementAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'audience', 'klass', 'section', 'session', 'created_by', 'created_at')
+    list_filter = ('audience', 'klass', 'section', 'session')
+    search_fields = ('subject',)
+    list_select_related = ('klass', 'section', 'session', 'created_by')
+    readonly_fields = ('created_by', 'created_at')
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('task', 'status', 'priority', 'run_at', 'attempts', 'max_attempts', 'locked_by', 'finished_at')
+    list_filter = ('status', 'task')
+    search_fields = ('task', 'unique_key')
+    readonly_fields = ('locked_by', 'locked_at', 'created_at', 'finished_at', 'last_error')
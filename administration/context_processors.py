@@ -0,0 +1,9 @@
+from .notifications import unread_summary
+
+
+def notifications(request):
+    """Unread count and latest unread items for the header bell."""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'notification_summary': unread_summary(user)}
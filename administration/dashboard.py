@@ -0,0 +1,131 @@
+"""
+Admin dashboard statistics
+==========================
+The admin home page shows headline counts (students, teachers, classes,
+subjects) and a students-per-class chart. ``get_dashboard_stats`` builds all
+of it from one grouped pass over ``StudentInfo`` and one teacher count; class
+and subject totals and class labels come from the in-memory reference data
+(``academic.cache``). The result is kept in Django's cache until a
+``StudentInfo``, ``TeacherInfo``, ``Class`` or ``Subject`` write invalidates
+it (see ``administration.signals``).
+
+Settings:
+
+``DASHBOARD_STATS_TIMEOUT``
+    Seconds a computed result counts as fresh even without an invalidation
+    (default 600). Invalidations from other workers are only seen through a
+    shared cache backend, so this bounds staleness with LocMemCache.
+
+``DASHBOARD_STATS_STALE_WHILE_REVALIDATE``
+    When true, an invalidated or expired result keeps being served while one
+    background thread recomputes it, so no admin request ever waits on the
+    aggregate. Default false: the next request recomputes synchronously.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+
+from academic.cache import get_reference_data
+from myproject.tenancy.context import current_tenant, in_tenant
+from student.models import StudentInfo
+from teacher.models import TeacherInfo
+
+
+STATS_KEY = 'administration:dashboard-stats'
+REFRESH_LOCK_KEY = 'administration:dashboard-stats:refreshing'
+DEFAULT_TIMEOUT = 600
+REFRESH_LOCK_TIMEOUT = 60
+
+
+def _timeout():
+    return getattr(settings, 'DASHBOARD_STATS_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def _stale_while_revalidate():
+    return getattr(settings, 'DASHBOARD_STATS_STALE_WHILE_REVALIDATE', False)
+
+
+def compute_dashboard_stats():
+    """Run the aggregate and return a plain dict for the dashboard template."""
+    reference = get_reference_data()
+
+    per_class = dict(
+        StudentInfo.objects.order_by()
+        .values_list('klass_id')
+        .annotate(total=Count('id'))
+    )
+    distribution = [
+        (klass.name, per_class[klass.id])
+        for klass in reference.classes
+        if per_class.get(klass.id)
+    ]
+
+    return {
+        'student_count': sum(per_class.values()),
+        'teacher_count': TeacherInfo.objects.count(),
+        'class_count': len(reference.classes),
+        'subject_count': len(reference.subjects),
+        'class_student_labels': [label for label, _ in distribution],
+        'class_student_counts': [total for _, total in distribution],
+    }
+
+
+def _store(stats):
+    entry = {'stats': stats, 'computed_at': time.time(), 'stale': False}
+    # In stale-while-revalidate mode the entry must outlive its freshness
+    # window so there is always something to serve while it is rebuilt.
+    cache.set(STATS_KEY, entry, timeout=None if _stale_while_revalidate() else _timeout())
+    return stats
+
+
+def refresh_dashboard_stats():
+    """Recompute and cache the statistics; returns the new values."""
+    return _store(compute_dashboard_stats())
+
+
+def _refresh_in_background():
+    try:
+        refresh_dashboard_stats()
+    finally:
+        cache.delete(REFRESH_LOCK_KEY)
+        connection.close()
+
+
+def _schedule_refresh():
+    # cache.add is atomic, so only one worker/thread rebuilds at a time.
+    if cache.add(REFRESH_LOCK_KEY, True, timeout=REFRESH_LOCK_TIMEOUT):
+        # The thread starts with no school active; carry this request's over.
+        target = in_tenant(current_tenant(), _refresh_in_background)
+        threading.Thread(target=target, daemon=True).start()
+
+
+def get_dashboard_stats():
+    """Return the cached statistics, recomputing or revalidating as configured."""
+    entry = cache.get(STATS_KEY)
+    if entry is None:
+        return refresh_dashboard_stats()
+
+    expired = time.time() - entry['computed_at'] >= _timeout()
+    if not (entry['stale'] or expired):
+        return entry['stats']
+
+    if _stale_while_revalidate():
+        _schedule_refresh()
+        return entry['stats']
+    return refresh_dashboard_stats()
+
+
+def invalidate_dashboard_stats():
+    """Mark the cached statistics out of date."""
+    if _stale_while_revalidate():
+        entry = cache.get(STATS_KEY)
+        if entry is not None:
+            entry['stale'] = True
+            cache.set(STATS_KEY, entry, timeout=None)
+    else:
+        cache.delete(STATS_KEY)
@@ -0,0 +1,251 @@
+"""
+Notification e-mail digests
+===========================
+Sends each student and teacher one e-mail listing the notifications they
+have not read, instead of one message per notification (or none at all).
+
+``send_digests`` is the job behind ``manage.py send_notification_digests``:
+
+1. **Collect.** It reads everything created in the window with a fixed
+   number of queries: direct messages, announcements, read marks,
+   exceptions and previous digests. Announcements are matched to students
+   in memory, so nothing runs per recipient. A user's cutoff is the latest
+   of the window start, their read mark (``date_joined`` without one, as
+   for the header bell) and their previous digest, so nothing is mailed
+   twice and nothing already read is mailed.
+2. **Render.** The text and HTML templates are loaded once per run and
+   reused for every message.
+3. **Send.** One backend connection is opened and reused for every batch
+   of ``batch_size`` messages via ``send_messages``. A failed batch
+   reopens the connection and retries with exponential backoff. A batch
+   can fail after some of its messages went out, so delivery is
+   at-least-once.
+
+Recipients whose digest went out get a ``NotificationDigest`` row. Failed
+recipients are picked up again by the next run.
+
+Works with any e-mail backend; use ``locmem`` in tests and ``console`` to
+preview.
+"""
+
+import smtplib
+import time
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import get_template
+from django.utils import timezone
+
+from account.models import User
+from student.models import StudentInfo, StudentNotification
+from teacher.models import TeacherNotification
+
+from .models import Announcement, NotificationDigest, NotificationRead
+from .notifications import KIND_ANNOUNCEMENT, KIND_DIRECT, announcement_matches, read_marks
+
+
+DEFAULT_WINDOW = timedelta(hours=24)
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_BACKOFF = 2.0
+MAX_ITEMS_PER_DIGEST = 20
+
+TEXT_TEMPLATE = 'Email/notification_digest.txt'
+HTML_TEMPLATE = 'Email/notification_digest.html'
+
+DigestItem = namedtuple('DigestItem', 'kind id subject message created_at')
+
+
+class DigestReport:
+    """Outcome of one digest run."""
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.recipients = 0
+        self.sent = 0
+        self.failed = []     # e-mail addresses whose batch gave up
+        self.batches = 0
+        self.retries = 0
+        self._started = time.monotonic()
+        self.duration = 0.0
+
+    def finish(self):
+        self.duration = time.monotonic() - self._started
+        return self
+
+    @property
+    def messages_per_second(self):
+        return self.sent / self.duration if self.duration else 0.0
+
+    def summary(self):
+        if self.dry_run:
+            return f"{self.recipients} digests would be sent (dry run, {self.duration:.1f}s)."
+        return (
+            f"{self.sent} of {self.recipients} digests sent in {self.batches} batches, "
+            f"{len(self.failed)} failed, {self.retries} retries in {self.duration:.1f}s "
+            f"({self.messages_per_second:.0f} messages/s)."
+        )
+
+
+# ============================================================================
+# COLLECTING
+# ============================================================================
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def collect_digests(now=None, window=None):
+    """``user_id -> [DigestItem, ...]`` (newest first) of unread items in the window."""
+    now = now or timezone.now()
+    start = now - (window or _setting('DIGEST_WINDOW', DEFAULT_WINDOW))
+    in_window = {'created_at__gt': start, 'created_at__lte': now}
+    items = defaultdict(list)
+
+    for row in StudentNotification.objects.filter(**in_window).values(
+        'id', 'subject', 'message', 'created_at', 'student__user_id'
+    ):
+        items[row['student__user_id']].append(
+            DigestItem(KIND_DIRECT, row['id'], row['subject'], row['message'], row['created_at'])
+        )
+    for row in TeacherNotification.objects.filter(**in_window).values(
+        'id', 'subject', 'message', 'created_at', 'teacher_id__user_id'
+    ):
+        items[row['teacher_id__user_id']].append(
+            DigestItem(KIND_DIRECT, row['id'], row['subject'], row['message'], row['created_at'])
+        )
+
+    announcements = list(Announcement.objects.filter(**in_window))
+    for_students = [a for a in announcements if a.audience == Announcement.AUDIENCE_STUDENTS]
+    for_teachers = [a for a in announcements if a.audience == Announcement.AUDIENCE_TEACHERS]
+    if for_students:
+        students = StudentInfo.objects.values_list('user_id', 'klass_id', 'section_id', 'session_id')
+        for user_id, klass_id, section_id, session_id in students.iterator():
+            for announcement in for_students:
+                if announcement_matches(announcement, klass_id, section_id, session_id):
+                    items[user_id].append(_announcement_item(announcement))
+    if for_teachers:
+        for user_id in User.objects.filter(user_type='Teacher').values_list('id', flat=True).iterator():
+            items[user_id].extend(_announcement_item(announcement) for announcement in for_teachers)
+
+    if not items:
+        return {}
+
+    # Drop what each user has already read or already received by e-mail.
+    user_ids = list(items)
+    cutoffs = dict.fromkeys(user_ids, start)
+    # The same read marks as the header bell, including the date_joined default.
+    marks = read_marks(user_ids).items()
+    digests = NotificationDigest.objects.filter(user_id__in=user_ids).values_list('user_id', 'sent_through')
+    for user_id, moment in [*marks, *digests]:
+        cutoffs[user_id] = max(cutoffs[user_id], moment)
+    read = set(
+        NotificationRead.objects.filter(user_id__in=user_ids, created_at__gt=start)
+        .values_list('user_id', 'kind', 'object_id')
+    )
+
+    unread = {}
+    for user_id, user_items in items.items():
+        kept = [
+            item for item in user_items
+            if item.created_at > cutoffs[user_id] and (user_id, item.kind, item.id) not in read
+        ]
+        if kept:
+            kept.sort(key=lambda item: item.created_at, reverse=True)
+            unread[user_id] = kept
+    return unread
+
+
+def _announcement_item(announcement):
+    return DigestItem(
+        KIND_ANNOUNCEMENT, announcement.pk, announcement.subject, announcement.message, announcement.created_at,
+    )
+
+
+# ============================================================================
+# RENDERING
+# ============================================================================
+
+def build_messages(digests, now):
+    """One ``EmailMultiAlternatives`` per recipient with an e-mail address."""
+    text_template = get_template(TEXT_TEMPLATE)
+    html_template = get_template(HTML_TEMPLATE)
+    subject_prefix = _setting('DIGEST_SUBJECT', 'Your notifications - Student Management System')
+
+    users = User.objects.filter(id__in=list(digests), is_active=True).exclude(email__isnull=True).exclude(email='')
+    messages = []
+    for user in users.only('id', 'email', 'first_name', 'last_name', 'username'):
+        items = digests[user.pk]
+        context = {
+            'user': user,
+            'items': items[:MAX_ITEMS_PER_DIGEST],
+            'more': max(0, len(items) - MAX_ITEMS_PER_DIGEST),
+            'now': now,
+        }
+        message = EmailMultiAlternatives(
+            subject=f'{subject_prefix} ({len(items)} unread)',
+            body=text_template.render(context),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[user.email],
+        )
+        message.attach_alternative(html_template.render(context), 'text/html')
+        message.digest_user_id = user.pk
+        messages.append(message)
+    return messages
+
+
+# ============================================================================
+# SENDING
+# ============================================================================
+
+def _send_batch(connection, batch, report, max_retries, backoff):
+    for attempt in range(max_retries + 1):
+        try:
+            connection.open()
+            return connection.send_messages(batch) or 0
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+            if attempt == max_retries:
+                return None
+            report.retries += 1
+            time.sleep(backoff * (2 ** attempt))
+
+
+def send_digests(now=None, window=None, batch_size=None, max_retries=None, backoff=None,
+                 dry_run=False, connection=None):
+    """Collect, render and send one digest per recipient. Returns a ``DigestReport``."""
+    now = now or timezone.now()
+    batch_size = batch_size or _setting('DIGEST_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    max_retries = _setting('DIGEST_MAX_RETRIES', DEFAULT_MAX_RETRIES) if max_retries is None else max_retries
+    backoff = _setting('DIGEST_RETRY_BACKOFF', DEFAULT_RETRY_BACKOFF) if backoff is None else backoff
+    report = DigestReport(dry_run=dry_run)
+
+    messages = build_messages(collect_digests(now, window), now)
+    report.recipients = len(messages)
+    if dry_run or not messages:
+        return report.finish()
+
+    connection = connection or get_connection(fail_silently=False)
+    delivered = []
+    try:
+        for offset in range(0, len(messages), batch_size):
+            batch = messages[offset:offset + batch_size]
+            report.batches += 1
+            sent = _send_batch(connection, batch, report, max_retries, backoff)
+            if sent is None:
+                report.failed.extend(message.to[0] for message in batch)
+                continue
+            report.sent += sent
+            delivered.extend(message.digest_user_id for message in batch)
+    finally:
+        connection.close()
+
+    NotificationDigest.objects.bulk_create(
+        [NotificationDigest(user_id=user_id, sent_through=now) for user_id in delivered],
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['sent_through', 'sent_at'],
+    )
+    return report.finish()
@@ -0,0 +1,211 @@
+"""
+Live notification events
+========================
+Feeds the Server-Sent Events endpoint (``notification_stream``) that pushes
+new notifications, leave decisions and feedback replies to open pages.
+
+Two delivery paths feed every connection:
+
+* **In-process pub/sub.** ``administration.signals`` calls ``publish_to_users``
+  / ``publish_announcement`` after commit. Each ``Subscription`` owns an
+  ``asyncio.Queue`` on the event loop that serves the stream, and events are
+  handed over with ``call_soon_threadsafe``, so the sync request that wrote
+  the row never blocks on slow readers.
+* **Database polling.** Writes made by another worker process never reach this
+  process's broker. Each stream therefore also runs ``poll_events`` every
+  ``NOTIFICATION_POLL_INTERVAL`` seconds (default 15), which reads everything
+  newer than the connection's cursor through indexed queries. Events are
+  de-duplicated by ``key`` so an item seen both ways is sent once.
+
+The cursor is sent as each event's SSE ``id``. On reconnect the browser
+returns it as ``Last-Event-ID``, and nothing written in between is lost.
+
+User ids repeat across schools (``myproject.tenancy``), so subscriptions
+are keyed by school and user.
+"""
+
+import json
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from student.models import StudentFeedback, StudentLeave
+from teacher.models import Feedback, TeacherLeave
+
+from myproject.tenancy.context import current_tenant
+
+from .models import Announcement
+from .notifications import announcement_matches, inbox_for
+
+
+DEFAULT_POLL_INTERVAL = 15
+DEFAULT_HEARTBEAT_INTERVAL = 20
+QUEUE_SIZE = 100
+
+Event = namedtuple('Event', 'type key at data')
+
+
+def poll_interval():
+    return getattr(settings, 'NOTIFICATION_POLL_INTERVAL', DEFAULT_POLL_INTERVAL)
+
+
+def heartbeat_interval():
+    return getattr(settings, 'NOTIFICATION_HEARTBEAT_INTERVAL', DEFAULT_HEARTBEAT_INTERVAL)
+
+
+# ---------------------------------------------------------------------------
+# Events
+# ---------------------------------------------------------------------------
+
+def notification_event(kind, object_id, subject, created_at):
+    return Event('notification', f'{kind}:{object_id}', created_at, {
+        'kind': kind,
+        'id': object_id,
+        'subject': subject or '',
+        'created_at': created_at.isoformat(),
+    })
+
+
+def leave_event(leave):
+    return Event('leave', f'leave:{leave.pk}:{leave.status}', leave.status_changed_at, {
+        'id': leave.pk,
+        'status': leave.status,
+        'start_date': str(leave.start_date),
+        'end_date': str(leave.end_date),
+    })
+
+
+def feedback_event(feedback):
+    return Event('feedback', f'feedback:{feedback.pk}:{feedback.updated_at.isoformat()}', feedback.updated_at, {
+        'id': feedback.pk,
+        'reply': feedback.feedback_reply or '',
+    })
+
+
+def encode(event):
+    """The SSE wire format for ``event``; its ``id`` is the reconnect cursor."""
+    return (
+        f'id: {event.at.isoformat()}\n'
+        f'event: {event.type}\n'
+        f'data: {json.dumps(event.data)}\n\n'
+    )
+
+
+def parse_cursor(value):
+    parsed = parse_datetime(value) if value else None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+# ---------------------------------------------------------------------------
+# In-process broker
+# ---------------------------------------------------------------------------
+
+class Subscription:
+    """One open stream: the reader's school and identity plus its queue and event loop."""
+
+    def __init__(self, tenant, user_id, audience, profile, loop, queue):
+        self.tenant = tenant
+        self.user_id = user_id
+        self.audience = audience
+        self.klass_id = getattr(profile, 'klass_id', None)
+        self.section_id = getattr(profile, 'section_id', None)
+        self.session_id = getattr(profile, 'session_id', None)
+        self.loop = loop
+        self.queue = queue
+
+    @property
+    def key(self):
+        return (self.tenant, self.user_id)
+
+    def matches(self, announcement):
+        if announcement.audience != self.audience:
+            return False
+        return announcement_matches(announcement, self.klass_id, self.section_id, self.session_id)
+
+    def deliver(self, event):
+        def put():
+            # A reader that stopped draining loses live events; polling catches up.
+            if not self.queue.full():
+                self.queue.put_nowait(event)
+
+        try:
+            self.loop.call_soon_threadsafe(put)
+        except RuntimeError:
+            # The stream's loop already closed; unsubscribe() is on its way.
+            pass
+
+
+_subscriptions = {}
+_lock = threading.Lock()
+
+
+def subscribe(subscription):
+    with _lock:
+        _subscriptions.setdefault(subscription.key, set()).add(subscription)
+
+
+def unsubscribe(subscription):
+    with _lock:
+        subscriptions = _subscriptions.get(subscription.key)
+        if subscriptions:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del _subscriptions[subscription.key]
+
+
+def connected_users():
+    with _lock:
+        return len(_subscriptions)
+
+
+def publish_to_users(user_ids, event):
+    tenant = current_tenant()
+    with _lock:
+        targets = [sub for user_id in user_ids for sub in _subscriptions.get((tenant, user_id), ())]
+    for subscription in targets:
+        subscription.deliver(event)
+
+
+def publish_announcement(announcement):
+    event = notification_event('announcement', announcement.pk, announcement.subject, announcement.created_at)
+    tenant = current_tenant()
+    with _lock:
+        targets = [
+            sub for (school, _), subs in _subscriptions.items() if school == tenant
+            for sub in subs if sub.matches(announcement)
+        ]
+    for subscription in targets:
+        subscription.deliver(event)
+
+
+# ---------------------------------------------------------------------------
+# Database polling fallback
+# ---------------------------------------------------------------------------
+
+def poll_events(audience, profile, since):
+    """Everything for this reader newer than ``since``, oldest first."""
+    events = [
+        notification_event(item['kind'], item['id'], item['subject'], item['created_at'])
+        for item in inbox_for(audience, profile, since=since)
+    ]
+
+    if audience == Announcement.AUDIENCE_STUDENTS:
+        leaves = StudentLeave.objects.filter(student=profile)
+        feedback = StudentFeedback.objects.filter(student=profile)
+    else:
+        leaves = TeacherLeave.objects.filter(teacher=profile)
+        feedback = Feedback.objects.filter(teacher=profile)
+
+    events.extend(leave_event(leave) for leave in leaves.filter(status_changed_at__gt=since))
+    events.extend(
+        feedback_event(entry)
+        for entry in feedback.filter(updated_at__gt=since).exclude(feedback_reply__isnull=True).exclude(feedback_reply='')
+    )
+    events.sort(key=lambda event: event.at)
+    return events
+
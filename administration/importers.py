@@ -0,0 +1,453 @@
+"""
+Bulk user import
+================
+Streams a CSV or XLSX sheet of students or teachers and creates the
+``User`` + ``StudentInfo`` / ``TeacherInfo`` rows in batches.
+
+Rows are read lazily and processed ``chunk_size`` at a time: each chunk is
+validated against in-memory Class/Session/Section maps, its passwords are
+hashed in a process pool, IDs and usernames are reserved as one block from
+``account.sequences`` and the rows are written with ``bulk_create`` inside a
+single transaction. Used by the ``import_users`` management command and the
+admin upload page.
+"""
+
+import csv
+import io
+import secrets
+import string
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from account.models import User
+from account.sequences import (
+    allocate_admission_nos,
+    allocate_student_user_ids,
+    allocate_user_ids,
+    allocate_usernames,
+)
+from academic.models import Class, Section, Session
+from student.models import StudentInfo
+from teacher.models import TeacherInfo
+
+from .dashboard import invalidate_dashboard_stats
+from .tasks import index_search_documents
+
+
+KIND_STUDENT = 'student'
+KIND_TEACHER = 'teacher'
+KINDS = (KIND_STUDENT, KIND_TEACHER)
+
+DEFAULT_CHUNK_SIZE = 500
+# Hashing processes start only for a chunk with at least this many new
+# accounts; smaller uploads hash in the calling process.
+POOL_MIN_ROWS = 50
+# The upload page runs inside a web worker; it never forks more than this.
+WEB_WORKERS = 2
+
+# Plain text columns copied as-is onto the profile model.
+STUDENT_TEXT_FIELDS = (
+    'first_name', 'last_name', 'religion', 'phone', 'email',
+    'father_name', 'father_occupation', 'father_mobile', 'father_email',
+    'mother_name', 'mother_occupation', 'mother_mobile', 'mother_email',
+    'present_address', 'permanent_address',
+)
+TEACHER_TEXT_FIELDS = (
+    'first_name', 'last_name', 'phone', 'email', 'designation',
+    'qualification', 'experience', 'present_address', 'permanent_address',
+)
+
+GENDERS = {choice[0] for choice in StudentInfo.GENDER}
+BLOOD_GROUPS = {choice[0] for choice in StudentInfo.BLOOD_GROUP}
+
+
+class ImportFileError(Exception):
+    """Raised when the uploaded sheet cannot be read at all."""
+
+
+class ImportReport:
+    """Outcome of one import run: created accounts and per-row errors."""
+
+    def __init__(self, kind, dry_run=False):
+        self.kind = kind
+        self.dry_run = dry_run
+        self.total_rows = 0
+        self.valid_rows = 0
+        self.created = []   # dicts: row, username, password, user_id
+        self.errors = []    # (row number, message)
+        self._started = time.monotonic()
+        self.duration = 0.0
+
+    def add_error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+    def finish(self):
+        self.duration = time.monotonic() - self._started
+        return self
+
+    @property
+    def rows_per_second(self):
+        return self.total_rows / self.duration if self.duration else 0.0
+
+    def summary(self):
+        action = 'validated' if self.dry_run else 'created'
+        count = self.valid_rows if self.dry_run else len(self.created)
+        return (
+            f"{self.total_rows} rows read, {count} {self.kind}s {action}, "
+            f"{len(self.errors)} errors in {self.duration:.1f}s "
+            f"({self.rows_per_second:.0f} rows/s)."
+        )
+
+
+# ============================================================================
+# READING
+# ============================================================================
+
+def _normalize_header(value):
+    return str(value or '').strip().lower().replace(' ', '_')
+
+
+def read_rows(file_obj, filename):
+    """
+    Yield one dict per data row (header names lower-cased, spaces -> ``_``).
+
+    ``file_obj`` is a binary file object; ``.xlsx`` needs openpyxl.
+    """
+    if filename.lower().endswith('.xlsx'):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ImportFileError('Reading .xlsx files requires the "openpyxl" package.')
+
+        workbook = load_workbook(file_obj, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [_normalize_header(cell) for cell in next(rows, ())]
+            for values in rows:
+                if not any(value not in (None, '') for value in values):
+                    continue
+                yield dict(zip(header, values))
+        finally:
+            workbook.close()
+    elif filename.lower().endswith('.csv'):
+        text = io.TextIOWrapper(file_obj, encoding='utf-8-sig', newline='')
+        reader = csv.reader(text)
+        header = [_normalize_header(cell) for cell in next(reader, [])]
+        for values in reader:
+            if not any(value.strip() for value in values):
+                continue
+            yield dict(zip(header, values))
+    else:
+        raise ImportFileError('Unsupported file type. Upload a .csv or .xlsx file.')
+
+
+def _text(row, key):
+    value = row.get(key)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _date(row, key):
+    value = row.get(key)
+    if value in (None, ''):
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value).strip(), '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'{key} must be a date in YYYY-MM-DD format.')
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row_number, row in enumerate(rows, start=2):   # row 1 is the header
+        chunk.append((row_number, row))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _generate_password(length=12):
+    alphabet = string.ascii_letters + string.digits + string.punctuation
+    return ''.join(secrets.choice(alphabet) for _ in range(length))
+
+
+# ============================================================================
+# VALIDATION
+# ============================================================================
+
+class ReferenceMap:
+    """Class / Session / Section lookups loaded once per import."""
+
+    def __init__(self):
+        self.classes = {}
+        class_codes = {}
+        for klass in Class.objects.all():
+            self.classes[klass.name.strip().lower()] = klass
+            class_codes.setdefault(str(klass.class_code), []).append(klass)
+        # A class code is only usable as a key when it is unambiguous.
+        for code, matches in class_codes.items():
+            if len(matches) == 1:
+                self.classes.setdefault(code, matches[0])
+
+        self.sessions = {session.name.strip().lower(): session for session in Session.objects.all()}
+
+        self.sections = {}
+        for section in Section.objects.order_by('id'):
+            self.sections.setdefault(section.name.strip().lower(), section)
+
+    @staticmethod
+    def _key(value):
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        return str(value).strip().lower()
+
+    def klass(self, value):
+        return self.classes.get(self._key(value))
+
+    def session(self, value):
+        return self.sessions.get(self._key(value))
+
+    def section(self, value):
+        return self.sections.get(self._key(value))
+
+
+def _validate_common(row, data):
+    if not data['first_name']:
+        raise ValueError('first_name is required.')
+
+    gender = _text(row, 'gender')
+    if gender:
+        gender = gender.capitalize()
+        if gender not in GENDERS:
+            raise ValueError(f'Unknown gender "{gender}".')
+    data['gender'] = gender
+    data['date_of_birth'] = _date(row, 'date_of_birth')
+    data['joining_date'] = _date(row, 'joining_date')
+
+
+def _validate_student(row, refs):
+    data = {field: _text(row, field) for field in STUDENT_TEXT_FIELDS}
+    _validate_common(row, data)
+
+    class_value = _text(row, 'class') or _text(row, 'klass')
+    session_value = _text(row, 'session')
+    section_value = _text(row, 'section')
+    if not class_value:
+        raise ValueError('class is required.')
+    if not session_value:
+        raise ValueError('session is required.')
+
+    data['klass'] = refs.klass(class_value)
+    if data['klass'] is None:
+        raise ValueError(f'Unknown class "{class_value}".')
+    data['session'] = refs.session(session_value)
+    if data['session'] is None:
+        raise ValueError(f'Unknown session "{session_value}".')
+    data['section'] = refs.section(section_value) if section_value else None
+    if section_value and data['section'] is None:
+        raise ValueError(f'Unknown section "{section_value}".')
+
+    blood_group = _text(row, 'blood_group')
+    if blood_group and blood_group.upper() not in BLOOD_GROUPS:
+        raise ValueError(f'Unknown blood group "{blood_group}".')
+    data['blood_group'] = blood_group.upper() if blood_group else None
+    return data
+
+
+def _validate_teacher(row, refs):
+    data = {field: _text(row, field) for field in TEACHER_TEXT_FIELDS}
+    _validate_common(row, data)
+    if not data['email']:
+        raise ValueError('email is required.')
+    return data
+
+
+# ============================================================================
+# WRITING
+# ============================================================================
+
+def _user_kwargs(data, user_type, username, password_hash):
+    return dict(
+        username=username,
+        password=password_hash,
+        email=data['email'] or '',
+        first_name=data['first_name'] or '',
+        last_name=data['last_name'] or '',
+        user_type=user_type,
+        gender=data['gender'],
+        phone=data['phone'],
+        date_joined=timezone.now(),
+    )
+
+
+def _write_students(entries, usernames, hashes):
+    now = timezone.now()
+
+    # Reserve student IDs per class code and admission numbers as blocks.
+    by_class_code = {}
+    for entry in entries:
+        by_class_code.setdefault(entry['data']['klass'].class_code, []).append(entry)
+    for class_code, group in by_class_code.items():
+        for entry, student_user_id in zip(group, allocate_student_user_ids(class_code, len(group), now=now)):
+            entry['user_id'] = student_user_id
+    admission_nos = allocate_admission_nos(len(entries), now=now)
+
+    users = User.objects.bulk_create([
+        User(user_id=entry['user_id'], **_user_kwargs(entry['data'], 'Student', username, password_hash))
+        for entry, username, password_hash in zip(entries, usernames, hashes)
+    ])
+
+    profiles = []
+    for entry, user, admission_no in zip(entries, users, admission_nos):
+        data = entry['data']
+        profiles.append(StudentInfo(
+            user=user,
+            student_user_id=entry['user_id'],
+            admission_no=admission_no,
+            roll_no=int(entry['user_id'][-4:]),
+            date_of_birth=data['date_of_birth'],
+            joining_date=data['joining_date'],
+            gender=data['gender'],
+            blood_group=data['blood_group'],
+            klass=data['klass'],
+            session=data['session'],
+            section=data['section'],
+            **{field: data[field] for field in STUDENT_TEXT_FIELDS},
+        ))
+    return StudentInfo.objects.bulk_create(profiles)
+
+
+def _write_teachers(entries, usernames, hashes):
+    user_ids = allocate_user_ids('Teacher', len(entries))
+    for entry, user_id in zip(entries, user_ids):
+        entry['user_id'] = user_id
+
+    users = User.objects.bulk_create([
+        User(user_id=entry['user_id'], **_user_kwargs(entry['data'], 'Teacher', username, password_hash))
+        for entry, username, password_hash in zip(entries, usernames, hashes)
+    ])
+
+    return TeacherInfo.objects.bulk_create([
+        TeacherInfo(
+            user=user,
+            teacher_user_id=entry['user_id'],
+            date_of_birth=entry['data']['date_of_birth'],
+            joining_date=entry['data']['joining_date'],
+            gender=entry['data']['gender'],
+            **{field: entry['data'][field] for field in TEACHER_TEXT_FIELDS},
+        )
+        for entry, user in zip(entries, users)
+    ])
+
+
+def import_users(rows, kind, dry_run=False, chunk_size=DEFAULT_CHUNK_SIZE, workers=None):
+    """
+    Import ``rows`` (an iterable of dicts, see ``read_rows``) as ``kind`` users.
+
+    Invalid rows are skipped and reported; a chunk that fails to write is
+    rolled back as a whole and every row in it is reported. With
+    ``dry_run`` nothing is written and no IDs are reserved.
+
+    Passwords are hashed in a pool of ``workers`` processes (default: CPU
+    count), started on the first chunk of ``POOL_MIN_ROWS`` or more new
+    accounts; ``workers=1`` never starts one.
+    """
+    if kind not in KINDS:
+        raise ValueError(f'kind must be one of {", ".join(KINDS)}.')
+
+    report = ImportReport(kind, dry_run=dry_run)
+    refs = ReferenceMap()
+    validate = _validate_student if kind == KIND_STUDENT else _validate_teacher
+    write = _write_students if kind == KIND_STUDENT else _write_teachers
+    seen_emails = set()
+
+    pool = None
+    try:
+        for chunk in _chunks(rows, chunk_size):
+            entries = []
+            for row_number, row in chunk:
+                report.total_rows += 1
+                try:
+                    data = validate(row, refs)
+                except ValueError as exc:
+                    report.add_error(row_number, str(exc))
+                    continue
+
+                email = (data['email'] or '').lower()
+                if kind == KIND_TEACHER and email in seen_emails:
+                    report.add_error(row_number, f'Email "{data["email"]}" appears more than once in the file.')
+                    continue
+                seen_emails.add(email)
+                entries.append({
+                    'row': row_number,
+                    'data': data,
+                    'password': _text(row, 'password') or _generate_password(),
+                })
+
+            # Teacher e-mails must be unique across the whole table (same rule as add_teacher).
+            if kind == KIND_TEACHER and entries:
+                existing = set(
+                    email.lower() for email in User.objects.filter(
+                        email__in=[entry['data']['email'] for entry in entries]
+                    ).values_list('email', flat=True)
+                )
+                kept = []
+                for entry in entries:
+                    if entry['data']['email'].lower() in existing:
+                        report.add_error(entry['row'], f'Email "{entry["data"]["email"]}" already exists.')
+                    else:
+                        kept.append(entry)
+                entries = kept
+
+            report.valid_rows += len(entries)
+            if dry_run or not entries:
+                continue
+
+            passwords = [entry['password'] for entry in entries]
+            if pool is None and workers != 1 and len(passwords) >= POOL_MIN_ROWS:
+                pool = ProcessPoolExecutor(max_workers=workers)
+            if pool:
+                hashes = list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // 32)))
+            else:
+                hashes = [make_password(password) for password in passwords]
+
+            try:
+                with transaction.atomic():
+                    usernames = allocate_usernames(kind, len(entries))
+                    profiles = write(entries, usernames, hashes)
+                    # bulk_create() sends no post_save, so refresh the dashboard and
+                    # the search index explicitly. Indexing is a job: it runs right
+                    # after commit in eager mode, otherwise on the worker.
+                    transaction.on_commit(invalidate_dashboard_stats)
+                    index_search_documents.delay(kind, [profile.pk for profile in profiles])
+            except Exception as exc:
+                for entry in entries:
+                    report.add_error(entry['row'], f'Batch write failed: {exc}')
+                continue
+
+            for entry, username in zip(entries, usernames):
+                report.created.append({
+                    'row': entry['row'],
+                    'username': username,
+                    'password': entry['password'],
+                    'user_id': entry['user_id'],
+                    'name': f"{entry['data']['first_name']} {entry['data']['last_name'] or ''}".strip(),
+                })
+    finally:
+        if pool:
+            pool.shutdown()
+
+    return report.finish()
@@ -0,0 +1,396 @@
+"""
+Background jobs
+===============
+A small durable job queue on the ``Job`` table, so slow work (e-mail,
+index refreshes, digests) leaves the request path.
+
+Declaring and queueing work::
+
+    @task(max_attempts=5)
+    def send_welcome_email(user_id): ...
+
+    send_welcome_email.delay(user.pk)              # or enqueue(send_welcome_email, user.pk)
+    enqueue(send_welcome_email, user.pk, delay=timedelta(minutes=5))
+
+Arguments are stored as JSON, so pass ids rather than model instances. The
+job row is written in the caller's transaction. A job queued by a
+rolled-back request therefore never runs, and a committed one is never
+lost.
+
+Tasks live in each app's ``tasks.py``. ``manage.py runworker`` imports them
+all and runs jobs on N threads. Several worker processes may share one
+database:
+
+* **Claiming** is a compare-and-swap
+  ``UPDATE ... WHERE id = ? AND status = 'queued'``. Only the worker whose
+  update changes a row owns the job. SQLite has no ``SELECT ... FOR
+  UPDATE``, but it serializes writers, which is all this needs.
+* **Retries.** A task that raises is re-queued with exponential backoff
+  (``JOB_RETRY_BACKOFF`` seconds x 2^attempt, capped at
+  ``JOB_MAX_BACKOFF``) until ``max_attempts`` is reached, then marked
+  failed with its traceback.
+* **Lost workers.** A job left running past ``JOB_LOCK_TIMEOUT`` (its
+  worker died) counts as a failed attempt and is retried.
+* **Periodic tasks** (``@task(every=...)``) always keep exactly one
+  queued job, which the ``unique_active_job_key`` constraint guarantees
+  across workers. Each run queues the next one. ``when=`` (a callable)
+  limits the schedule to deployments where the task has work, e.g. a
+  feature switched on in settings.
+* **Schools.** Each school (``myproject.tenancy``) keeps its jobs in its
+  own database. One worker serves them all: each thread takes at most one
+  job per school per sweep and runs it with that school active.
+
+``JOBS_EAGER`` (on unless ``SMS_JOBS_EAGER=0``) runs each job in-process
+right after the queueing transaction commits, so a site without a worker
+still sends its e-mails and indexes its imports. A job that fails there is
+re-queued and waits for a worker. Jobs queued for later (``delay`` /
+``run_at``) and periodic tasks are never eager; they need a worker. Production deployments run ``runworker``
+and turn eager mode off.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, close_old_connections, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from myproject.tenancy.context import all_tenants, use_tenant
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_BACKOFF = 10        # seconds before the first retry
+DEFAULT_MAX_BACKOFF = 3600
+DEFAULT_LOCK_TIMEOUT = 600        # seconds a job may run before it counts as lost
+DEFAULT_POLL_INTERVAL = 1.0
+MAINTENANCE_INTERVAL = 30
+CLAIM_CANDIDATES = 5
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# ============================================================================
+# TASK REGISTRY
+# ============================================================================
+
+class Task:
+    """A function registered with ``@task``; call it directly or ``delay()`` it."""
+
+    def __init__(self, func, name, max_attempts, priority, every, when=None):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.priority = priority
+        self.every = every
+        self.when = when
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return enqueue(self, *args, **kwargs)
+
+    @property
+    def scheduled(self):
+        """True when this periodic task should keep a job queued right now."""
+        return bool(self.every) and (self.when is None or self.when())
+
+    def __repr__(self):
+        return f'<Task {self.name}>'
+
+
+_tasks = {}
+
+
+def task(func=None, *, name=None, max_attempts=None, priority=0, every=None, when=None):
+    """
+    Register ``func`` as a task. ``every`` (a timedelta) makes it periodic;
+    ``when`` (a callable) schedules it only while it returns true.
+    """
+    def register(func):
+        registered = Task(
+            func,
+            name=name or f'{func.__module__}.{func.__name__}',
+            max_attempts=max_attempts or DEFAULT_MAX_ATTEMPTS,
+            priority=priority,
+            every=every,
+            when=when,
+        )
+        _tasks[registered.name] = registered
+        return registered
+
+    return register(func) if func is not None else register
+
+
+def autodiscover():
+    autodiscover_modules('tasks')
+
+
+def get_task(name):
+    if name not in _tasks:
+        # Importing the task's module registers it.
+        import_module(name.rpartition('.')[0])
+    return _tasks[name]
+
+
+def periodic_tasks():
+    return [registered for registered in _tasks.values() if registered.scheduled]
+
+
+# ============================================================================
+# QUEUEING
+# ============================================================================
+
+def enqueue(task, *args, run_at=None, delay=None, priority=None, max_attempts=None, unique_key=None, eager=None,
+            **kwargs):
+    """
+    Queue ``task`` (a ``Task`` or its name) with JSON-serializable arguments.
+
+    With ``unique_key``, nothing is queued while another job with that key is
+    queued or running; the existing job is returned instead. ``eager``
+    overrides ``JOBS_EAGER`` for this job; either way only a job that is due
+    now runs eagerly.
+    """
+    registered = task if isinstance(task, Task) else get_task(task)
+    if unique_key is not None:
+        # A read first, so the common "already queued" case takes no write lock.
+        existing = _active_job(unique_key)
+        if existing is not None:
+            return existing
+    if run_at is None:
+        run_at = timezone.now() + (delay or timedelta())
+    job = Job(
+        task=registered.name,
+        args=list(args),
+        kwargs=kwargs,
+        run_at=run_at,
+        priority=registered.priority if priority is None else priority,
+        max_attempts=max_attempts or registered.max_attempts,
+        unique_key=unique_key,
+    )
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        if unique_key is None:
+            raise
+        return _active_job(unique_key)
+
+    eager = _setting('JOBS_EAGER', True) if eager is None else eager
+    if eager and run_at <= timezone.now():
+        transaction.on_commit(lambda: _run_eagerly(job.pk))
+    return job
+
+
+def _active_job(unique_key):
+    return Job.objects.filter(unique_key=unique_key, status__in=[Job.STATUS_QUEUED, Job.STATUS_RUNNING]).first()
+
+
+def _run_eagerly(pk):
+    job = _claim(pk, 'eager', timezone.now())
+    if job is not None:
+        execute(job, 'eager')
+
+
+# ============================================================================
+# CLAIMING AND RUNNING
+# ============================================================================
+
+def _claim(pk, worker_id, now):
+    claimed = Job.objects.filter(pk=pk, status=Job.STATUS_QUEUED).update(
+        status=Job.STATUS_RUNNING,
+        locked_by=worker_id,
+        locked_at=now,
+        attempts=F('attempts') + 1,
+    )
+    return Job.objects.get(pk=pk) if claimed else None
+
+
+def claim_next(worker_id):
+    """Claim the next due job for ``worker_id``, or None when nothing is due."""
+    now = timezone.now()
+    candidates = list(
+        Job.objects.filter(status=Job.STATUS_QUEUED, run_at__lte=now)
+        .order_by('-priority', 'run_at')
+        .values_list('pk', flat=True)[:CLAIM_CANDIDATES]
+    )
+    # Another worker may win any candidate; try the next one.
+    for pk in candidates:
+        job = _claim(pk, worker_id, now)
+        if job is not None:
+            return job
+    return None
+
+
+def retry_delay(attempts):
+    backoff = _setting('JOB_RETRY_BACKOFF', DEFAULT_RETRY_BACKOFF) * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(backoff, _setting('JOB_MAX_BACKOFF', DEFAULT_MAX_BACKOFF)))
+
+
+def execute(job, worker_id):
+    """Run a claimed job and record the outcome. Returns True on success."""
+    try:
+        get_task(job.task)(*job.args, **job.kwargs)
+    except Exception:
+        logger.exception('Job %s failed (attempt %s of %s)', job, job.attempts, job.max_attempts)
+        _finish_failed(job, worker_id, traceback.format_exc())
+        return False
+    _finish(job, worker_id, status=Job.STATUS_DONE, last_error='')
+    return True
+
+
+def _finish(job, worker_id, **fields):
+    now = timezone.now()
+    fields.setdefault('finished_at', now)
+    updated = Job.objects.filter(pk=job.pk, status=Job.STATUS_RUNNING, locked_by=worker_id).update(
+        locked_by='', locked_at=None, **fields
+    )
+    if updated and fields['finished_at'] is not None:
+        _schedule_next(job.task, now)
+
+
+def _finish_failed(job, worker_id, error):
+    if job.attempts < job.max_attempts:
+        _finish(
+            job, worker_id,
+            status=Job.STATUS_QUEUED,
+            run_at=timezone.now() + retry_delay(job.attempts),
+            last_error=error,
+            finished_at=None,
+        )
+    else:
+        _finish(job, worker_id, status=Job.STATUS_FAILED, last_error=error)
+
+
+def _schedule_next(name, now):
+    try:
+        registered = get_task(name)
+    except (ImportError, KeyError):
+        return
+    if registered.scheduled:
+        # Never eager: the next run would run at once, and queue the next, and so on.
+        enqueue(registered, run_at=now + registered.every, unique_key=f'periodic:{registered.name}', eager=False)
+
+
+def ensure_periodic():
+    """Queue a first run of every periodic task that has none queued or running."""
+    now = timezone.now()
+    for registered in periodic_tasks():
+        enqueue(registered, run_at=now, unique_key=f'periodic:{registered.name}', eager=False)
+
+
+def recover_stale():
+    """Treat jobs running longer than ``JOB_LOCK_TIMEOUT`` as a failed attempt."""
+    cutoff = timezone.now() - timedelta(seconds=_setting('JOB_LOCK_TIMEOUT', DEFAULT_LOCK_TIMEOUT))
+    recovered = 0
+    for job in Job.objects.filter(status=Job.STATUS_RUNNING, locked_at__lt=cutoff):
+        _finish_failed(job, job.locked_by, f'Worker {job.locked_by} stopped responding.')
+        recovered += 1
+    return recovered
+
+
+# ============================================================================
+# WORKER
+# ============================================================================
+
+class Worker:
+    """Runs jobs on ``threads`` threads until stopped (or, with ``burst``, until idle)."""
+
+    def __init__(self, threads=2, poll_interval=None, burst=False):
+        self.threads = max(1, threads)
+        self.poll_interval = poll_interval or _setting('JOB_POLL_INTERVAL', DEFAULT_POLL_INTERVAL)
+        self.burst = burst
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+        self.succeeded = 0
+        self.failed = 0
+        self.recovered = 0
+        self._count_lock = threading.Lock()
+        self._started = time.monotonic()
+
+    def stop(self):
+        self.stopping.set()
+
+    def run(self):
+        autodiscover()
+        self._maintain()
+        pool = [
+            threading.Thread(target=self._loop, args=(f'{self.name}:{index}',), name=f'jobs-{index}', daemon=True)
+            for index in range(self.threads)
+        ]
+        for thread in pool:
+            thread.start()
+
+        last_maintenance = time.monotonic()
+        while any(thread.is_alive() for thread in pool):
+            for thread in pool:
+                thread.join(timeout=1)
+            if time.monotonic() - last_maintenance >= MAINTENANCE_INTERVAL and not self.stopping.is_set():
+                self._maintain()
+                last_maintenance = time.monotonic()
+        connections.close_all()
+
+    def _maintain(self):
+        for tenant in all_tenants():
+            try:
+                with use_tenant(tenant):
+                    self.recovered += recover_stale()
+                    ensure_periodic()
+            except OperationalError:
+                logger.warning('Job maintenance skipped for %s: database busy.', tenant or 'default')
+
+    def _loop(self, worker_id):
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                ran = False
+                for tenant in all_tenants():
+                    if self.stopping.is_set():
+                        break
+                    with use_tenant(tenant):
+                        ran = self._run_next(worker_id) or ran
+                if not ran:
+                    if self.burst:
+                        return
+                    self.stopping.wait(self.poll_interval)
+        finally:
+            connections.close_all()
+
+    def _run_next(self, worker_id):
+        """Claim and run one job of the active school; False when none was due."""
+        try:
+            job = claim_next(worker_id)
+        except OperationalError:
+            # Lost a write race for the database lock; try again shortly.
+            return False
+        if job is None:
+            return False
+        succeeded = execute(job, worker_id)
+        with self._count_lock:
+            if succeeded:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+        return True
+
+    def summary(self):
+        elapsed = time.monotonic() - self._started
+        return (
+            f"{self.succeeded} jobs succeeded, {self.failed} failed, {self.recovered} recovered "
+            f"on {self.threads} threads in {elapsed:.1f}s."
+        )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from administration.query_plans import check_plans
+
+
+class Command(BaseCommand):
+    help = "Run EXPLAIN QUERY PLAN for every registered hot query and fail on full table scans."
+
+    def handle(self, *args, **options):
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+            raise CommandError('check_query_plans reads SQLite EXPLAIN QUERY PLAN output; the database is not SQLite.')
+
+        failures = []
+        for result in check_plans():
+            if result.full_scans:
+                failures.append(result)
+                self.stdout.write(self.style.ERROR(f'FULL SCAN  {result.name}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'ok         {result.name}'))
+            if result.full_scans or options['verbosity'] >= 2:
+                for line in result.plan:
+                    self.stdout.write(f'    {line}')
+
+        if failures:
+            names = ', '.join(result.name for result in failures)
+            raise CommandError(f'{len(failures)} hot quer{"y" if len(failures) == 1 else "ies"} fell back to a full scan: {names}')
@@ -0,0 +1,59 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from administration.importers import (
+    DEFAULT_CHUNK_SIZE,
+    KINDS,
+    ImportFileError,
+    import_users,
+    read_rows,
+)
+
+
+class Command(BaseCommand):
+    help = "Bulk import students or teachers from a CSV/XLSX sheet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to a .csv or .xlsx file with a header row.')
+        parser.add_argument('--kind', choices=KINDS, default='student')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, write nothing.')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--workers', type=int, default=None, help='Password hashing processes (default: CPU count).')
+        parser.add_argument('--errors', help='Write the per-row error report to this CSV file.')
+        parser.add_argument('--credentials', help='Write created usernames and passwords to this CSV file.')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as handle:
+                report = import_users(
+                    read_rows(handle, options['path']),
+                    options['kind'],
+                    dry_run=options['dry_run'],
+                    chunk_size=options['chunk_size'],
+                    workers=options['workers'],
+                )
+        except (OSError, ImportFileError) as exc:
+            raise CommandError(str(exc))
+
+        if options['errors']:
+            with open(options['errors'], 'w', newline='') as handle:
+                writer = csv.writer(handle)
+                writer.writerow(['row', 'error'])
+                writer.writerows(report.errors)
+        else:
+            for row_number, message in report.errors:
+                self.stderr.write(f"Row {row_number}: {message}")
+
+        if options['credentials'] and report.created:
+            with open(options['credentials'], 'w', newline='') as handle:
+                writer = csv.DictWriter(handle, fieldnames=['row', 'name', 'user_id', 'username', 'password'])
+                writer.writeheader()
+                writer.writerows(report.created)
+        elif report.created:
+            self.stdout.write(self.style.WARNING(
+                'Generated passwords were not saved; pass --credentials to keep them.'
+            ))
+
+        style = self.style.WARNING if report.errors else self.style.SUCCESS
+        self.stdout.write(style(report.summary()))
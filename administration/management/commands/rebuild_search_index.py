@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from administration.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the global search index from the student, teacher, assignment and notification tables."
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        if backend.name != 'fts5':
+            self.stdout.write(self.style.WARNING(
+                f'The "{backend.name}" search backend keeps no index; nothing to rebuild.'
+            ))
+            return
+
+        total = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} documents.'))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from myproject.routers import DEFAULT_ALIAS, replica_path
+from myproject.sqlite.backup import copy_database
+from myproject.tenancy.context import current_tenant
+
+
+class Command(BaseCommand):
+    help = "Refresh the read-only reporting replica from the primary database with the SQLite backup API."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, default=None,
+                            help='Keep running and refresh every N seconds (default: refresh once).')
+
+    def handle(self, *args, **options):
+        target = replica_path()
+        if not target:
+            raise CommandError('REPLICA_DATABASE is not configured.')
+        if current_tenant() is not None:
+            raise CommandError('The reporting replica mirrors the default school only.')
+
+        while True:
+            result = copy_database(DEFAULT_ALIAS, target)
+            self.stdout.write(self.style.SUCCESS(
+                f'Replica refreshed: {result.pages} pages in {result.duration:.2f}s -> {result.path}'
+            ))
+            if not options['every']:
+                return
+            time.sleep(max(0.0, options['every'] - result.duration))
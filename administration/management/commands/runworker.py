@@ -0,0 +1,31 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from administration.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (e-mail, index refreshes, digests) until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=2,
+                            help='Jobs run concurrently in this process. Start more processes to scale further.')
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help='Seconds an idle thread waits before looking for due jobs again.')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no job is due (for cron or tests).')
+
+    def handle(self, *args, **options):
+        worker = Worker(threads=options['threads'], poll_interval=options['poll_interval'], burst=options['burst'])
+
+        def shutdown(signum, frame):
+            self.stdout.write('Finishing running jobs, then stopping...')
+            worker.stop()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        self.stdout.write(f'Worker {worker.name} started with {worker.threads} threads.')
+        worker.run()
+        self.stdout.write(self.style.SUCCESS(worker.summary()))
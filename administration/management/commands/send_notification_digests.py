@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from administration.digests import send_digests
+
+
+class Command(BaseCommand):
+    help = "E-mail each student and teacher a digest of their unread notifications."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window-hours', type=float, default=None,
+                            help='Only include notifications from the last N hours (default: DIGEST_WINDOW, 24h).')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Messages per send_messages() call on the shared connection.')
+        parser.add_argument('--max-retries', type=int, default=None)
+        parser.add_argument('--dry-run', action='store_true', help='Collect and render only; send nothing.')
+
+    def handle(self, *args, **options):
+        window = timedelta(hours=options['window_hours']) if options['window_hours'] else None
+        report = send_digests(
+            window=window,
+            batch_size=options['batch_size'],
+            max_retries=options['max_retries'],
+            dry_run=options['dry_run'],
+        )
+
+        for address in report.failed:
+            self.stderr.write(f"Failed: {address}")
+        style = self.style.WARNING if report.failed else self.style.SUCCESS
+        self.stdout.write(style(report.summary()))
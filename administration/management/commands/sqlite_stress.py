@@ -0,0 +1,94 @@
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+
+from myproject.sqlite import lock_stats
+
+
+TABLE = 'stress_test_writes'
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent read-then-write transactions against the default database "
+        "and report failures, latency and lock waits. Compare profiles with SQLITE_PROFILE."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=80, help='Concurrent writer threads (default 80).')
+        parser.add_argument('--transactions', type=int, default=10, help='Transactions per writer (default 10).')
+        parser.add_argument('--rows', type=int, default=30, help='Rows written per transaction (one roll call).')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('sqlite_stress only runs against SQLite.')
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE TABLE IF NOT EXISTS {TABLE} (id INTEGER PRIMARY KEY, writer INTEGER, seq INTEGER)')
+        lock_stats.reset()
+
+        latencies = []
+        errors = []
+        record = threading.Lock()
+        start = threading.Barrier(options['writers'])
+
+        def writer(number):
+            try:
+                start.wait()
+                for seq in range(options['transactions']):
+                    began = time.monotonic()
+                    try:
+                        # Read, then write: the pattern deferred transactions fail on.
+                        with transaction.atomic():
+                            with connection.cursor() as cursor:
+                                cursor.execute(f'SELECT COUNT(*) FROM {TABLE} WHERE writer = %s', [number])
+                                cursor.executemany(
+                                    f'INSERT INTO {TABLE} (writer, seq) VALUES (%s, %s)',
+                                    [(number, seq)] * options['rows'],
+                                )
+                    except OperationalError as error:
+                        with record:
+                            errors.append(str(error))
+                    else:
+                        with record:
+                            latencies.append(time.monotonic() - began)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=writer, args=(number,)) for number in range(options['writers'])]
+        began = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - began
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+        attempted = options['writers'] * options['transactions']
+        stats = lock_stats.snapshot()
+        self.stdout.write(f"Profile: {getattr(settings, 'SQLITE_PROFILE', 'n/a')}")
+        self.stdout.write(
+            f"{len(latencies)} of {attempted} transactions committed, {len(errors)} failed "
+            f"in {elapsed:.1f}s ({len(latencies) / elapsed:.0f} tx/s)."
+        )
+        if latencies:
+            latencies.sort()
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            self.stdout.write(
+                f"Latency: p50 {statistics.median(latencies) * 1000:.0f} ms, "
+                f"p99 {p99 * 1000:.0f} ms, max {latencies[-1] * 1000:.0f} ms."
+            )
+        self.stdout.write(
+            f"Lock waits: {stats['waits']} ({stats['wait_seconds']:.1f}s total, max {stats['max_wait'] * 1000:.0f} ms), "
+            f"{stats['retries']} retries, {stats['failures']} gave up."
+        )
+        if errors:
+            self.stdout.write(self.style.WARNING(f"First error: {errors[0]}"))
+        else:
+            self.stdout.write(self.style.SUCCESS('No transaction failed.'))
@@ -0,0 +1,64 @@
+import argparse
+import os
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from myproject.tenancy import tenant_alias
+from myproject.tenancy.context import tenants, use_tenant
+
+
+class Command(BaseCommand):
+    help = (
+        "List the schools this deployment serves, or run a management command once per school, "
+        "e.g. `tenants migrate` or `tenants --tenant north import_users students.csv`. "
+        "The default school is not included; run the command directly for it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', action='append', dest='slugs', metavar='SLUG',
+                            help='Only this school (repeatable; default: every school).')
+        parser.add_argument('command', nargs=argparse.REMAINDER,
+                            help='The command and its arguments (omit to list the schools).')
+
+    def handle(self, *args, **options):
+        slugs = options['slugs'] or tenants()
+        unknown = sorted(set(slugs) - set(tenants()))
+        if unknown:
+            raise CommandError(f'Unknown school(s): {", ".join(unknown)}. Schools live in {settings.TENANT_DIR}.')
+
+        if not options['command']:
+            self._list(slugs)
+            return
+
+        name, *arguments = options['command']
+        failed = []
+        for slug in slugs:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'[{slug}] {name} {" ".join(arguments)}'.rstrip()))
+            try:
+                with use_tenant(slug):
+                    call_command(name, *arguments)
+            except CommandError as exc:
+                self.stderr.write(f'[{slug}] {exc}')
+                failed.append(slug)
+
+        if failed:
+            raise CommandError(f'{name} failed for {len(failed)} of {len(slugs)} schools: {", ".join(failed)}.')
+        self.stdout.write(self.style.SUCCESS(f'{name} ran for {len(slugs)} schools.'))
+
+    def _list(self, slugs):
+        if not slugs:
+            self.stdout.write(f'No schools configured; add <slug>.sqlite3 files to {settings.TENANT_DIR}.')
+            return
+        hosts = {}
+        for host, slug in getattr(settings, 'TENANT_HOSTS', {}).items():
+            hosts.setdefault(slug, []).append(host)
+        domain = getattr(settings, 'TENANT_DOMAIN', '')
+        for slug in slugs:
+            path = settings.TENANTS[slug]
+            served_at = [*hosts.get(slug, []), *([f'{slug}.{domain}'] if domain else []), f'/{slug}/']
+            self.stdout.write(
+                f'{slug:<20} {tenant_alias(slug):<28} {os.path.getsize(path) / 1024:>8.0f} KB  '
+                f'{", ".join(served_at)}'
+            )
@@ -0,0 +1,106 @@
+from django.db import migrations
+
+
+# Mirrors administration.search (TABLE, KIND_SHIFT, kind codes and documents)
+# as of this migration; later changes to the documents are picked up by
+# `manage.py rebuild_search_index`.
+CREATE_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "kind UNINDEXED, title, body, detail UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+
+
+def _text(*columns):
+    # Space-joined, NULL-safe concatenation of text columns.
+    return " || ' ' || ".join(f"COALESCE({column}, '')" for column in columns)
+
+
+def _fts5_available(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+
+def create_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if not _fts5_available(connection):
+        return
+
+    def table(app_label, model):
+        return apps.get_model(app_label, model)._meta.db_table
+
+    student, teacher = table('student', 'StudentInfo'), table('teacher', 'TeacherInfo')
+    klass, section, subject = table('academic', 'Class'), table('academic', 'Section'), table('academic', 'Subject')
+    assignment = table('teacher', 'Assignment')
+    student_notification = table('student', 'StudentNotification')
+    teacher_notification = table('teacher', 'TeacherNotification')
+
+    statements = [
+        CREATE_TABLE,
+        f"""
+        INSERT INTO search_index (rowid, kind, title, body, detail)
+        SELECT (1 << 40) | s.id, 'student',
+               {_text('s.first_name', 's.last_name')},
+               {_text('s.student_user_id', 's.admission_no', 's.phone', 's.email', 's.father_name',
+                      's.father_mobile', 's.mother_name', 's.mother_mobile')},
+               {_text('s.student_user_id', 'c.name', 'sec.name')}
+        FROM {student} s
+        LEFT JOIN {klass} c ON c.id = s.klass_id
+        LEFT JOIN {section} sec ON sec.id = s.section_id
+        """,
+        f"""
+        INSERT INTO search_index (rowid, kind, title, body, detail)
+        SELECT (2 << 40) | t.id, 'teacher',
+               {_text('t.first_name', 't.last_name')},
+               {_text('t.teacher_user_id', 't.email', 't.phone', 't.designation')},
+               {_text('t.teacher_user_id', 't.designation')}
+        FROM {teacher} t
+        """,
+        f"""
+        INSERT INTO search_index (rowid, kind, title, body, detail)
+        SELECT (3 << 40) | a.id, 'assignment', a.title, '', {_text('sub.name', 'c.name')}
+        FROM {assignment} a
+        LEFT JOIN {subject} sub ON sub.id = a.subject_id
+        LEFT JOIN {klass} c ON c.id = a.klass_id
+        """,
+        f"""
+        INSERT INTO search_index (rowid, kind, title, body, detail)
+        SELECT (4 << 40) | n.id, 'student_notification', COALESCE(n.subject, ''),
+               {_text('s.first_name', 's.last_name')}, 'To ' || {_text('s.first_name', 's.last_name')}
+        FROM {student_notification} n
+        JOIN {student} s ON s.id = n.student_id
+        """,
+        f"""
+        INSERT INTO search_index (rowid, kind, title, body, detail)
+        SELECT (5 << 40) | n.id, 'teacher_notification', COALESCE(n.subject, ''),
+               {_text('t.first_name', 't.last_name')}, 'To ' || {_text('t.first_name', 't.last_name')}
+        FROM {teacher_notification} n
+        JOIN {teacher} t ON t.id = n.teacher_id_id
+        """,
+    ]
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS search_index')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administration', '0004_alter_adminprofile_options'),
+        ('academic', '0002_class_updated_at_section_updated_at_and_more'),
+        ('student', '0014_studentinfo_student_roster_idx_and_more'),
+        ('teacher', '0024_assignment_assignment_class_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
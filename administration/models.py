@@ -1,5 +1,6 @@
 from django.db import models
 from account.models import User   # your custom user model
+from academic.models import Class, Section, Session
 
 class AdminProfile(models.Model):
 
@@ -52,3 +53,156 @@ class AdminProfile(models.Model):
 
     def __str__(self):
         return f"{self.first_name}{self.last_name}"
+
+
+class Announcement(models.Model):
+    """
+    A notification addressed to an audience rather than a person.
+
+    One row reaches every matching recipient: recipients are resolved when
+    they read their inbox (see ``administration.notifications``), so an
+    announcement to the whole school is a single INSERT. For student
+    announcements an empty class/section/session means "any".
+    """
+
+    AUDIENCE_STUDENTS = 'students'
+    AUDIENCE_TEACHERS = 'teachers'
+    AUDIENCE_CHOICES = [
+        (AUDIENCE_STUDENTS, 'Students'),
+        (AUDIENCE_TEACHERS, 'Teachers'),
+    ]
+
+    audience = models.CharField(max_length=10, choices=AUDIENCE_CHOICES)
+    klass = models.ForeignKey(Class, on_delete=models.CASCADE, null=True, blank=True, related_name='announcements')
+    section = models.ForeignKey(Section, on_delete=models.CASCADE, null=True, blank=True, related_name='announcements')
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, null=True, blank=True, related_name='announcements')
+    subject = models.CharField(max_length=250)
+    message = models.TextField()
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='announcements',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = "Announcements"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=['audience', '-created_at'], name='announcement_audience_idx'),
+        ]
+
+    @property
+    def audience_label(self):
+        if self.audience == self.AUDIENCE_TEACHERS:
+            return 'All teachers'
+        parts = [part.name for part in (self.klass, self.section, self.session) if part]
+        return ' / '.join(parts) if parts else 'All students'
+
+    def __str__(self):
+        return f"{self.subject} ({self.audience_label})"
+
+
+class NotificationReadMark(models.Model):
+    """
+    A user's read high-water mark: every inbox item created at or before
+    ``read_through`` counts as read. Items read individually after the mark
+    are stored as ``NotificationRead`` exceptions.
+    """
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='notification_read_mark')
+    read_through = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user} read through {self.read_through:%Y-%m-%d %H:%M}"
+
+
+class NotificationRead(models.Model):
+    """One inbox item (direct message or announcement) read ahead of the mark."""
+
+    KIND_CHOICES = [
+        ('direct', 'Direct message'),
+        ('announcement', 'Announcement'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notification_reads')
+    kind = models.CharField(max_length=12, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    # The item's own created_at, so exceptions behind a newer mark can be pruned.
+    created_at = models.DateTimeField()
+    read_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'kind', 'object_id'], name='unique_notification_read'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} read {self.kind} #{self.object_id}"
+
+
+class NotificationDigest(models.Model):
+    """How far the e-mail digest has covered a user's inbox."""
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='notification_digest')
+    sent_through = models.DateTimeField()
+    sent_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Digest for {self.user} through {self.sent_through:%Y-%m-%d %H:%M}"
+
+
+class Job(models.Model):
+    """
+    One unit of background work, run by ``manage.py runworker``. See
+    ``administration.jobs`` for the lifecycle.
+    """
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    task = models.CharField(max_length=100)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    priority = models.SmallIntegerField(default=0, help_text="Higher runs first.")
+    run_at = models.DateTimeField()
+    # At most one queued/running job per key; used for periodic tasks and de-duplication.
+    unique_key = models.CharField(max_length=150, null=True, blank=True)
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    last_error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # The claim query: due jobs in priority order.
+            models.Index(fields=['status', '-priority', 'run_at'], name='job_claim_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['unique_key'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='unique_active_job_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
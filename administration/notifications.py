@@ -0,0 +1,264 @@
+"""
+Notification inboxes
+====================
+A user's inbox merges two sources:
+
+* direct messages - one ``StudentNotification`` / ``TeacherNotification`` row
+  per recipient, sent from the admin's single-recipient forms;
+* announcements - one ``Announcement`` row per audience (all students, a
+  class/section/session, all teachers), matched to the reader here.
+
+Both are read with a single ``UNION ALL`` ordered by ``created_at``; each arm
+is served by an index (``student_inbox_idx`` / ``teacher_inbox_idx`` and
+``announcement_audience_idx``).
+
+Read state
+----------
+Each user has a high-water mark (``NotificationReadMark``): items created at
+or before it are read. Items read one by one past the mark are stored as
+``NotificationRead`` exceptions and pruned when the mark moves past them.
+Without a mark, the user's ``date_joined`` is the mark.
+
+``unread_summary`` (the header bell) is cached per user. The key carries the
+user's audience version, which ``bump_audience_version`` changes when an
+announcement is sent, so one cache write invalidates every reader in that
+audience. Direct messages, mark-as-read and profile changes delete the
+user's entry (``invalidate_unread``).
+"""
+
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import CharField, Q, Value
+from django.utils import timezone
+
+from account.models import User
+from myproject.routers import use_primary
+from student.models import StudentInfo, StudentNotification
+from teacher.models import TeacherInfo, TeacherNotification
+
+from .models import Announcement, NotificationRead, NotificationReadMark
+
+
+KIND_DIRECT = 'direct'
+KIND_ANNOUNCEMENT = 'announcement'
+INBOX_FIELDS = ('id', 'subject', 'message', 'created_at')
+RECENT_LIMIT = 5
+DEFAULT_UNREAD_TIMEOUT = 3600
+
+
+def _matches(field, value):
+    # An empty target field means the announcement is for every value.
+    condition = Q(**{f'{field}__isnull': True})
+    if value:
+        condition |= Q(**{field: value})
+    return condition
+
+
+def announcement_matches(announcement, klass_id=None, section_id=None, session_id=None):
+    """Whether a student in class/section/session is in ``announcement``'s audience."""
+    return all(
+        target is None or target == own
+        for target, own in (
+            (announcement.klass_id, klass_id),
+            (announcement.section_id, section_id),
+            (announcement.session_id, session_id),
+        )
+    )
+
+
+def student_announcements(student):
+    return Announcement.objects.filter(
+        _matches('klass_id', student.klass_id),
+        _matches('section_id', student.section_id),
+        _matches('session_id', student.session_id),
+        audience=Announcement.AUDIENCE_STUDENTS,
+    )
+
+
+def teacher_announcements(teacher):
+    return Announcement.objects.filter(audience=Announcement.AUDIENCE_TEACHERS)
+
+
+def _inbox(direct, announcements, since=None, exclude=()):
+    if since is not None:
+        direct = direct.filter(created_at__gt=since)
+        announcements = announcements.filter(created_at__gt=since)
+    if exclude:
+        direct = direct.exclude(id__in=[object_id for kind, object_id in exclude if kind == KIND_DIRECT])
+        announcements = announcements.exclude(
+            id__in=[object_id for kind, object_id in exclude if kind == KIND_ANNOUNCEMENT]
+        )
+    direct = direct.order_by().values(*INBOX_FIELDS, kind=Value(KIND_DIRECT, output_field=CharField()))
+    announcements = announcements.order_by().values(
+        *INBOX_FIELDS, kind=Value(KIND_ANNOUNCEMENT, output_field=CharField())
+    )
+    return direct.union(announcements, all=True).order_by('-created_at')
+
+
+def student_inbox(student, since=None, exclude=()):
+    """Direct messages and matching announcements for ``student``, newest first (dicts)."""
+    return _inbox(
+        StudentNotification.objects.filter(student=student), student_announcements(student), since, exclude,
+    )
+
+
+def teacher_inbox(teacher, since=None, exclude=()):
+    """Direct messages and teacher announcements for ``teacher``, newest first (dicts)."""
+    return _inbox(
+        TeacherNotification.objects.filter(teacher_id=teacher), teacher_announcements(teacher), since, exclude,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Recipients
+# ---------------------------------------------------------------------------
+
+def recipient_for(user):
+    """``(audience, profile)`` for a student or teacher user, else ``(None, None)``."""
+    if user.user_type == 'Student':
+        profile = StudentInfo.objects.filter(user=user).only('id', 'klass_id', 'section_id', 'session_id').first()
+        return (Announcement.AUDIENCE_STUDENTS, profile) if profile else (None, None)
+    if user.user_type == 'Teacher':
+        profile = TeacherInfo.objects.filter(user=user).only('id').first()
+        return (Announcement.AUDIENCE_TEACHERS, profile) if profile else (None, None)
+    return None, None
+
+
+def inbox_for(audience, profile, since=None, exclude=()):
+    """The inbox of ``profile``; ``exclude`` holds ``(kind, id)`` pairs to leave out."""
+    if audience == Announcement.AUDIENCE_STUDENTS:
+        return student_inbox(profile, since, exclude)
+    return teacher_inbox(profile, since, exclude)
+
+
+# ---------------------------------------------------------------------------
+# Read state
+# ---------------------------------------------------------------------------
+
+def read_mark(user):
+    mark = NotificationReadMark.objects.filter(user=user).values_list('read_through', flat=True).first()
+    return mark or user.date_joined
+
+
+def read_marks(user_ids):
+    """``user_id -> read mark`` for many users in two queries, by the same rule as ``read_mark``."""
+    marks = dict(User.objects.filter(id__in=user_ids).values_list('id', 'date_joined'))
+    marks.update(
+        NotificationReadMark.objects.filter(user_id__in=user_ids, read_through__isnull=False)
+        .values_list('user_id', 'read_through')
+    )
+    return marks
+
+
+def _exceptions(user, mark):
+    return set(
+        NotificationRead.objects.filter(user=user, created_at__gt=mark).values_list('kind', 'object_id')
+    )
+
+
+def with_read_state(user, items):
+    """Set ``is_read`` on each inbox dict in ``items`` (a list)."""
+    mark = read_mark(user)
+    read = _exceptions(user, mark)
+    for item in items:
+        item['is_read'] = item['created_at'] <= mark or (item['kind'], item['id']) in read
+    return items
+
+
+def mark_all_read(user, through=None):
+    """Move the user's mark to ``through`` (default: now) and drop the exceptions behind it."""
+    through = through or timezone.now()
+    with transaction.atomic():
+        NotificationReadMark.objects.update_or_create(user=user, defaults={'read_through': through})
+        NotificationRead.objects.filter(user=user, created_at__lte=through).delete()
+    invalidate_unread(user.pk)
+
+
+def mark_read(user, audience, profile, items):
+    """Mark ``items`` (``(kind, id)`` pairs from the user's own inbox) as read."""
+    wanted = {}
+    for kind, object_id in items:
+        wanted.setdefault(kind, set()).add(object_id)
+    if not wanted:
+        return 0
+
+    rows = [
+        NotificationRead(user=user, kind=item['kind'], object_id=item['id'], created_at=item['created_at'])
+        for item in inbox_for(audience, profile, since=read_mark(user))
+        if item['id'] in wanted.get(item['kind'], ())
+    ]
+    NotificationRead.objects.bulk_create(rows, ignore_conflicts=True)
+    invalidate_unread(user.pk)
+    return len(rows)
+
+
+# ---------------------------------------------------------------------------
+# Cached unread summary
+# ---------------------------------------------------------------------------
+
+def _timeout():
+    return getattr(settings, 'UNREAD_NOTIFICATIONS_TIMEOUT', DEFAULT_UNREAD_TIMEOUT)
+
+
+def _version_key(audience):
+    return f'notifications:announcement-version:{audience}'
+
+
+def _audience_version(audience):
+    key = _version_key(audience)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_audience_version(audience):
+    cache.set(_version_key(audience), uuid.uuid4().hex, timeout=None)
+
+
+def _user_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def invalidate_unread(user_id):
+    cache.delete(_user_key(user_id))
+
+
+def compute_unread_summary(user, audience, profile):
+    mark = read_mark(user)
+    # Excluded in SQL: exceptions for items that left the inbox (deleted, or an
+    # announcement for the student's old class) must not lower the count.
+    unread = inbox_for(audience, profile, since=mark, exclude=_exceptions(user, mark))
+    recent = [
+        {'kind': item['kind'], 'id': item['id'], 'subject': item['subject'], 'created_at': item['created_at']}
+        for item in unread[:RECENT_LIMIT]
+    ]
+    return {'count': unread.count(), 'recent': recent}
+
+
+def unread_summary(user):
+    """
+    ``{'count': n, 'recent': [...]}`` for the header bell, or None for users
+    without an inbox. A cache hit costs two cache reads and no queries.
+    """
+    user_type = getattr(user, 'user_type', None)
+    if user_type not in ('Student', 'Teacher'):
+        return None
+    audience = Announcement.AUDIENCE_STUDENTS if user_type == 'Student' else Announcement.AUDIENCE_TEACHERS
+
+    version = _audience_version(audience)
+    cached = cache.get(_user_key(user.pk))
+    if cached is not None and cached['version'] == version:
+        return cached['summary']
+
+    with use_primary():
+        audience, profile = recipient_for(user)
+        if profile is None:
+            return None
+        summary = compute_unread_summary(user, audience, profile)
+    cache.set(_user_key(user.pk), {'version': version, 'summary': summary}, timeout=_timeout())
+    return summary
@@ -0,0 +1,152 @@
+"""
+Hot query registry
+==================
+The query shapes the busiest pages depend on, registered with ``@hot_query``
+so ``manage.py check_query_plans`` can run ``EXPLAIN QUERY PLAN`` on each one
+and fail when SQLite would answer it with a full table scan.
+
+Each builder returns an unevaluated queryset shaped like the one its view
+runs; the literal ids only have to be of the right type. When adding an index
+or a new list page, register its query here so a later schema change cannot
+silently drop it back to a scan.
+"""
+
+from collections import namedtuple
+from datetime import date
+
+from django.db import connections
+
+from account.models import User
+from student.models import StudentInfo, StudentResult
+from teacher.models import Assignment, Attendance, AttendanceRecord, AttendanceRollup, TeacherInfo
+
+from .notifications import student_inbox, teacher_inbox
+
+
+HotQuery = namedtuple('HotQuery', 'name build')
+PlanResult = namedtuple('PlanResult', 'name plan full_scans')
+
+HOT_QUERIES = []
+
+
+def is_full_scan(line):
+    # "SEARCH t USING INDEX i (a=?)" is an index lookup. Any "SCAN t" step
+    # visits every row of t, whether it reads the table itself or walks a
+    # whole index in order ("SCAN t USING INDEX i").
+    line = line.strip()
+    return line.startswith('SCAN ') and not line.startswith('SCAN CONSTANT ROW')
+
+
+def hot_query(name):
+    def register(build):
+        HOT_QUERIES.append(HotQuery(name, build))
+        return build
+    return register
+
+
+def explain(queryset):
+    """Return the ``EXPLAIN QUERY PLAN`` detail lines for ``queryset``."""
+    connection = connections[queryset.db]
+    sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def check_plans(queries=None):
+    """Explain every registered query; returns a ``PlanResult`` per query."""
+    results = []
+    for query in queries or HOT_QUERIES:
+        plan = explain(query.build())
+        full_scans = [line for line in plan if is_full_scan(line)]
+        results.append(PlanResult(query.name, plan, full_scans))
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Registered queries
+# ---------------------------------------------------------------------------
+
+@hot_query('student roster (take attendance / results grid)')
+def _student_roster():
+    return (
+        StudentInfo.objects.filter(klass_id=1, session_id=1, section_id=1)
+        .select_related('klass', 'section')
+        .order_by('roll_no', 'first_name', 'last_name')
+    )
+
+
+@hot_query('manage results grid')
+def _manage_results():
+    return (
+        StudentResult.objects.filter(klass_id=1, section_id=1, session_id=1, subject_id=1, exam_type='Final')
+        .select_related('student', 'subject', 'session', 'klass', 'section')
+        .order_by('-recorded_at', 'student__roll_no')
+    )
+
+
+@hot_query('existing results for a grid')
+def _existing_results():
+    return StudentResult.objects.filter(student_id__in=[1, 2, 3], subject_id=1, session_id=1, exam_type='Final')
+
+
+@hot_query('student results page')
+def _student_results():
+    return StudentResult.objects.filter(student_id=1).order_by('-recorded_at', '-id')
+
+
+@hot_query('student attendance history')
+def _student_attendance():
+    return (
+        AttendanceRecord.objects.filter(student_id=1, attendance__date__gte=date(2025, 1, 1))
+        .select_related('attendance')
+        .order_by('-attendance__date', '-attendance__created_at')
+    )
+
+
+@hot_query('teacher attendance history')
+def _teacher_attendance():
+    return (
+        Attendance.objects.filter(teacher_id=1, date=date(2025, 1, 1))
+        .order_by('-date', '-created_at')
+    )
+
+
+@hot_query('attendance overview page')
+def _attendance_overview():
+    return Attendance.objects.filter(date__lt=date(2025, 1, 1)).order_by('-date', '-created_at', '-id')[:26]
+
+
+@hot_query('attendance records for one sheet')
+def _attendance_sheet():
+    return AttendanceRecord.objects.filter(attendance_id=1).select_related('student')
+
+
+@hot_query('student assignment list')
+def _student_assignments():
+    return Assignment.objects.filter(klass_id=1, session_id=1, section_id=1).order_by('-created_at')
+
+
+@hot_query('teacher assignment list')
+def _teacher_assignments():
+    return Assignment.objects.filter(teacher_id=1).order_by('-created_at')
+
+
+@hot_query('password reset lookup')
+def _user_by_email():
+    return User.objects.filter(email='someone@example.com')
+
+
+@hot_query('attendance rollups for a roster')
+def _roster_rollups():
+    return AttendanceRollup.objects.filter(student_id__in=[1, 2, 3], session_id=1, subject_id=1)
+
+
+@hot_query('student notification inbox')
+def _student_inbox():
+    return student_inbox(StudentInfo(id=1, klass_id=1, section_id=1, session_id=1))
+
+
+@hot_query('teacher notification inbox')
+def _teacher_inbox():
+    return teacher_inbox(TeacherInfo(id=1))
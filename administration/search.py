@@ -0,0 +1,298 @@
+"""
+Global search
+=============
+One search box over students, teachers, assignments and notifications.
+
+The default backend keeps an SQLite FTS5 table, ``search_index``, with one
+row per indexed object. Queries are prefix matches ranked with ``bm25()``,
+so a lookup costs an index probe instead of ``LIKE '%x%'`` over every
+column. Each row's rowid encodes (kind, object id), so single-object
+updates and deletes are rowid lookups too.
+
+Rows stay in sync through ``administration.signals``, which calls
+``index_objects`` / ``remove_objects`` after commit. The bulk importer
+indexes explicitly because ``bulk_create`` sends no signals.
+``manage.py rebuild_search_index`` rebuilds the table from scratch.
+
+``autocomplete`` serves the student and teacher pickers from the same index,
+a page of ``AUTOCOMPLETE_PAGE_SIZE`` hits at a time.
+
+Where FTS5 is unavailable (another database, or an SQLite build without
+it) ``LikeBackend`` answers the same queries with ``icontains`` filters.
+Set ``SEARCH_BACKEND = 'like'`` to force it.
+"""
+
+import re
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models import Q
+from django.urls import reverse
+
+from student.models import StudentInfo, StudentNotification
+from teacher.models import Assignment, TeacherInfo, TeacherNotification
+
+
+TABLE = 'search_index'
+KIND_SHIFT = 40
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+BATCH_SIZE = 1000
+AUTOCOMPLETE_PAGE_SIZE = 10
+AUTOCOMPLETE_MAX_PAGES = 5
+
+SearchHit = namedtuple('SearchHit', 'kind label object_id title detail url')
+Document = namedtuple('Document', 'title body detail')
+
+
+def _join(*parts):
+    return ' '.join(str(part) for part in parts if part)
+
+
+class IndexedKind:
+    """How one model is turned into search rows and links."""
+
+    def __init__(self, kind, code, label, queryset, document, url=None, like_fields=()):
+        self.kind = kind
+        self.code = code
+        self.label = label
+        self.queryset = queryset
+        self.document = document
+        self.url = url
+        self.like_fields = like_fields
+
+    def rowid(self, object_id):
+        return (self.code << KIND_SHIFT) | object_id
+
+
+KINDS = [
+    IndexedKind(
+        'student', 1, 'Student',
+        lambda: StudentInfo.objects.select_related('klass', 'section'),
+        lambda s: Document(
+            title=_join(s.first_name, s.last_name),
+            body=_join(
+                s.student_user_id, s.admission_no, s.phone, s.email,
+                s.father_name, s.father_mobile, s.mother_name, s.mother_mobile,
+            ),
+            detail=_join(s.student_user_id, s.klass.name if s.klass else '', s.section.name if s.section else ''),
+        ),
+        url=lambda pk: reverse('student_detail', args=[pk]),
+        like_fields=[
+            'first_name', 'last_name', 'student_user_id', 'admission_no', 'phone',
+            'father_name', 'father_mobile', 'mother_name', 'mother_mobile',
+        ],
+    ),
+    IndexedKind(
+        'teacher', 2, 'Teacher',
+        lambda: TeacherInfo.objects.all(),
+        lambda t: Document(
+            title=_join(t.first_name, t.last_name),
+            body=_join(t.teacher_user_id, t.email, t.phone, t.designation),
+            detail=_join(t.teacher_user_id, t.designation),
+        ),
+        url=lambda pk: reverse('teacher_detail', args=[pk]),
+        like_fields=['first_name', 'last_name', 'teacher_user_id', 'email', 'phone'],
+    ),
+    IndexedKind(
+        'assignment', 3, 'Assignment',
+        lambda: Assignment.objects.select_related('klass', 'subject'),
+        lambda a: Document(
+            title=a.title,
+            body='',
+            detail=_join(a.subject.name if a.subject else '', a.klass.name if a.klass else ''),
+        ),
+        like_fields=['title'],
+    ),
+    IndexedKind(
+        'student_notification', 4, 'Student notification',
+        lambda: StudentNotification.objects.select_related('student'),
+        lambda n: Document(
+            title=n.subject or '',
+            body=_join(n.student.first_name, n.student.last_name),
+            detail=_join('To', n.student.first_name, n.student.last_name),
+        ),
+        url=lambda pk: reverse('view_student_notifications'),
+        like_fields=['subject'],
+    ),
+    IndexedKind(
+        'teacher_notification', 5, 'Teacher notification',
+        lambda: TeacherNotification.objects.select_related('teacher_id'),
+        lambda n: Document(
+            title=n.subject or '',
+            body=_join(n.teacher_id.first_name, n.teacher_id.last_name),
+            detail=_join('To', n.teacher_id.first_name, n.teacher_id.last_name),
+        ),
+        url=lambda pk: reverse('view_teacher_notifications'),
+        like_fields=['subject'],
+    ),
+]
+KINDS_BY_NAME = {item.kind: item for item in KINDS}
+KINDS_BY_MODEL = {}
+_FTS5_TABLES = {}
+
+
+def kind_for_model(model):
+    if not KINDS_BY_MODEL:
+        for item in KINDS:
+            KINDS_BY_MODEL[item.queryset().model] = item
+    return KINDS_BY_MODEL.get(model)
+
+
+def tokenize(query):
+    """Words of ``query`` as FTS5 prefix terms: ``ra 250`` -> ``"ra"* "250"*``."""
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', query or ''))
+
+
+class LikeBackend:
+    name = 'like'
+
+    def available(self):
+        return True
+
+    def index(self, kind, objects):
+        pass
+
+    def remove(self, kind, object_ids):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def search(self, query, kinds, limit, offset=0):
+        words = re.findall(r'\w+', query or '')
+        hits = []
+        for item in kinds:
+            if not item.like_fields or not words:
+                continue
+            queryset = item.queryset()
+            for word in words:
+                match = Q()
+                for field in item.like_fields:
+                    match |= Q(**{f'{field}__icontains': word})
+                queryset = queryset.filter(match)
+            for obj in queryset.order_by('-pk')[:offset + limit]:
+                document = item.document(obj)
+                hits.append(_hit(item, obj.pk, document.title, document.detail))
+        return hits[offset:offset + limit]
+
+
+class Fts5Backend:
+    name = 'fts5'
+
+    def available(self):
+        # The table only changes with migrations, so look once per connection.
+        if connection.alias not in _FTS5_TABLES:
+            _FTS5_TABLES[connection.alias] = (
+                connection.vendor == 'sqlite' and TABLE in connection.introspection.table_names()
+            )
+        return _FTS5_TABLES[connection.alias]
+
+    def _execute(self, sql, rows):
+        if rows:
+            with connection.cursor() as cursor:
+                cursor.executemany(sql, rows)
+
+    def remove(self, kind, object_ids):
+        item = KINDS_BY_NAME[kind]
+        self._execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [(item.rowid(pk),) for pk in object_ids])
+
+    def index(self, kind, objects):
+        item = KINDS_BY_NAME[kind]
+        rows = []
+        for obj in objects:
+            document = item.document(obj)
+            rows.append((item.rowid(obj.pk), kind, document.title, document.body, document.detail))
+        self.remove(kind, [obj.pk for obj in objects])
+        self._execute(f'INSERT INTO {TABLE} (rowid, kind, title, body, detail) VALUES (%s, %s, %s, %s, %s)', rows)
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE}')
+        total = 0
+        for item in KINDS:
+            batch = []
+            for obj in item.queryset().order_by('pk').iterator(chunk_size=BATCH_SIZE):
+                batch.append(obj)
+                if len(batch) >= BATCH_SIZE:
+                    self.index(item.kind, batch)
+                    total += len(batch)
+                    batch = []
+            self.index(item.kind, batch)
+            total += len(batch)
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+        return total
+
+    def search(self, query, kinds, limit, offset=0):
+        expression = tokenize(query)
+        if not expression or not kinds:
+            return []
+        placeholders = ', '.join(['%s'] * len(kinds))
+        # Title matches weigh ten times more than matches in the other fields.
+        sql = (
+            f'SELECT rowid, kind, title, detail FROM {TABLE} '
+            f'WHERE {TABLE} MATCH %s AND kind IN ({placeholders}) '
+            f'ORDER BY bm25({TABLE}, 0.0, 10.0, 1.0, 0.0) LIMIT %s OFFSET %s'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [expression, *[item.kind for item in kinds], limit, offset])
+            rows = cursor.fetchall()
+        mask = (1 << KIND_SHIFT) - 1
+        return [_hit(KINDS_BY_NAME[kind], rowid & mask, title, detail) for rowid, kind, title, detail in rows]
+
+
+def _hit(item, pk, title, detail):
+    return SearchHit(item.kind, item.label, pk, title, detail, item.url(pk) if item.url else None)
+
+
+BACKENDS = {'fts5': Fts5Backend, 'like': LikeBackend}
+
+
+def get_backend():
+    name = getattr(settings, 'SEARCH_BACKEND', 'fts5')
+    backend = BACKENDS[name]()
+    if not backend.available():
+        backend = LikeBackend()
+    return backend
+
+
+def index_objects(kind, objects):
+    try:
+        get_backend().index(kind, list(objects))
+    except DatabaseError:
+        # The index is derived data; a failed refresh must not break the write
+        # that triggered it. `rebuild_search_index` repairs any gaps.
+        pass
+
+
+def remove_objects(kind, object_ids):
+    try:
+        get_backend().remove(kind, list(object_ids))
+    except DatabaseError:
+        pass
+
+
+def rebuild_index():
+    return get_backend().rebuild()
+
+
+def search(query, kinds=None, limit=DEFAULT_LIMIT, offset=0):
+    """Ranked hits for ``query`` across ``kinds`` (names; default: all)."""
+    selected = [KINDS_BY_NAME[name] for name in kinds if name in KINDS_BY_NAME] if kinds else KINDS
+    limit = max(1, min(limit, MAX_LIMIT))
+    return get_backend().search(query, selected, limit, max(0, offset))
+
+
+def autocomplete(kind, query, page=1, page_size=AUTOCOMPLETE_PAGE_SIZE):
+    """
+    One page of ``kind`` hits for a picker: ``(hits, has_more)``.
+
+    Deep pages are capped at ``AUTOCOMPLETE_MAX_PAGES``; a picker user who
+    has not found the row by then should type more.
+    """
+    page = max(1, min(page, AUTOCOMPLETE_MAX_PAGES))
+    hits = search(query, kinds=[kind], limit=page_size + 1, offset=(page - 1) * page_size)
+    has_more = len(hits) > page_size and page < AUTOCOMPLETE_MAX_PAGES
+    return hits[:page_size], has_more
@@ -0,0 +1,115 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from academic.models import Class, Subject
+from student.models import StudentFeedback, StudentInfo, StudentLeave, StudentNotification
+from teacher.models import Assignment, Feedback, TeacherInfo, TeacherLeave, TeacherNotification
+
+from .dashboard import invalidate_dashboard_stats
+from .events import feedback_event, leave_event, notification_event, publish_announcement, publish_to_users
+from .models import Announcement
+from .notifications import bump_audience_version, invalidate_unread
+from .search import index_objects, kind_for_model, remove_objects
+
+
+@receiver([post_save, post_delete], sender=StudentInfo)
+@receiver([post_save, post_delete], sender=TeacherInfo)
+@receiver([post_save, post_delete], sender=Class)
+@receiver([post_save, post_delete], sender=Subject)
+def dashboard_data_changed(sender, **kwargs):
+    # Invalidate after commit so a concurrent refresh cannot re-cache pre-commit counts.
+    transaction.on_commit(invalidate_dashboard_stats)
+
+
+@receiver(post_save, sender=StudentInfo)
+@receiver(post_save, sender=TeacherInfo)
+@receiver(post_save, sender=Assignment)
+@receiver(post_save, sender=StudentNotification)
+@receiver(post_save, sender=TeacherNotification)
+def search_document_saved(sender, instance, **kwargs):
+    item = kind_for_model(sender)
+    pk = instance.pk
+    # Re-read after commit so the row carries the related names its document needs.
+    transaction.on_commit(lambda: index_objects(item.kind, item.queryset().filter(pk=pk)))
+
+
+@receiver(post_delete, sender=StudentInfo)
+@receiver(post_delete, sender=TeacherInfo)
+@receiver(post_delete, sender=Assignment)
+@receiver(post_delete, sender=StudentNotification)
+@receiver(post_delete, sender=TeacherNotification)
+def search_document_deleted(sender, instance, **kwargs):
+    item = kind_for_model(sender)
+    pk = instance.pk
+    transaction.on_commit(lambda: remove_objects(item.kind, [pk]))
+
+
+def _user_id(model, pk):
+    return model.objects.filter(pk=pk).values_list('user_id', flat=True).first()
+
+
+def _notify_recipient(profile_model, profile_id, event=None):
+    """After commit: reset the recipient's unread counter and push ``event`` live."""
+    def run():
+        user_id = _user_id(profile_model, profile_id)
+        if user_id:
+            invalidate_unread(user_id)
+            if event is not None:
+                publish_to_users([user_id], event)
+
+    transaction.on_commit(run)
+
+
+@receiver([post_save, post_delete], sender=StudentNotification)
+def student_notification_changed(sender, instance, created=False, **kwargs):
+    event = notification_event('direct', instance.pk, instance.subject, instance.created_at) if created else None
+    _notify_recipient(StudentInfo, instance.student_id, event)
+
+
+@receiver([post_save, post_delete], sender=TeacherNotification)
+def teacher_notification_changed(sender, instance, created=False, **kwargs):
+    event = notification_event('direct', instance.pk, instance.subject, instance.created_at) if created else None
+    _notify_recipient(TeacherInfo, instance.teacher_id_id, event)
+
+
+@receiver([post_save, post_delete], sender=Announcement)
+def announcement_changed(sender, instance, created=False, **kwargs):
+    def run():
+        # One version bump invalidates the cached counter of everyone in the audience.
+        bump_audience_version(instance.audience)
+        if created:
+            publish_announcement(instance)
+
+    transaction.on_commit(run)
+
+
+@receiver(post_save, sender=StudentLeave)
+@receiver(post_save, sender=TeacherLeave)
+def leave_status_changed(sender, instance, created, **kwargs):
+    if created or not instance.status_changed_at:
+        return
+    if sender is StudentLeave:
+        _notify_recipient(StudentInfo, instance.student_id, leave_event(instance))
+    else:
+        _notify_recipient(TeacherInfo, instance.teacher_id, leave_event(instance))
+
+
+@receiver(post_save, sender=StudentFeedback)
+@receiver(post_save, sender=Feedback)
+def feedback_replied(sender, instance, created, update_fields=None, **kwargs):
+    if created or not instance.feedback_reply:
+        return
+    if update_fields is not None and 'feedback_reply' not in update_fields:
+        return
+    if sender is StudentFeedback:
+        _notify_recipient(StudentInfo, instance.student_id, feedback_event(instance))
+    else:
+        _notify_recipient(TeacherInfo, instance.teacher_id, feedback_event(instance))
+
+
+@receiver(post_save, sender=StudentInfo)
+def student_audience_changed(sender, instance, **kwargs):
+    # A class/section/session change changes which announcements match.
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_unread(user_id))
@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .digests import DEFAULT_WINDOW, send_digests
+from .jobs import task
+from .models import Job
+from .search import KINDS_BY_NAME, index_objects
+
+
+DEFAULT_JOB_RETENTION = timedelta(days=7)
+
+
+@task
+def index_search_documents(kind, object_ids):
+    """Refresh the search documents of ``object_ids`` (e.g. after a bulk import)."""
+    item = KINDS_BY_NAME[kind]
+    index_objects(kind, item.queryset().filter(pk__in=object_ids))
+
+
+@task(every=getattr(settings, 'DIGEST_WINDOW', DEFAULT_WINDOW), max_attempts=1)
+def send_notification_digests():
+    # Not retried: a failed run leaves its recipients for the next one.
+    return send_digests().summary()
+
+
+@task(every=timedelta(days=1))
+def prune_jobs():
+    """Delete finished jobs older than ``JOB_RETENTION`` (default 7 days)."""
+    cutoff = timezone.now() - getattr(settings, 'JOB_RETENTION', DEFAULT_JOB_RETENTION)
+    Job.objects.filter(status__in=[Job.STATUS_DONE, Job.STATUS_FAILED], finished_at__lt=cutoff).delete()
@@ -1,3 +1,763 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.contrib.sessions.models import Session as UserSession
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection, connections, router, transaction
+from django.http import Http404, HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import get_script_prefix, reverse
+from django.utils import timezone
+
+from academic.models import Class, Session, Subject
+from account.models import IdSequence, User
+from myproject.routers import (
+    PIN_COOKIE, REPLICA_ALIAS, PrimaryPinMiddleware, ReplicaRouter, reads_from_replica, replica_usable, use_primary,
+    use_replica,
+)
+from myproject.sqlite import lock_stats, profile_options
+from myproject.sqlite.base import DatabaseWrapper
+from myproject.tenancy import tenant_alias
+from myproject.tenancy.context import UnknownTenant, cache_key, current_tenant, use_tenant
+from myproject.tenancy.middleware import TenantMiddleware, resolve_tenant
+from student.models import StudentInfo, StudentNotification
+from teacher.models import Attendance, TeacherInfo
+
+from . import importers
+from .jobs import _claim, claim_next, enqueue, execute, recover_stale, retry_delay, task
+from .models import Announcement, Job
+from .notifications import compute_unread_summary, mark_read, recipient_for
+from .search import KIND_SHIFT, KINDS, Fts5Backend, index_objects, remove_objects, search
+
+
+calls = []
+
+
+@task(max_attempts=2)
+def record_call(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def always_fail():
+    raise RuntimeError('boom')
+
+
+@override_settings(JOBS_EAGER=False, JOB_RETRY_BACKOFF=10, JOB_MAX_BACKOFF=60, JOB_LOCK_TIMEOUT=600)
+class JobTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_claim_is_won_once(self):
+        job = record_call.delay(1)
+
+        claimed = _claim(job.pk, 'worker-a', timezone.now())
+        self.assertIsNone(_claim(job.pk, 'worker-b', timezone.now()))
+
+        self.assertEqual((claimed.status, claimed.locked_by, claimed.attempts), (Job.STATUS_RUNNING, 'worker-a', 1))
+
+    def test_claim_next_takes_due_jobs_by_priority(self):
+        low = record_call.delay('low')
+        high = enqueue(record_call, 'high', priority=5)
+        enqueue(record_call, 'later', priority=9, delay=timedelta(hours=1))
+
+        self.assertEqual(claim_next('worker').pk, high.pk)
+        self.assertEqual(claim_next('worker').pk, low.pk)
+        self.assertIsNone(claim_next('worker'))
+
+    def test_successful_job_is_done(self):
+        record_call.delay(7)
+        job = claim_next('worker')
+
+        self.assertTrue(execute(job, 'worker'))
+
+        job.refresh_from_db()
+        self.assertEqual(calls, [7])
+        self.assertEqual((job.status, job.locked_by), (Job.STATUS_DONE, ''))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failure_is_retried_with_backoff_then_failed(self):
+        always_fail.delay()
+        job = claim_next('worker')
+        before = timezone.now()
+
+        with self.assertLogs('administration.jobs', 'ERROR'):
+            self.assertFalse(execute(job, 'worker'))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_QUEUED, 1))
+        self.assertIn('boom', job.last_error)
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=10))
+        self.assertIsNone(claim_next('worker'))
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        job = claim_next('worker')
+        with self.assertLogs('administration.jobs', 'ERROR'):
+            execute(job, 'worker')
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_FAILED, 2))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_retry_delay_doubles_up_to_the_cap(self):
+        self.assertEqual(
+            [retry_delay(attempts).total_seconds() for attempts in range(1, 6)],
+            [10, 20, 40, 60, 60],
+        )
+
+    def test_expired_lease_counts_as_a_failed_attempt(self):
+        job = record_call.delay(1)
+        _claim(job.pk, 'lost-worker', timezone.now() - timedelta(seconds=601))
+        fresh = record_call.delay(2)
+        _claim(fresh.pk, 'live-worker', timezone.now())
+
+        self.assertEqual(recover_stale(), 1)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_by), (Job.STATUS_QUEUED, 1, ''))
+        self.assertIn('lost-worker', job.last_error)
+        self.assertEqual(Job.objects.get(pk=fresh.pk).status, Job.STATUS_RUNNING)
+
+    def test_expired_lease_on_the_last_attempt_fails_the_job(self):
+        job = record_call.delay(1)
+        Job.objects.filter(pk=job.pk).update(attempts=1)
+        _claim(job.pk, 'lost-worker', timezone.now() - timedelta(seconds=601))
+
+        recover_stale()
+
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.STATUS_FAILED)
+
+    def test_worker_that_lost_its_lease_cannot_finish_the_job(self):
+        job = record_call.delay(1)
+        stale = _claim(job.pk, 'lost-worker', timezone.now() - timedelta(seconds=601))
+        recover_stale()
+        _claim(job.pk, 'new-worker', timezone.now())
+
+        execute(stale, 'lost-worker')
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), (Job.STATUS_RUNNING, 'new-worker'))
+
+    def test_unique_key_keeps_one_active_job(self):
+        first = enqueue(record_call, 1, unique_key='refresh')
+        self.assertEqual(enqueue(record_call, 2, unique_key='refresh').pk, first.pk)
+
+        execute(claim_next('worker'), 'worker')
+        self.assertNotEqual(enqueue(record_call, 3, unique_key='refresh').pk, first.pk)
+
+    def test_eager_job_runs_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = record_call.delay(5, eager=True)
+            self.assertEqual(calls, [])
+
+        self.assertEqual(calls, [5])
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.STATUS_DONE)
+
+    def test_delayed_job_is_never_eager(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            delayed = record_call.delay(1, eager=True, delay=timedelta(minutes=5))
+            scheduled = enqueue(record_call, 2, eager=True, run_at=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual((callbacks, calls), ([], []))
+        for job in (delayed, scheduled):
+            self.assertEqual(Job.objects.get(pk=job.pk).status, Job.STATUS_QUEUED)
+
+
+@override_settings(JOBS_EAGER=False)
+class ConcurrentClaimTests(TransactionTestCase):
+    THREADS = 4
+    JOBS = 20
+
+    def setUp(self):
+        if connection.is_in_memory_db():
+            self.skipTest('Needs a test database file that several connections can share.')
+
+    def test_every_job_is_claimed_exactly_once(self):
+        for value in range(self.JOBS):
+            record_call.delay(value)
+        claimed = []
+        errors = []
+        start = threading.Barrier(self.THREADS)
+
+        def worker(worker_id):
+            try:
+                start.wait()
+                while (job := claim_next(worker_id)) is not None:
+                    claimed.append(job.pk)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(f'worker-{index}',)) for index in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(claimed), sorted(Job.objects.values_list('pk', flat=True)))
+        self.assertFalse(Job.objects.exclude(attempts=1).exists())
+
+
+class SearchRowidTests(TestCase):
+    def setUp(self):
+        if not Fts5Backend().available():
+            self.skipTest('SQLite was built without FTS5.')
+
+    def test_rowid_keeps_kind_and_id_apart(self):
+        mask = (1 << KIND_SHIFT) - 1
+        for item in KINDS:
+            for pk in [1, 12345, mask]:
+                with self.subTest(kind=item.kind, pk=pk):
+                    rowid = item.rowid(pk)
+                    self.assertEqual((rowid >> KIND_SHIFT, rowid & mask), (item.code, pk))
+                    self.assertLess(rowid, 1 << 63)
+        self.assertEqual(len({item.code for item in KINDS}), len(KINDS))
+
+    def test_same_id_in_two_kinds_are_separate_rows(self):
+        student = StudentInfo.objects.create(
+            id=2 ** 33, user=User.objects.create(username='student1', user_type='Student'),
+            first_name='Rakib', last_name='Hasan',
+        )
+        teacher = TeacherInfo.objects.create(
+            id=2 ** 33, user=User.objects.create(username='teacher1', user_type='Teacher'),
+            first_name='Rakib', last_name='Uddin', email='rakib@example.com',
+        )
+        index_objects('student', [student])
+        index_objects('teacher', [teacher])
+        # Re-indexing replaces the row instead of adding a second one.
+        index_objects('student', [student])
+
+        hits = search('rak')
+        self.assertEqual(sorted((hit.kind, hit.object_id) for hit in hits), [
+            ('student', 2 ** 33), ('teacher', 2 ** 33),
+        ])
+
+        remove_objects('student', [student.pk])
+        self.assertEqual([(hit.kind, hit.object_id) for hit in search('rak')], [('teacher', 2 ** 33)])
+
+
+class UnreadSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.one = Class.objects.create(name='One', class_code=1)
+        cls.two = Class.objects.create(name='Two', class_code=2)
+        cls.user = User.objects.create(
+            username='student1', user_type='Student', date_joined=timezone.now() - timedelta(days=1),
+        )
+        cls.student = StudentInfo.objects.create(user=cls.user, klass=cls.one, first_name='S', last_name='One')
+
+    def summary(self):
+        return compute_unread_summary(self.user, *recipient_for(self.user))
+
+    def direct(self, subject):
+        return StudentNotification.objects.create(student=self.student, subject=subject, message='-')
+
+    def test_items_read_one_by_one_are_not_counted(self):
+        first, second = self.direct('first'), self.direct('second')
+        mark_read(self.user, *recipient_for(self.user), [('direct', first.pk)])
+
+        summary = self.summary()
+
+        self.assertEqual(summary['count'], 1)
+        self.assertEqual([item['id'] for item in summary['recent']], [second.pk])
+
+    def test_read_items_that_left_the_inbox_do_not_lower_the_count(self):
+        gone = self.direct('deleted later')
+        class_news = Announcement.objects.create(
+            audience=Announcement.AUDIENCE_STUDENTS, klass=self.one, subject='class one', message='-',
+        )
+        mark_read(self.user, *recipient_for(self.user), [('direct', gone.pk), ('announcement', class_news.pk)])
+        unread = self.direct('still unread')
+
+        gone.delete()
+        StudentInfo.objects.filter(pk=self.student.pk).update(klass=self.two)
+
+        summary = self.summary()
+        self.assertEqual(summary['count'], 1)
+        self.assertEqual([item['id'] for item in summary['recent']], [unread.pk])
+
+
+class SqliteProductionProfileTests(TransactionTestCase):
+    WRITERS = 8
+    TRANSACTIONS = 5
+
+    def setUp(self):
+        if connection.is_in_memory_db() or connection.settings_dict['OPTIONS'].get('transaction_mode') != 'IMMEDIATE':
+            self.skipTest('Needs a test database file under the production SQLite profile.')
+        lock_stats.reset()
+
+    def hold_write_lock(self, seconds=None):
+        """Start a thread that holds the write lock; returns (held, release) events."""
+        held, release = threading.Event(), threading.Event()
+
+        def holder():
+            try:
+                with transaction.atomic():
+                    Job.objects.create(task='holder', run_at=timezone.now())
+                    held.set()
+                    release.wait(seconds)
+            finally:
+                connection.close()
+
+        threading.Thread(target=holder).start()
+        held.wait()
+        return release
+
+    def test_concurrent_read_then_write_transactions_all_commit(self):
+        errors = []
+        start = threading.Barrier(self.WRITERS)
+
+        def writer(number):
+            try:
+                start.wait()
+                for _ in range(self.TRANSACTIONS):
+                    # Read, then write: under BEGIN DEFERRED the upgrade fails at once.
+                    with transaction.atomic():
+                        seen = Job.objects.filter(task=f'writer-{number}').count()
+                        Job.objects.create(task=f'writer-{number}', args=[seen], run_at=timezone.now())
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        # The writers start while another transaction holds the lock, so they queue for it.
+        self.hold_write_lock(seconds=0.2)
+        threads = [threading.Thread(target=writer, args=(number,)) for number in range(self.WRITERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        for number in range(self.WRITERS):
+            seen = sorted(Job.objects.filter(task=f'writer-{number}').values_list('args', flat=True))
+            self.assertEqual(seen, [[index] for index in range(self.TRANSACTIONS)])
+        stats = lock_stats.snapshot()
+        self.assertGreaterEqual(stats['transactions'], self.WRITERS * self.TRANSACTIONS)
+        self.assertGreaterEqual(stats['waits'], 1)
+        self.assertEqual(stats['failures'], 0)
+
+    def impatient_connection(self):
+        """A second connection to the test database that waits 50 ms per BEGIN, twice retried."""
+        options = profile_options('production', timeout=0.05, lock_retries=2)
+        connections['impatient'] = DatabaseWrapper({**connection.settings_dict, 'OPTIONS': options}, 'impatient')
+        self.addCleanup(connections.__delitem__, 'impatient')
+        self.addCleanup(connections['impatient'].close)
+
+    def write_impatiently(self):
+        with transaction.atomic(using='impatient'):
+            Job.objects.using('impatient').create(task='impatient', run_at=timezone.now())
+
+    def test_begin_is_retried_while_the_lock_is_held(self):
+        self.impatient_connection()
+        self.hold_write_lock(seconds=0.1)
+
+        self.write_impatiently()
+
+        stats = lock_stats.snapshot()
+        self.assertGreaterEqual(stats['retries'], 1)
+        self.assertEqual(stats['failures'], 0)
+        self.assertTrue(Job.objects.filter(task='impatient').exists())
+
+    def test_begin_gives_up_after_the_retries(self):
+        self.impatient_connection()
+        release = self.hold_write_lock()
+        try:
+            with self.assertRaises(OperationalError):
+                self.write_impatiently()
+        finally:
+            release.set()
+
+        stats = lock_stats.snapshot()
+        self.assertEqual((stats['retries'], stats['failures']), (2, 1))
+
+
+class AttendanceOverviewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin1', user_type='Admin')
+        teacher = TeacherInfo.objects.create(
+            user=User.objects.create(username='teacher1', user_type='Teacher'),
+            first_name='T', last_name='One', email='t@example.com',
+        )
+        klass = Class.objects.create(name='One', class_code=1)
+        session = Session.objects.create(name='2025', start_date=date(2025, 1, 1), end_date=date(2025, 12, 31))
+        subjects = [Subject.objects.create(name=f'S{index}', code=f'S{index}') for index in range(2)]
+        # Two sheets a day, so the pages split inside a date.
+        Attendance.objects.bulk_create([
+            Attendance(teacher=teacher, klass=klass, session=session, subject=subject, date=date(2025, 3, day))
+            for day in range(1, 16)
+            for subject in subjects
+        ])
+
+    def get(self, query=''):
+        self.client.force_login(self.admin)
+        return self.client.get(f"{reverse('admin_attendance')}?{query}")
+
+    def test_pages_walk_newest_first_without_gaps(self):
+        expected = list(Attendance.objects.order_by('-date', '-created_at', '-id').values_list('id', flat=True))
+
+        first = self.get().context['page']
+        second = self.get(first.next_query).context['page']
+        back = self.get(second.previous_query).context['page']
+
+        self.assertEqual([item.id for item in first] + [item.id for item in second], expected)
+        self.assertEqual((len(first), len(second)), (25, 5))
+        self.assertFalse(second.has_next)
+        self.assertEqual([item.id for item in back], [item.id for item in first])
+
+    def test_page_keeps_the_filters(self):
+        subject = Subject.objects.get(name='S0')
+        page = self.get(f'subject={subject.id}&per_page=10').context['page']
+
+        self.assertIn(f'subject={subject.id}', page.next_query)
+        self.assertEqual(
+            [item.id for item in self.get(page.next_query).context['page']],
+            list(Attendance.objects.filter(subject=subject).order_by('-date', '-id').values_list('id', flat=True)[10:]),
+        )
+
+    def test_tampered_cursor_starts_from_the_top(self):
+        response = self.get('after=eyJhIjogMX0')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page']), 25)
+
+
+class TenancyTests(TransactionTestCase):
+    """A real second school: its own migrated database file next to the test database."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        path = f'{cls.directory}/north.sqlite3'
+        cls.tenants = override_settings(TENANTS={'north': path}, TENANT_HOSTS={'north.example.edu': 'north'},
+                                        TENANT_DOMAIN='schools.example.edu')
+        cls.tenants.enable()
+        alias = tenant_alias('north')
+        connections[alias] = DatabaseWrapper({**connection.settings_dict, 'NAME': path}, alias)
+        call_command('migrate', database=alias, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[tenant_alias('north')].close()
+        del connections[tenant_alias('north')]
+        cls.tenants.disable()
+        shutil.rmtree(cls.directory)
+        super().tearDownClass()
+
+    def tearDown(self):
+        with use_tenant('north'):
+            User.objects.all().delete()
+        cache.clear()
+
+    def test_schools_do_not_see_each_other(self):
+        User.objects.create(username='home')
+        with use_tenant('north'):
+            self.assertEqual(current_tenant(), 'north')
+            self.assertEqual(list(User.objects.values_list('username', flat=True)), [])
+            User.objects.create(username='north-only')
+        self.assertIsNone(current_tenant())
+        self.assertEqual(list(User.objects.values_list('username', flat=True)), ['home'])
+
+    def test_raw_sql_and_transactions_follow_the_school(self):
+        committed = []
+        with use_tenant('north'):
+            with transaction.atomic():
+                User.objects.create(username='north')
+                transaction.on_commit(lambda: committed.append(User.objects.count()))
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT username FROM account_user')
+                self.assertEqual(cursor.fetchall(), [('north',)])
+        self.assertEqual(committed, [1])
+        self.assertFalse(User.objects.exists())
+
+    def test_nested_default_school_and_back(self):
+        User.objects.create(username='home')
+        with use_tenant('north'):
+            with use_tenant(None):
+                self.assertIsNone(current_tenant())
+                self.assertEqual(connection.settings_dict['NAME'], connections['default'].settings_dict['NAME'])
+                self.assertEqual(list(User.objects.values_list('username', flat=True)), ['home'])
+            self.assertEqual(current_tenant(), 'north')
+            self.assertFalse(User.objects.exists())
+        self.assertTrue(User.objects.filter(username='home').exists())
+
+    def test_unknown_school_is_refused(self):
+        with self.assertRaises(UnknownTenant):
+            with use_tenant('south'):
+                pass
+
+    def test_cache_keys_are_scoped_to_the_school(self):
+        self.assertEqual(cache_key('k', 'p', 1), 'p:1:k')
+        cache.set('unread', 'home')
+        with use_tenant('north'):
+            self.assertEqual(cache_key('k', 'p', 1), 'p:1:@north:k')
+            self.assertIsNone(cache.get('unread'))
+            cache.set('unread', 'north')
+        self.assertEqual(cache.get('unread'), 'home')
+
+    def test_resolution_by_host_subdomain_and_path(self):
+        self.assertEqual(resolve_tenant('north.example.edu:8000', '/dashboard/'), ('north', ''))
+        self.assertEqual(resolve_tenant('north.schools.example.edu', '/'), ('north', ''))
+        self.assertEqual(resolve_tenant('localhost', '/north/dashboard/'), ('north', '/north'))
+        self.assertEqual(resolve_tenant('localhost', '/dashboard/'), (None, ''))
+        with self.assertRaises(Http404):
+            resolve_tenant('south.schools.example.edu', '/')
+
+    def test_middleware_strips_the_path_prefix(self):
+        seen = {}
+
+        def view(request):
+            seen.update(
+                tenant=current_tenant(), path_info=request.path_info, prefix=get_script_prefix(),
+                users=User.objects.count(),
+            )
+            return HttpResponse()
+
+        User.objects.create(username='home')
+        TenantMiddleware(view)(RequestFactory().get('/north/dashboard/'))
+
+        self.assertEqual(seen, {'tenant': 'north', 'path_info': '/dashboard/', 'prefix': '/north/', 'users': 0})
+        self.assertEqual(get_script_prefix(), '/')
+
+    def test_tenants_command_runs_once_per_school(self):
+        with use_tenant('north'):
+            User.objects.create(username='admin1')
+        out = StringIO()
+
+        call_command('tenants', stdout=out)
+        self.assertIn('north', out.getvalue())
+
+        call_command('tenants', '--tenant', 'north', 'rebuild_search_index', stdout=out)
+        self.assertIn('rebuild_search_index ran for 1 schools.', out.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command('tenants', '--tenant', 'south', 'check', stdout=out)
+
+
+@override_settings(REPLICA_MAX_LAG=300)
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.snapshot = f'{directory}/db.replica.sqlite3'
+        replica = override_settings(REPLICA_DATABASE=self.snapshot)
+        replica.enable()
+        self.addCleanup(replica.disable)
+
+    def take_snapshot(self, age=0):
+        open(self.snapshot, 'w').close()
+        taken = time.time() - age
+        os.utime(self.snapshot, (taken, taken))
+        return taken
+
+    def read_alias(self, request):
+        @reads_from_replica
+        def view(request):
+            return HttpResponse(router.db_for_read(User) or 'default')
+
+        return view(request).content.decode()
+
+    def test_replica_needs_a_fresh_snapshot_newer_than_the_pin(self):
+        self.assertFalse(replica_usable())
+        taken = self.take_snapshot()
+        self.assertTrue(replica_usable())
+        self.assertTrue(replica_usable(pinned_at=taken - 1))
+        self.assertFalse(replica_usable(pinned_at=taken + 1))
+        self.take_snapshot(age=301)
+        self.assertFalse(replica_usable())
+
+    def test_replica_is_never_used_for_another_school(self):
+        self.take_snapshot()
+        with mock.patch('myproject.routers.current_tenant', return_value='north'):
+            self.assertFalse(replica_usable())
+
+    def test_router_sends_reads_where_the_block_says_and_writes_to_the_primary(self):
+        self.take_snapshot()
+        replica = ReplicaRouter()
+        self.assertIsNone(replica.db_for_read(User))
+        with use_replica():
+            self.assertEqual(replica.db_for_read(User), REPLICA_ALIAS)
+            self.assertEqual(replica.db_for_read(UserSession), 'default')
+            self.assertEqual(replica.db_for_write(User), 'default')
+            with use_primary():
+                self.assertIsNone(replica.db_for_read(User))
+            self.assertEqual(replica.db_for_read(User), REPLICA_ALIAS)
+        self.assertIsNone(replica.db_for_read(User))
+        self.assertFalse(replica.allow_migrate(REPLICA_ALIAS, 'account'))
+        self.assertIsNone(replica.allow_migrate('default', 'account'))
+
+    def test_only_safe_requests_read_the_replica(self):
+        self.take_snapshot()
+        factory = RequestFactory()
+        self.assertEqual(self.read_alias(factory.get('/')), REPLICA_ALIAS)
+        self.assertEqual(self.read_alias(factory.head('/')), REPLICA_ALIAS)
+        self.assertEqual(self.read_alias(factory.post('/')), 'default')
+
+    def test_a_write_pins_reads_to_the_primary_until_the_next_snapshot(self):
+        self.take_snapshot(age=10)
+        # The write happened five seconds ago, so a snapshot taken now is newer.
+        with mock.patch('myproject.routers.time.time', return_value=time.time() - 5):
+            response = PrimaryPinMiddleware(lambda request: HttpResponse())(RequestFactory().post('/'))
+        pin = response.cookies[PIN_COOKIE]
+        self.assertTrue(pin['httponly'])
+        self.assertEqual(pin['max-age'], 300)
+
+        request = RequestFactory().get('/')
+        request.COOKIES[PIN_COOKIE] = pin.value
+        self.assertEqual(self.read_alias(request), 'default')
+        self.assertNotIn(PIN_COOKIE, PrimaryPinMiddleware(lambda request: HttpResponse())(request).cookies)
+
+        self.take_snapshot()
+        self.assertEqual(self.read_alias(request), REPLICA_ALIAS)
+
+    def test_garbage_pin_is_ignored(self):
+        self.take_snapshot()
+        request = RequestFactory().get('/')
+        request.COOKIES[PIN_COOKIE] = 'soon'
+        self.assertEqual(self.read_alias(request), REPLICA_ALIAS)
+
+    def test_site_pins_after_a_post(self):
+        response = self.client.post(reverse('user_login'), {'username': 'nobody', 'password': 'x'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertNotIn(PIN_COOKIE, self.client.get(reverse('login_page')).cookies)
+
+
+def sheet(*rows):
+    return BytesIO('\n'.join(rows).encode())
+
+
+STUDENT_HEADER = 'first_name,last_name,class,session,date_of_birth,gender'
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportUsersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Class.objects.create(name='One', class_code=1)
+        Session.objects.create(name='2025', start_date=date(2025, 1, 1), end_date=date(2025, 12, 31))
+        cls.admin = User.objects.create(username='admin1', user_type='Admin')
+
+    def run_import(self, file, kind='student', **options):
+        return importers.import_users(importers.read_rows(file, 'users.csv'), kind, **options)
+
+    def students(self, count):
+        return [f'S{index},X,One,2025,,' for index in range(count)]
+
+    def test_rows_are_written_a_chunk_at_a_time(self):
+        with mock.patch('administration.importers._write_students', wraps=importers._write_students) as write:
+            report = self.run_import(sheet(STUDENT_HEADER, *self.students(5)), chunk_size=2, workers=1)
+
+        self.assertEqual([len(call.args[0]) for call in write.call_args_list], [2, 2, 1])
+        self.assertEqual(report.errors, [])
+        self.assertEqual([entry['row'] for entry in report.created], [2, 3, 4, 5, 6])
+        self.assertEqual(len({entry['username'] for entry in report.created}), 5)
+        self.assertEqual(StudentInfo.objects.count(), 5)
+
+    def test_a_failed_chunk_is_rolled_back_and_reported_row_by_row(self):
+        write_students = importers._write_students
+
+        def write(entries, usernames, hashes):
+            if entries[0]['row'] == 4:
+                raise RuntimeError('disk full')
+            return write_students(entries, usernames, hashes)
+
+        with mock.patch('administration.importers._write_students', side_effect=write):
+            report = self.run_import(sheet(STUDENT_HEADER, *self.students(5)), chunk_size=2, workers=1)
+
+        self.assertEqual(report.errors, [(4, 'Batch write failed: disk full'), (5, 'Batch write failed: disk full')])
+        self.assertEqual(
+            sorted(StudentInfo.objects.values_list('first_name', flat=True)), ['S0', 'S1', 'S4'],
+        )
+
+    def test_dry_run_validates_without_writing_or_reserving(self):
+        sequences = list(IdSequence.objects.values_list('key', 'last_value'))
+        report = self.run_import(sheet(STUDENT_HEADER, *self.students(3), ',X,One,2025,,'), dry_run=True)
+
+        self.assertEqual((report.total_rows, report.valid_rows, report.created), (4, 3, []))
+        self.assertEqual(report.errors, [(5, 'first_name is required.')])
+        self.assertIn('3 students validated', report.summary())
+        self.assertFalse(User.objects.filter(user_type='Student').exists())
+        self.assertEqual(list(IdSequence.objects.values_list('key', 'last_value')), sequences)
+
+    def test_each_bad_row_is_reported_with_its_row_number(self):
+        report = self.run_import(sheet(
+            STUDENT_HEADER,
+            'Ann,X,Two,2025,,',
+            'Bob,X,One,1999,,',
+            'Cid,X,One,2025,03/01/2010,',
+            'Dee,X,One,2025,,Robot',
+            'Eve,X,One,2025,2010-03-01,female',
+        ), workers=1)
+
+        self.assertEqual(report.errors, [
+            (2, 'Unknown class "Two".'),
+            (3, 'Unknown session "1999".'),
+            (4, 'date_of_birth must be a date in YYYY-MM-DD format.'),
+            (5, 'Unknown gender "Robot".'),
+        ])
+        self.assertEqual(StudentInfo.objects.get().first_name, 'Eve')
+
+    def test_teacher_emails_must_be_unique(self):
+        User.objects.create(username='taken', email='taken@example.com')
+        report = self.run_import(sheet(
+            'first_name,email',
+            'Ann,ann@example.com',
+            'Ann,ANN@example.com',
+            'Tom,taken@example.com',
+        ), kind='teacher', workers=1)
+
+        self.assertEqual(report.errors, [
+            (3, 'Email "ANN@example.com" appears more than once in the file.'),
+            (4, 'Email "taken@example.com" already exists.'),
+        ])
+        self.assertEqual(list(TeacherInfo.objects.values_list('email', flat=True)), ['ann@example.com'])
+
+    def test_pool_starts_only_for_a_large_chunk(self):
+        with mock.patch('administration.importers.ProcessPoolExecutor') as pool:
+            pool.return_value.map.side_effect = lambda function, items, chunksize: map(function, items)
+            self.run_import(sheet(STUDENT_HEADER, *self.students(3)))
+            pool.assert_not_called()
+
+            with mock.patch('administration.importers.POOL_MIN_ROWS', 3):
+                self.run_import(sheet(STUDENT_HEADER, *self.students(3)), workers=2)
+            pool.assert_called_once_with(max_workers=2)
+            pool.return_value.shutdown.assert_called_once()
+
+    def test_upload_page_caps_the_pool(self):
+        self.client.force_login(self.admin)
+        upload = SimpleUploadedFile('users.csv', sheet(STUDENT_HEADER, *self.students(3)).getvalue())
+
+        with mock.patch('administration.views.run_import', wraps=importers.import_users) as run_import:
+            response = self.client.post(reverse('import_users'), {'kind': 'student', 'file': upload})
+
+        self.assertEqual(response.context['report'].errors, [])
+        self.assertEqual(run_import.call_args.kwargs['workers'], importers.WEB_WORKERS)
+        self.assertEqual(StudentInfo.objects.count(), 3)
+
+    def test_command_writes_the_error_report(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with open(f'{directory}/users.csv', 'w') as handle:
+            handle.write('\n'.join([STUDENT_HEADER, 'Ann,X,Two,2025,,', 'Bob,X,One,2025,,']))
+
+        call_command(
+            'import_users', f'{directory}/users.csv', '--workers', '1', '--errors', f'{directory}/errors.csv',
+            '--credentials', f'{directory}/credentials.csv', stdout=StringIO(),
+        )
+
+        with open(f'{directory}/errors.csv') as handle:
+            self.assertEqual(handle.read().splitlines(), ['row,error', '2,"Unknown class ""Two""."'])
+        with open(f'{directory}/credentials.csv') as handle:
+            self.assertIn(',Bob X,', handle.read())
@@ -10,11 +10,20 @@ urlpatterns = [
     path('admin-edit/<int:id>/', admin_edit, name='admin_edit'),
     path('admin-delete/<int:id>/', admin_delete, name='admin_delete'),
 
+    path('import-users/', import_users, name='import_users'),
+    path('search/', global_search, name='global_search'),
+    path('autocomplete/students/', student_autocomplete, name='student_autocomplete'),
+    path('autocomplete/teachers/', teacher_autocomplete, name='teacher_autocomplete'),
+    path('database/status/', database_status, name='database_status'),
+
     path('attendance/', attendance_overview, name='admin_attendance'),
     path('send-teacher-notification/', send_teacher_notification, name='send_teacher_notification'),
     path('view-teacher-notifications/', view_teacher_notifications, name='view_teacher_notifications'),
     path('send-student-notification/', send_student_notification, name='send_student_notification'),
     path('view-student-notifications/', view_student_notifications, name='view_student_notifications'),
+    path('announcements/', send_announcement, name='send_announcement'),
+    path('notifications/mark-read/', mark_notifications_read, name='mark_notifications_read'),
+    path('notifications/stream/', notification_stream, name='notification_stream'),
     path('teacher-leave/', teacher_leave, name='teacher_leave'),
     path('student-leave/', student_leave, name='student_leave'),
     path('teacher-feedback/', teacher_feedback_admin, name='teacher_feedback_admin'),
@@ -1,27 +1,44 @@
+import asyncio
 import json
 import secrets
 import string
-from datetime import datetime
+from datetime import datetime, timedelta
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count
-from django.http import HttpResponseForbidden
+from django.db import connection
+from django.db.models import Count, Sum
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST
 
 from account.models import User
-from academic.models import Class, Section, Session, Subject
+from account.sequences import allocate_usernames, peek_username
+from academic.cache import get_reference_data
+from myproject.listing import ListFilter, ListSpec
+from myproject.routers import reads_from_replica
+from myproject.sqlite import lock_stats
+from myproject.tenancy.context import current_tenant, in_tenant
 from student.models import StudentFeedback, StudentInfo, StudentLeave, StudentNotification
 from teacher.models import (
     Attendance,
-    AttendanceRecord,
     Feedback,
     TeacherInfo,
     TeacherLeave,
     TeacherNotification,
 )
 
-from .models import AdminProfile
+from .dashboard import get_dashboard_stats
+from . import events
+from .importers import KINDS, WEB_WORKERS, ImportFileError, import_users as run_import, read_rows
+from .models import AdminProfile, Announcement
+from .notifications import mark_all_read, mark_read, recipient_for
+from .search import KINDS as SEARCH_KINDS, autocomplete, search as run_search
 
 
 def _parse_int(value):
@@ -31,27 +48,87 @@ def _parse_int(value):
         return None
 
 
-def _generate_admin_username():
-    prefix = 'admin'
-    next_number = 1
-    last_admin_user = (
-        User.objects.filter(user_type='Admin', username__startswith=prefix)
-        .order_by('-id')
-        .first()
-    )
+NEWEST_FIRST = {'newest': ['-created_at', '-id'], 'oldest': ['created_at', 'id']}
 
-    if last_admin_user and last_admin_user.username.startswith(prefix):
-        try:
-            last_number = int(last_admin_user.username.replace(prefix, ''))
-            next_number = last_number + 1
-        except ValueError:
-            next_number = User.objects.filter(user_type='Admin').count() + 1
+ADMIN_LIST = ListSpec(
+    sorts=NEWEST_FIRST,
+    search=['first_name', 'last_name', 'admin_user_id', 'email', 'user__username'],
+    select_related=['user'],
+)
+
+STUDENT_NOTIFICATION_LIST = ListSpec(
+    sorts=NEWEST_FIRST,
+    search=['subject', 'student__first_name', 'student__last_name'],
+    select_related=['student', 'student__klass'],
+    only=['subject', 'message', 'created_at', 'student__first_name', 'student__last_name', 'student__klass__name'],
+)
+
+TEACHER_NOTIFICATION_LIST = ListSpec(
+    sorts=NEWEST_FIRST,
+    search=['subject', 'teacher_id__first_name', 'teacher_id__last_name'],
+    select_related=['teacher_id'],
+    only=['subject', 'message', 'created_at', 'teacher_id__first_name', 'teacher_id__last_name', 'teacher_id__email'],
+)
+
+ANNOUNCEMENT_LIST = ListSpec(
+    sorts=NEWEST_FIRST,
+    filters=[ListFilter('audience', choices=Announcement.AUDIENCE_CHOICES)],
+    search=['subject'],
+    select_related=['klass', 'section', 'session'],
+)
+
+TEACHER_LEAVE_LIST = ListSpec(
+    sorts=NEWEST_FIRST,
+    filters=[ListFilter('status', choices=TeacherLeave.STATUS)],
+    search=['teacher__first_name', 'teacher__last_name', 'teacher__teacher_user_id'],
+    select_related=['teacher'],
+    only=[
+        'leave_type', 'start_date', 'end_date', 'reason', 'status', 'created_at',
+        'teacher__first_name', 'teacher__last_name', 'teacher__teacher_user_id',
+    ],
+)
 
-    username = f'{prefix}{next_number}'
-    while User.objects.filter(username=username).exists():
-        next_number += 1
-        username = f'{prefix}{next_number}'
-    return username
+STUDENT_LEAVE_LIST = ListSpec(
+    sorts=NEWEST_FIRST,
+    filters=[ListFilter('status', choices=StudentLeave.STATUS)],
+    search=['student__first_name', 'student__last_name', 'student__student_user_id'],
+    select_related=['student'],
+    only=[
+        'leave_type', 'start_date', 'end_date', 'reason', 'status', 'created_at',
+        'student__first_name', 'student__last_name', 'student__student_user_id',
+    ],
+)
+
+TEACHER_FEEDBACK_LIST = ListSpec(
+    sorts=NEWEST_FIRST,
+    search=['feedback', 'teacher__first_name', 'teacher__last_name'],
+    select_related=['teacher'],
+    only=[
+        'feedback', 'feedback_reply', 'created_at', 'updated_at',
+        'teacher__first_name', 'teacher__last_name', 'teacher__teacher_user_id',
+    ],
+)
+
+STUDENT_FEEDBACK_LIST = ListSpec(
+    sorts=NEWEST_FIRST,
+    search=['feedback', 'student__first_name', 'student__last_name'],
+    select_related=['student'],
+    only=[
+        'feedback', 'feedback_reply', 'created_at', 'updated_at',
+        'student__first_name', 'student__last_name', 'student__student_user_id',
+    ],
+)
+
+
+# Newest sheets first; counts come from the sheets, records only for the drill-down.
+ATTENDANCE_LIST = ListSpec(
+    sorts={'newest': ['-date', '-created_at', '-id']},
+    select_related=['teacher', 'klass', 'section', 'session', 'subject'],
+)
+
+
+def _generate_admin_username():
+    return allocate_usernames('admin')[0]
 
 
 def _generate_admin_password(length=12):
@@ -61,11 +138,11 @@ def _generate_admin_password(length=12):
 
 # Create your views here.
 def register_admin(request):
-    generated_username = None
     generated_password = None
 
     if request.method == 'POST':
-        generated_username = request.POST.get('generated_username') or _generate_admin_username()
+        # Only a preview: the username is reserved when the admin is saved.
+        previewed_username = request.POST.get('username_preview')
         generated_password = request.POST.get('generated_password') or _generate_admin_password()
         try:
             # Get form data - Account Info
@@ -84,9 +161,7 @@ def register_admin(request):
             if User.objects.filter(email=email).exists():
                 messages.error(request, f'Email "{email}" already exists!')
             else:
-                username_to_use = generated_username or _generate_admin_username()
-                if User.objects.filter(username=username_to_use).exists():
-                    username_to_use = _generate_admin_username()
+                username_to_use = _generate_admin_username()
 
                 password_to_use = generated_password or _generate_admin_password()
 
@@ -122,16 +197,22 @@ def register_admin(request):
                     f'Admin {first_name} {last_name} registered successfully! '
                     f'Admin ID: {admin_profile.admin_user_id} | Username: {username_to_use} | Password: {password_to_use}'
                 )
+                if previewed_username and previewed_username != username_to_use:
+                    messages.warning(
+                        request,
+                        f'Username {previewed_username} was taken by another registration in the meantime; '
+                        f'this admin was given {username_to_use} instead.'
+                    )
                 return redirect('admin_home_page')
 
         except Exception as e:
             messages.error(request, f'Error registering admin: {str(e)}')
     else:
-        generated_username = _generate_admin_username()
         generated_password = _generate_admin_password()
 
     context = {
-        'generated_username': generated_username,
+        # Peeked fresh on every render, including after a failed submit.
+        'generated_username': peek_username('admin'),
         'generated_password': generated_password,
     }
     return render(request, 'Admin/register_admin.html', context)
@@ -139,10 +220,11 @@ def register_admin(request):
 
 def admin_list(request):
     """Display list of all admins"""
-    admins = AdminProfile.objects.all().select_related('user').order_by('-created_at')
+    page = ADMIN_LIST.paginate(request, AdminProfile.objects.all())
 
     context = {
-        'admins': admins,
+        'admins': page,
+        'page': page,
     }
 
     return render(request, 'Admin/admin_list.html', context)
@@ -162,44 +244,134 @@ def admin_detail(request, id):
 
 @login_required
 def admin_home_page(request):
-    
-    student_count = StudentInfo.objects.all().count()
-    teacher_count = TeacherInfo.objects.all().count()
-    class_count = Class.objects.all().count()
-    subject_count = Subject.objects.all().count()
-
-    class_student_data = (
-        StudentInfo.objects.filter(klass__isnull=False)
-        .values('klass__name', 'klass__class_code')
-        .annotate(total=Count('id'))
-        .order_by('klass__class_code', 'klass__name')
-    )
-
-    class_student_labels = [entry['klass__name'] for entry in class_student_data]
-    class_student_counts = [entry['total'] for entry in class_student_data]
+    stats = get_dashboard_stats()
 
     context = {
-        'student_count': student_count,
-        'teacher_count': teacher_count,
-        'class_count': class_count,
-        'subject_count': subject_count,
-        'class_student_labels': json.dumps(class_student_labels),
-        'class_student_counts': json.dumps(class_student_counts),
+        'student_count': stats['student_count'],
+        'teacher_count': stats['teacher_count'],
+        'class_count': stats['class_count'],
+        'subject_count': stats['subject_count'],
+        'class_student_labels': json.dumps(stats['class_student_labels']),
+        'class_student_counts': json.dumps(stats['class_student_counts']),
     }
 
     return render(request, 'Admin/home.html', context)
 
 
 @login_required
+def global_search(request):
+    if request.user.user_type != 'Admin':
+        return HttpResponseForbidden('Only admins can search the directory.')
+
+    query = (request.GET.get('q') or '').strip()
+    kind = request.GET.get('kind') or ''
+    limit = _parse_int(request.GET.get('limit')) or 20
+    hits = run_search(query, kinds=[kind] if kind else None, limit=limit) if query else []
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'query': query,
+            'results': [hit._asdict() for hit in hits],
+        })
+
+    context = {
+        'query': query,
+        'kind': kind,
+        'kinds': [(item.kind, item.label) for item in SEARCH_KINDS],
+        'hits': hits,
+    }
+    return render(request, 'Admin/search.html', context)
+
+
+@login_required
+def database_status(request):
+    """This process's SQLite settings and write-lock counters (JSON)."""
+    if request.user.user_type != 'Admin':
+        return JsonResponse({'error': 'Only admins can view database status.'}, status=403)
+
+    pragmas = {}
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size'):
+                cursor.execute(f'PRAGMA {name}')
+                pragmas[name] = cursor.fetchone()[0]
+    return JsonResponse({
+        'profile': getattr(settings, 'SQLITE_PROFILE', None),
+        'pragmas': pragmas,
+        'lock_stats': lock_stats.snapshot(),
+    })
+
+
+def _autocomplete_response(request, kind):
+    if request.user.user_type != 'Admin':
+        return JsonResponse({'error': 'Only admins can look up people.'}, status=403)
+
+    query = (request.GET.get('q') or '').strip()
+    page = _parse_int(request.GET.get('page')) or 1
+    hits, has_more = autocomplete(kind, query, page=page) if query else ([], False)
+    return JsonResponse({
+        'results': [{'id': hit.object_id, 'text': hit.title, 'detail': hit.detail} for hit in hits],
+        'page': page,
+        'has_more': has_more,
+    })
+
+
+@login_required
+def student_autocomplete(request):
+    return _autocomplete_response(request, 'student')
+
+
+@login_required
+def teacher_autocomplete(request):
+    return _autocomplete_response(request, 'teacher')
+
+
+@login_required
+def import_users(request):
+    if request.user.user_type != 'Admin':
+        return HttpResponseForbidden('Only admins can import users.')
+
+    report = None
+    kind = request.POST.get('kind', 'student')
+
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        dry_run = bool(request.POST.get('dry_run'))
+
+        if kind not in KINDS:
+            messages.error(request, 'Please choose students or teachers.')
+        elif not upload:
+            messages.error(request, 'Please choose a .csv or .xlsx file to import.')
+        else:
+            try:
+                report = run_import(read_rows(upload.file, upload.name), kind, dry_run=dry_run, workers=WEB_WORKERS)
+            except ImportFileError as exc:
+                messages.error(request, str(exc))
+            else:
+                if report.errors:
+                    messages.warning(request, report.summary())
+                else:
+                    messages.success(request, report.summary())
+
+    context = {
+        'kind': kind,
+        'kinds': KINDS,
+        'report': report,
+    }
+    return render(request, 'Admin/import_users.html', context)
+
+
+@login_required
+@reads_from_replica
 def attendance_overview(request):
     if request.user.user_type != 'Admin':
         return HttpResponseForbidden('Only admins can view attendance data.')
 
-    classes = Class.objects.all().order_by('class_code')
-    sections = Section.objects.all().order_by('name')
-    sessions = Session.objects.all().order_by('-start_date')
-    subjects = Subject.objects.all().order_by('name')
-    teachers = TeacherInfo.objects.all().order_by('first_name', 'last_name')
+    reference = get_reference_data()
+    classes = reference.classes
+    sections = reference.sections
+    sessions = reference.sessions
+    subjects = reference.subjects
 
     filter_values = {
         'klass': request.GET.get('klass', ''),
@@ -216,11 +388,7 @@ def attendance_overview(request):
     subject_id = _parse_int(filter_values['subject'])
     teacher_id = _parse_int(filter_values['teacher'])
 
-    attendances = (
-        Attendance.objects.select_related('teacher', 'klass', 'section', 'session', 'subject')
-        .prefetch_related('records__student')
-        .order_by('-date', '-created_at')
-    )
+    attendances = Attendance.objects.all()
 
     if klass_id:
         attendances = attendances.filter(klass_id=klass_id)
@@ -230,8 +398,10 @@ def attendance_overview(request):
         attendances = attendances.filter(session_id=session_id)
     if subject_id:
         attendances = attendances.filter(subject_id=subject_id)
+    selected_teacher = None
     if teacher_id:
         attendances = attendances.filter(teacher_id=teacher_id)
+        selected_teacher = TeacherInfo.objects.filter(id=teacher_id).only('first_name', 'last_name').first()
 
     selected_date_value = filter_values['date']
     if selected_date_value:
@@ -242,31 +412,16 @@ def attendance_overview(request):
             messages.error(request, 'Invalid date filter. Showing results without the date filter.')
             filter_values['date'] = ''
 
-    attendance_list = []
-    total_records = 0
-    total_present = 0
-    total_absent = 0
+    # One aggregate over the filtered history instead of loading every record.
+    totals = attendances.aggregate(
+        sessions=Count('id'),
+        records=Sum('total_count'),
+        present=Sum('present_count'),
+        absent=Sum('absent_count'),
+    )
+    overall_summary = {key: value or 0 for key, value in totals.items()}
 
-    for attendance in attendances:
-        records = list(attendance.records.all())
-        attendance.summary_total = len(records)
-        attendance.summary_present = sum(
-            1 for record in records if record.status == AttendanceRecord.STATUS_PRESENT
-        )
-        attendance.summary_absent = sum(
-            1 for record in records if record.status == AttendanceRecord.STATUS_ABSENT
-        )
-        total_records += attendance.summary_total
-        total_present += attendance.summary_present
-        total_absent += attendance.summary_absent
-        attendance_list.append(attendance)
-
-    overall_summary = {
-        'sessions': len(attendance_list),
-        'records': total_records,
-        'present': total_present,
-        'absent': total_absent,
-    }
+    page = ATTENDANCE_LIST.paginate(request, attendances)
 
     selected_attendance_id = _parse_int(request.GET.get('attendance_id'))
     selected_attendance = None
@@ -274,9 +429,11 @@ def attendance_overview(request):
     selected_summary = None
 
     if selected_attendance_id:
-        selected_attendance = next(
-            (att for att in attendance_list if att.id == selected_attendance_id),
-            None
+        # Records are only loaded for the entry being drilled into.
+        selected_attendance = (
+            attendances.select_related('teacher', 'klass', 'section', 'session', 'subject')
+            .filter(id=selected_attendance_id)
+            .first()
         )
         if selected_attendance:
             selected_records = list(
@@ -284,9 +441,9 @@ def attendance_overview(request):
                 .order_by('student__roll_no', 'student__first_name', 'student__last_name')
             )
             selected_summary = {
-                'total': selected_attendance.summary_total,
-                'present': selected_attendance.summary_present,
-                'absent': selected_attendance.summary_absent,
+                'total': selected_attendance.total_count,
+                'present': selected_attendance.present_count,
+                'absent': selected_attendance.absent_count,
             }
         else:
             messages.warning(request, 'The selected attendance entry was not found in the current filters.')
@@ -296,8 +453,9 @@ def attendance_overview(request):
         'sections': sections,
         'sessions': sessions,
         'subjects': subjects,
-        'teachers': teachers,
-        'attendances': attendance_list,
+        'selected_teacher': selected_teacher,
+        'attendances': page,
+        'page': page,
         'filters': filter_values,
         'overall_summary': overall_summary,
         'selected_attendance': selected_attendance,
@@ -413,21 +571,16 @@ def send_teacher_notification(request):
 
         return redirect('send_teacher_notification')
 
-    teacher = TeacherInfo.objects.all()
-
-    context = {
-        'teacher': teacher,
-    }
-
-    return render(request, 'Admin/send_teacher_notification.html', context)
+    return render(request, 'Admin/send_teacher_notification.html')
 
 
 def view_teacher_notifications(request):
     """Display all sent teacher notifications"""
-    notifications = TeacherNotification.objects.all().select_related('teacher_id').order_by('-created_at')
+    page = TEACHER_NOTIFICATION_LIST.paginate(request, TeacherNotification.objects.all())
 
     context = {
-        'notifications': notifications,
+        'notifications': page,
+        'page': page,
     }
 
     return render(request, 'Admin/view_teacher_notifications.html', context)
@@ -461,23 +614,184 @@ def send_student_notification(request):
 
         return redirect('send_student_notification')
 
-    students = StudentInfo.objects.all()
+    return render(request, 'Admin/send_student_notification.html')
+
+
+def view_student_notifications(request):
+    page = STUDENT_NOTIFICATION_LIST.paginate(request, StudentNotification.objects.all())
 
     context = {
-        'students': students,
+        'notifications': page,
+        'page': page,
     }
 
-    return render(request, 'Admin/send_student_notification.html', context)
+    return render(request, 'Admin/view_student_notifications.html', context)
 
 
-def view_student_notifications(request):
-    notifications = StudentNotification.objects.all().select_related('student').order_by('-created_at')
+@login_required
+def send_announcement(request):
+    if request.user.user_type != 'Admin':
+        return HttpResponseForbidden('Only admins can send announcements.')
+
+    reference = get_reference_data()
+
+    if request.method == 'POST':
+        audience = request.POST.get('audience')
+        subject = (request.POST.get('subject') or '').strip()
+        message = (request.POST.get('message') or '').strip()
+        targets = {
+            'klass': reference.get_class(_parse_int(request.POST.get('klass'))),
+            'section': reference.get_section(_parse_int(request.POST.get('section'))),
+            'session': reference.get_session(_parse_int(request.POST.get('session'))),
+        }
+        # A target that no longer exists must not silently widen the audience.
+        unknown = [name for name, value in targets.items() if request.POST.get(name) and value is None]
+        klass, section, session = targets.values()
+
+        if audience not in dict(Announcement.AUDIENCE_CHOICES) or not subject or not message:
+            messages.error(request, 'Audience, subject and message are required!')
+        elif audience == Announcement.AUDIENCE_STUDENTS and unknown:
+            messages.error(request, 'The selected class, section or session no longer exists.')
+        else:
+            if audience == Announcement.AUDIENCE_TEACHERS:
+                klass = section = session = None
+            # One row for the whole audience; recipients are matched when they read.
+            announcement = Announcement.objects.create(
+                audience=audience,
+                klass=klass,
+                section=section,
+                session=session,
+                subject=subject,
+                message=message,
+                created_by=request.user,
+            )
+            messages.success(request, f'Announcement sent to {announcement.audience_label.lower()}!')
+            return redirect('send_announcement')
+
+    page = ANNOUNCEMENT_LIST.paginate(request, Announcement.objects.all())
 
     context = {
-        'notifications': notifications,
+        'audiences': Announcement.AUDIENCE_CHOICES,
+        'classes': reference.classes,
+        'sections': reference.sections,
+        'sessions': reference.sessions,
+        'announcements': page,
+        'page': page,
+        'filters': ANNOUNCEMENT_LIST.filter_values(request),
     }
+    return render(request, 'Admin/send_announcement.html', context)
 
-    return render(request, 'Admin/view_student_notifications.html', context)
+
+def _parse_inbox_item(value):
+    kind, _, object_id = (value or '').partition(':')
+    object_id = _parse_int(object_id)
+    return (kind, object_id) if kind and object_id else None
+
+
+@login_required
+@require_POST
+def mark_notifications_read(request):
+    audience, profile = recipient_for(request.user)
+    if profile is None:
+        return HttpResponseForbidden('Only students and teachers have notifications.')
+
+    if request.POST.get('all'):
+        mark_all_read(request.user)
+    else:
+        items = [item for item in map(_parse_inbox_item, request.POST.getlist('item')) if item]
+        if not items:
+            messages.warning(request, 'Select at least one notification.')
+        else:
+            mark_read(request.user, audience, profile, items)
+
+    next_url = request.POST.get('next')
+    if next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        return redirect(next_url)
+    return redirect('student_notification' if request.user.user_type == 'Student' else 'teacher_notification')
+
+
+# Polls re-read this far behind the cursor so rows committed out of order by
+# other workers are not skipped; the per-stream ``seen`` set drops repeats.
+EVENT_POLL_OVERLAP = timedelta(seconds=60)
+EVENT_SEEN_LIMIT = 1000
+
+
+async def _event_stream(tenant, user_id, audience, profile, cursor):
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=events.QUEUE_SIZE)
+    subscription = events.Subscription(tenant, user_id, audience, profile, loop, queue)
+    # The body streams after the middleware has returned, so poll in the request's school explicitly.
+    poll_events = sync_to_async(in_tenant(tenant, events.poll_events))
+    events.subscribe(subscription)
+    seen = {}
+    try:
+        yield f'retry: {events.poll_interval() * 1000}\n\n'
+        next_poll = loop.time()
+        last_sent = loop.time()
+        overlap = timedelta(0)  # the first poll resumes exactly at the reconnect cursor
+        while True:
+            wait = max(0, min(next_poll, last_sent + events.heartbeat_interval()) - loop.time())
+            try:
+                batch = [await asyncio.wait_for(subscription.queue.get(), timeout=wait)]
+            except asyncio.TimeoutError:
+                batch = []
+
+            if loop.time() >= next_poll:
+                batch += await poll_events(audience, profile, cursor - overlap)
+                next_poll = loop.time() + events.poll_interval()
+                overlap = EVENT_POLL_OVERLAP
+
+            for event in batch:
+                if event.key in seen:
+                    continue
+                seen[event.key] = True
+                if len(seen) > EVENT_SEEN_LIMIT:
+                    del seen[next(iter(seen))]
+                cursor = max(cursor, event.at)
+                last_sent = loop.time()
+                yield events.encode(event)
+
+            if loop.time() - last_sent >= events.heartbeat_interval():
+                # Keeps proxies from closing an idle connection.
+                last_sent = loop.time()
+                yield ': keepalive\n\n'
+    finally:
+        events.unsubscribe(subscription)
+
+
+async def notification_stream(request):
+    """
+    Server-Sent Events feed of new notifications, leave decisions and
+    feedback replies for the signed-in student or teacher.
+
+    Under ASGI this is one long-lived connection per open page. Under WSGI
+    a worker cannot be parked on an idle stream, so the response carries
+    whatever is new and a ``retry`` hint, and EventSource reconnects at the
+    poll interval.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponseForbidden('Sign in to receive notifications.')
+    audience, profile = await sync_to_async(recipient_for)(user)
+    if profile is None:
+        return HttpResponseForbidden('Only students and teachers receive notifications.')
+
+    cursor = events.parse_cursor(request.headers.get('Last-Event-ID')) or timezone.now()
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+    if not isinstance(request, ASGIRequest):
+        polled_at = timezone.now()
+        pending = await sync_to_async(events.poll_events)(audience, profile, cursor)
+        body = f'retry: {events.poll_interval() * 1000}\n\n' + ''.join(events.encode(event) for event in pending)
+        # A bare id line moves the browser's Last-Event-ID to this poll.
+        body += f'id: {max([polled_at, *(event.at for event in pending)]).isoformat()}\n\n'
+        return HttpResponse(body, content_type='text/event-stream', headers=headers)
+
+    return StreamingHttpResponse(
+        _event_stream(current_tenant(), user.pk, audience, profile, cursor),
+        content_type='text/event-stream',
+        headers=headers,
+    )
 
 
 @login_required
@@ -485,8 +799,6 @@ def teacher_leave(request):
     if request.user.user_type != 'Admin':
         return HttpResponseForbidden('You do not have permission to view teacher leaves.')
 
-    leaves = TeacherLeave.objects.select_related('teacher').order_by('-created_at')
-
     if request.method == 'POST':
         leave_id = request.POST.get('leave_id')
         action = request.POST.get('status')
@@ -500,7 +812,8 @@ def teacher_leave(request):
                 raise ValueError('Invalid status selected.')
 
             leave.status = action
-            leave.save(update_fields=['status'])
+            leave.status_changed_at = timezone.now()
+            leave.save(update_fields=['status', 'status_changed_at'])
             messages.success(request, f'Leave status updated to {action}.')
         except TeacherLeave.DoesNotExist:
             messages.error(request, 'Leave request not found.')
@@ -509,8 +822,12 @@ def teacher_leave(request):
 
         return redirect('teacher_leave')
 
+    page = TEACHER_LEAVE_LIST.paginate(request, TeacherLeave.objects.all())
+
     return render(request, 'Admin/teacher_leave.html', {
-        'leaves': leaves,
+        'leaves': page,
+        'page': page,
+        'filters': TEACHER_LEAVE_LIST.filter_values(request),
         'status_choices': TeacherLeave.STATUS,
     })
 
@@ -520,8 +837,6 @@ def student_leave(request):
     if request.user.user_type != 'Admin':
         return HttpResponseForbidden('You do not have permission to view student leaves.')
 
-    leaves = StudentLeave.objects.select_related('student').order_by('-created_at')
-
     if request.method == 'POST':
         leave_id = request.POST.get('leave_id')
         action = request.POST.get('status')
@@ -535,7 +850,8 @@ def student_leave(request):
                 raise ValueError('Invalid status selected.')
 
             leave.status = action
-            leave.save(update_fields=['status'])
+            leave.status_changed_at = timezone.now()
+            leave.save(update_fields=['status', 'status_changed_at'])
             messages.success(request, f'Leave status updated to {action}.')
         except StudentLeave.DoesNotExist:
             messages.error(request, 'Leave request not found.')
@@ -544,8 +860,12 @@ def student_leave(request):
 
         return redirect('student_leave')
 
+    page = STUDENT_LEAVE_LIST.paginate(request, StudentLeave.objects.all())
+
     return render(request, 'Admin/student_leave.html', {
-        'leaves': leaves,
+        'leaves': page,
+        'page': page,
+        'filters': STUDENT_LEAVE_LIST.filter_values(request),
         'status_choices': StudentLeave.STATUS,
     })
 
@@ -573,10 +893,11 @@ def teacher_feedback_admin(request):
 
         return redirect('teacher_feedback_admin')
 
-    feedback_entries = Feedback.objects.select_related('teacher', 'teacher__user').order_by('-created_at')
+    page = TEACHER_FEEDBACK_LIST.paginate(request, Feedback.objects.all())
 
     return render(request, 'Admin/teacher_feedback.html', {
-        'feedback_entries': feedback_entries,
+        'feedback_entries': page,
+        'page': page,
     })
 
 
@@ -603,8 +924,9 @@ def student_feedback_admin(request):
 
         return redirect('student_feedback_admin')
 
-    feedback_entries = StudentFeedback.objects.select_related('student', 'student__user').order_by('-created_at')
+    page = STUDENT_FEEDBACK_LIST.paginate(request, StudentFeedback.objects.all())
 
     return render(request, 'Admin/student_feedback.html', {
-        'feedback_entries': feedback_entries,
+        'feedback_entries': page,
+        'page': page,
     })
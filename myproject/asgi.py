@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
 
 application = get_asgi_application()
+
+# Load class/section/session/subject lists before the first request.
+from academic.cache import warm_reference_data  # noqa: E402
+
+warm_reference_data()
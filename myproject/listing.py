@@ -0,0 +1,295 @@
+"""
+Paginated list pages
+====================
+Shared engine behind the directory, notification, leave and feedback lists.
+A page is described once, at module level, with a ``ListSpec``:
+
+    STUDENT_LIST = ListSpec(
+        filters=[ListFilter('klass', 'klass_id', parse=int)],
+        search=['first_name', 'last_name', 'student_user_id'],
+        sorts={'newest': ['-created_at', '-id'], 'name': ['first_name', 'last_name', 'id']},
+        select_related=['klass', 'section', 'session'],
+    )
+
+    page = STUDENT_LIST.paginate(request, StudentInfo.objects.all())
+
+``paginate`` applies the filters present in ``request.GET``, the ``q``
+search, the ``sort`` key and the ``select_related``/``only`` projection,
+then returns one ``ListPage``. Pages use keyset cursors (``after`` /
+``before``) over the sort fields instead of OFFSET, so page 500 costs the
+same as page 1, and ``per_page`` is capped at ``max_page_size``. Every sort
+must end in a unique field (normally ``id``). Sort fields may follow
+relations (``attendance__date``). Nullable sort fields are compared through
+``COALESCE`` so rows with NULLs still page correctly.
+
+``templates/Includes/pagination.html`` renders the Newer/Older links for a
+``ListPage``.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import F, Q, Value
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
+
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
+class ListFilter:
+    """One ``?param=value`` filter, applied as ``queryset.filter(**{lookup: value})``."""
+
+    def __init__(self, param, lookup=None, parse=str, choices=None):
+        self.param = param
+        self.lookup = lookup or param
+        self.parse = parse
+        self.choices = choices
+
+    def clean(self, raw):
+        """The parsed value, or None when the parameter is missing or invalid."""
+        if raw in (None, ''):
+            return None
+        try:
+            value = self.parse(raw)
+        except (TypeError, ValueError):
+            return None
+        if self.choices is not None and value not in {choice[0] for choice in self.choices}:
+            return None
+        return value
+
+
+def _encode_cursor(sort, values):
+    payload = json.dumps([sort, *values], cls=DjangoJSONEncoder)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(raw, sort, fields):
+    """The values of cursor ``raw`` as Python values of ``fields``, or None."""
+    if not raw:
+        return None
+    try:
+        padded = raw + '=' * (-len(raw) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        # A cursor from another sort order (or a stale link) starts from the top.
+        if not isinstance(payload, list) or len(payload) != len(fields) + 1 or payload[0] != sort:
+            return None
+        if None in payload[1:]:
+            return None
+        # So does a tampered one whose values do not fit the sort fields.
+        return [field.to_python(value) for field, value in zip(fields, payload[1:])]
+    except (ValidationError, ValueError, TypeError):
+        return None
+
+
+class ListPage:
+    """One page of results plus everything the template needs to link around."""
+
+    def __init__(self, spec, request, queryset, items, sort, has_next, has_previous):
+        self.spec = spec
+        self.request = request
+        self.queryset = queryset
+        self.items = items
+        self.sort = sort
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @cached_property
+    def total(self):
+        """Number of rows matching the filters (one COUNT, only when rendered)."""
+        return self.queryset.count()
+
+    def _query(self, **cursor):
+        params = self.request.GET.copy()
+        for key in ('after', 'before'):
+            params.pop(key, None)
+        params.update(cursor)
+        return params.urlencode()
+
+    @property
+    def next_query(self):
+        if not (self.has_next and self.items):
+            return ''
+        return self._query(after=self.spec.cursor_for(self.items[-1], self.sort))
+
+    @property
+    def previous_query(self):
+        if not (self.has_previous and self.items):
+            return ''
+        return self._query(before=self.spec.cursor_for(self.items[0], self.sort))
+
+    @property
+    def first_query(self):
+        return self._query()
+
+
+class ListSpec:
+    def __init__(
+        self,
+        sorts,
+        default_sort=None,
+        filters=(),
+        search=(),
+        select_related=(),
+        only=(),
+        page_size=DEFAULT_PAGE_SIZE,
+        max_page_size=MAX_PAGE_SIZE,
+    ):
+        self.sorts = {name: list(fields) for name, fields in sorts.items()}
+        self.default_sort = default_sort or next(iter(self.sorts))
+        self.filters = list(filters)
+        self.search = list(search)
+        self.select_related = list(select_related)
+        self.only = list(only)
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+
+    # -- sort helpers ------------------------------------------------------
+
+    @staticmethod
+    def _sort_alias(index):
+        return f'_sort_{index}'
+
+    @staticmethod
+    def _sort_field(model, name):
+        """``(field, nullable)`` for sort field ``name``, following relations."""
+        *path, last = name.split(LOOKUP_SEP)
+        # A nullable relation on the way makes the field nullable too (LEFT JOIN).
+        null = False
+        for step in path:
+            relation = model._meta.get_field(step)
+            null = null or relation.null
+            model = relation.related_model
+        field = model._meta.get_field(last)
+        return field, null or field.null
+
+    @staticmethod
+    def _sort_target(field):
+        # Foreign keys sort by the referenced id.
+        return field.target_field if field.is_relation else field
+
+    def _sort_expression(self, model, name):
+        field, null = self._sort_field(model, name)
+        if not null:
+            return F(name)
+        target = self._sort_target(field)
+        if isinstance(target, (models.CharField, models.TextField)):
+            fallback = Value('')
+        elif isinstance(target, (models.IntegerField, models.AutoField)):
+            fallback = Value(0)
+        else:
+            raise ImproperlyConfigured(
+                f'Nullable sort field {field.model.__name__}.{field.name} has no COALESCE fallback.'
+            )
+        path = name.split(LOOKUP_SEP)[:-1]
+        return Coalesce(F(LOOKUP_SEP.join([*path, field.attname])), fallback, output_field=target)
+
+    def _cursor_fields(self, model, sort):
+        return [self._sort_target(self._sort_field(model, spec.lstrip('-'))[0]) for spec in self.sorts[sort]]
+
+    def _ordered(self, queryset, sort, reverse=False):
+        annotations = {}
+        ordering = []
+        for index, spec in enumerate(self.sorts[sort]):
+            descending = spec.startswith('-')
+            alias = self._sort_alias(index)
+            annotations[alias] = self._sort_expression(queryset.model, spec.lstrip('-'))
+            if descending != reverse:
+                ordering.append(F(alias).desc())
+            else:
+                ordering.append(F(alias).asc())
+        return queryset.annotate(**annotations).order_by(*ordering)
+
+    def _keyset(self, sort, values, reverse=False):
+        """Rows strictly after ``values`` in ``sort`` order (before, when ``reverse``)."""
+        condition = Q()
+        equal_so_far = Q()
+        for index, spec in enumerate(self.sorts[sort]):
+            descending = spec.startswith('-') != reverse
+            alias = self._sort_alias(index)
+            step = Q(**{f'{alias}__{"lt" if descending else "gt"}': values[index]})
+            condition |= equal_so_far & step
+            equal_so_far &= Q(**{alias: values[index]})
+        return condition
+
+    def cursor_for(self, obj, sort):
+        values = []
+        for index in range(len(self.sorts[sort])):
+            value = getattr(obj, self._sort_alias(index))
+            if isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            values.append(value)
+        return _encode_cursor(sort, values)
+
+    # -- public API --------------------------------------------------------
+
+    def filter_values(self, request):
+        """The cleaned filter values from ``request.GET`` (template echo + filtering)."""
+        return {item.param: item.clean(request.GET.get(item.param)) for item in self.filters}
+
+    def filter_queryset(self, request, queryset):
+        for item, value in zip(self.filters, self.filter_values(request).values()):
+            if value is not None:
+                queryset = queryset.filter(**{item.lookup: value})
+
+        term = (request.GET.get('q') or '').strip()
+        if term and self.search:
+            match = Q()
+            for field in self.search:
+                match |= Q(**{f'{field}__icontains': term})
+            queryset = queryset.filter(match)
+        return queryset
+
+    def per_page(self, request):
+        try:
+            size = int(request.GET.get('per_page', self.page_size))
+        except (TypeError, ValueError):
+            size = self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate(self, request, queryset):
+        sort = request.GET.get('sort')
+        if sort not in self.sorts:
+            sort = self.default_sort
+        fields = self._cursor_fields(queryset.model, sort)
+        size = self.per_page(request)
+
+        queryset = self.filter_queryset(request, queryset)
+        page_qs = queryset
+        if self.select_related:
+            page_qs = page_qs.select_related(*self.select_related)
+        if self.only:
+            page_qs = page_qs.only(*self.only)
+
+        after = _decode_cursor(request.GET.get('after'), sort, fields)
+        before = _decode_cursor(request.GET.get('before'), sort, fields) if after is None else None
+
+        if before is not None:
+            page_qs = self._ordered(page_qs, sort, reverse=True).filter(self._keyset(sort, before, reverse=True))
+        else:
+            page_qs = self._ordered(page_qs, sort)
+            if after is not None:
+                page_qs = page_qs.filter(self._keyset(sort, after))
+
+        items = list(page_qs[:size + 1])
+        has_more = len(items) > size
+        items = items[:size]
+        if before is not None:
+            items.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, after is not None
+
+        return ListPage(self, request, queryset, items, sort, has_next, has_previous)
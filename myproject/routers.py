@@ -0,0 +1,166 @@
+"""
+Reporting replica routing
+=========================
+Heavy read-only pages can read from ``reporting``, a read-only snapshot of
+the primary database. ``manage.py replica_snapshot`` refreshes the snapshot
+with the SQLite online backup API. Every other query, and every write,
+stays on ``default``.
+
+Opting in is per request:
+
+    @reads_from_replica
+    def attendance_overview(request): ...
+
+    with use_replica():
+        rows = list(report_queryset)
+
+``reads_from_replica`` only applies to GET/HEAD requests. A POST to the same
+view reads and writes the primary. In both forms the replica is used only
+when it is fresh:
+
+* the snapshot file exists and is at most ``REPLICA_MAX_LAG`` seconds old
+  (default 300);
+* the snapshot was taken after the user's last write.
+  ``PrimaryPinMiddleware`` stamps a ``db_pin`` cookie on every non-GET
+  response. Until a newer snapshot exists, that user reads the primary,
+  so they always see their own changes.
+
+Otherwise the code simply reads ``default``, as if it had not opted in.
+The replica mirrors the default school only; requests for another school
+(``myproject.tenancy``) always read that school's database.
+Code that fills a shared cache (reference data, the unread counter) reads
+through ``use_primary()``, so a replica request never caches stale rows.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+from myproject.tenancy import tenant_alias
+from myproject.tenancy.context import current_tenant
+
+
+DEFAULT_ALIAS = 'default'
+REPLICA_ALIAS = 'reporting'
+PIN_COOKIE = 'db_pin'
+DEFAULT_MAX_LAG = 300
+SAFE_METHODS = ('GET', 'HEAD')
+# Per-request state that must never be read from a snapshot.
+PRIMARY_ONLY_APPS = {'sessions', 'contenttypes'}
+
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def max_lag():
+    return getattr(settings, 'REPLICA_MAX_LAG', DEFAULT_MAX_LAG)
+
+
+def replica_path():
+    return getattr(settings, 'REPLICA_DATABASE', None)
+
+
+def snapshot_time():
+    """When the current snapshot was taken (epoch seconds), or None without one."""
+    path = replica_path()
+    if not path or REPLICA_ALIAS not in settings.DATABASES:
+        return None
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def replica_usable(pinned_at=0.0):
+    if current_tenant() is not None:
+        return False
+    taken = snapshot_time()
+    return taken is not None and taken > pinned_at and time.time() - taken <= max_lag()
+
+
+@contextmanager
+def use_replica(pinned_at=0.0):
+    """Send reads inside the block to the replica when it is usable."""
+    token = _read_alias.set(REPLICA_ALIAS if replica_usable(pinned_at) else None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """
+    Read the primary inside the block, even within a replica request. For
+    code that fills a shared cache: a snapshot's stale rows must never be
+    cached as current.
+    """
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def _pinned_at(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0))
+    except ValueError:
+        return 0.0
+
+
+def reads_from_replica(view):
+    """Serve GET/HEAD requests of ``view`` from the replica when it is fresh enough."""
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return view(request, *args, **kwargs)
+        with use_replica(_pinned_at(request)):
+            return view(request, *args, **kwargs)
+
+    return wrapped
+
+
+class TenantRouter:
+    """While a school is active, its database takes every read and write."""
+
+    def db_for_read(self, model, **hints):
+        tenant = current_tenant()
+        return None if tenant is None else tenant_alias(tenant)
+
+    db_for_write = db_for_read
+
+
+class ReplicaRouter:
+    """Reads go where ``use_replica`` says (default: primary); writes and migrations go to the primary."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_ALIAS
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return False if db == REPLICA_ALIAS else None
+
+
+class PrimaryPinMiddleware:
+    """Pin a user's reads to the primary after they write, until a newer snapshot exists."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS and REPLICA_ALIAS in settings.DATABASES:
+            response.set_cookie(PIN_COOKIE, f'{time.time():.3f}', max_age=max_lag(), httponly=True, samesite='Lax')
+        return response
@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from myproject.sqlite import profile_options
+from myproject.tenancy import discover_tenants, parse_hosts, tenant_databases
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -49,6 +53,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'myproject.tenancy.middleware.TenantMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
@@ -56,6 +61,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'myproject.routers.PrimaryPinMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -71,6 +77,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'administration.context_processors.notifications',
             ],
         },
     },
@@ -82,11 +89,59 @@ WSGI_APPLICATION = 'myproject.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# 'production' enables WAL, BEGIN IMMEDIATE and the other concurrency
+# settings described in myproject/sqlite/__init__.py; 'development' is
+# Django's stock SQLite behaviour.
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'production')
+
+# Read-only snapshot for report pages, refreshed by `manage.py replica_snapshot`
+# (see myproject/routers.py). Unused until the first snapshot exists.
+REPLICA_DATABASE = os.environ.get('SQLITE_REPLICA', str(BASE_DIR / 'db.replica.sqlite3'))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'myproject.sqlite',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'OPTIONS': profile_options(SQLITE_PROFILE),
+        # A file rather than Django's in-memory default, so tests that use
+        # several connections see the same locking as the site.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+    },
+    'reporting': {
+        'ENGINE': 'myproject.sqlite',
+        'NAME': f'file:{REPLICA_DATABASE}?mode=ro&immutable=1',
+        'OPTIONS': profile_options('replica'),
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+# Schools served by this deployment, one SQLite file each
+# (see myproject/tenancy/__init__.py). Requests pick a school by host
+# (TENANT_HOSTS, <slug>.TENANT_DOMAIN) or by a /<slug>/ path prefix; all
+# others use the `default` database.
+TENANT_DIR = Path(os.environ.get('SMS_TENANT_DIR', BASE_DIR / 'tenants'))
+TENANT_DOMAIN = os.environ.get('SMS_TENANT_DOMAIN', '')
+TENANT_HOSTS = parse_hosts(os.environ.get('SMS_TENANT_HOSTS', ''))
+TENANTS = discover_tenants(TENANT_DIR)
+DATABASES.update(tenant_databases(TENANTS, profile_options(SQLITE_PROFILE)))
+
+DATABASE_ROUTERS = ['myproject.routers.TenantRouter', 'myproject.routers.ReplicaRouter']
+
+
+# Background jobs (administration/jobs.py). While JOBS_EAGER is on, queued
+# jobs (password reset e-mails, search indexing after imports) run in-process
+# right after the request commits. Delayed and periodic jobs still need a
+# worker. In production run `python manage.py runworker` and set
+# SMS_JOBS_EAGER=0 to move that work off the request path.
+JOBS_EAGER = os.environ.get('SMS_JOBS_EAGER', '1') != '0'
+
+
+# Cache keys are scoped to the active school.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'KEY_FUNCTION': 'myproject.tenancy.context.cache_key',
+    },
 }
 
 
@@ -130,7 +185,8 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
-STATIC_URL = 'static/'
+# Absolute, so pages under a /<slug>/ school prefix share one static tree.
+STATIC_URL = '/static/'
 STATICFILES_DIRS = [ BASE_DIR / "static" ]     # For global static
 STATIC_ROOT = BASE_DIR / "staticfiles"        # For collectstatic (production)
 
@@ -0,0 +1,130 @@
+"""
+SQLite database profiles
+========================
+``ENGINE: 'myproject.sqlite'`` is Django's SQLite backend plus lock-wait
+metrics and a bounded retry of ``BEGIN``. ``profile_options()`` builds the
+``OPTIONS`` for one of the ``PROFILES``; settings choose the profile with
+``SQLITE_PROFILE``:
+
+``development``
+    Django's stock behaviour: rollback journal, 5 second busy timeout and
+    deferred transactions.
+``production``
+    For many concurrent writers, e.g. the morning attendance burst.
+
+    * WAL journaling lets readers and the single writer run together.
+    * ``synchronous=NORMAL`` is durable under WAL except against power loss
+      right after a commit, and skips an fsync per transaction.
+    * A 64 MB page cache and 256 MB of memory-mapped I/O per connection, and
+      temporary tables held in memory.
+    * A 10 second busy timeout, so writers queue for the lock instead of
+      failing at once.
+    * Every ``atomic()`` block starts with ``BEGIN IMMEDIATE``. A
+      transaction that reads first and writes later then takes the write
+      lock up front and waits its turn under the busy timeout. Under
+      ``BEGIN DEFERRED`` its upgrade would fail immediately with
+      "database is locked", whatever the timeout.
+``replica``
+    Used by the read-only ``reporting`` snapshot (see ``myproject.routers``):
+    the same cache and mmap sizes, plus ``query_only``.
+
+``lock_stats`` counts, per process, how often and how long ``BEGIN`` waited
+for the lock, how often it was retried and how often it gave up.
+``manage.py sqlite_stress`` reports them under a synthetic writer burst.
+
+This module is imported from settings, so it uses the standard library only.
+"""
+
+import threading
+
+
+PROFILES = {
+    'development': {
+        'timeout': 5,
+        'transaction_mode': None,
+        'lock_retries': 0,
+        'pragmas': {},
+    },
+    'production': {
+        'timeout': 10,
+        'transaction_mode': 'IMMEDIATE',
+        'lock_retries': 2,
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'cache_size': -64000,        # KiB when negative: 64 MB
+            'mmap_size': 268435456,      # 256 MB
+            'temp_store': 'MEMORY',
+        },
+    },
+    'replica': {
+        'timeout': 5,
+        'transaction_mode': None,
+        'lock_retries': 0,
+        'pragmas': {
+            'cache_size': -64000,
+            'mmap_size': 268435456,
+            'query_only': 'ON',
+        },
+    },
+}
+
+# A BEGIN slower than this is counted as a lock wait.
+WAIT_THRESHOLD = 0.01
+
+
+def profile_options(profile, **overrides):
+    """``DATABASES[...]['OPTIONS']`` for ``profile``; keyword arguments override its values."""
+    try:
+        values = {**PROFILES[profile], **overrides}
+    except KeyError:
+        raise ValueError(f'Unknown SQLite profile {profile!r}; use one of {", ".join(PROFILES)}.') from None
+
+    options = {'timeout': values['timeout'], 'lock_retries': values['lock_retries']}
+    if values['transaction_mode']:
+        options['transaction_mode'] = values['transaction_mode']
+    if values['pragmas']:
+        options['init_command'] = ';'.join(f'PRAGMA {name}={value}' for name, value in values['pragmas'].items())
+    return options
+
+
+class LockStats:
+    """Process-wide counters of write-lock contention on ``BEGIN``."""
+
+    FIELDS = ('transactions', 'waits', 'wait_seconds', 'max_wait', 'retries', 'failures')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.transactions = 0
+            self.waits = 0
+            self.wait_seconds = 0.0
+            self.max_wait = 0.0
+            self.retries = 0
+            self.failures = 0
+
+    def record_begin(self, elapsed):
+        with self._lock:
+            self.transactions += 1
+            if elapsed >= WAIT_THRESHOLD:
+                self.waits += 1
+                self.wait_seconds += elapsed
+                self.max_wait = max(self.max_wait, elapsed)
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {field: getattr(self, field) for field in self.FIELDS}
+
+
+lock_stats = LockStats()
@@ -0,0 +1,212 @@
+"""
+Copies of a live SQLite database
+================================
+``copy_database`` copies a Django database alias to a file with SQLite's
+online backup API. The copy is a consistent snapshot of one moment, taken
+while other connections keep reading and writing.
+
+* **Paged copies.** With ``pages=N`` the copy runs N pages per step and
+  sleeps between steps. The source's read lock is released between steps,
+  so writers are never starved even in rollback-journal mode. A write from
+  another connection restarts a paged copy. After ``max_restarts`` restarts
+  the copy falls back to a single step, which under WAL only pins a read
+  snapshot and never blocks writers.
+* **Safe replacement.** The copy is written next to the target and moved
+  into place with an atomic rename. Connections that still have the
+  previous file open keep reading it undisturbed. The copy is switched to
+  rollback-journal mode, so it never has ``-wal``/``-shm`` side files that
+  could be mixed up with the next copy's.
+
+``create_backup`` builds the ``manage.py backup`` snapshots on top of it:
+copy, verify with ``PRAGMA integrity_check``, gzip, then delete all but the
+newest ``keep`` snapshots. ``verify_backup`` re-checks an existing
+snapshot.
+"""
+
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+
+from django.db import connections
+
+
+CopyResult = namedtuple('CopyResult', 'path pages duration started_at restarts')
+
+BACKUP_PREFIX = 'db-'
+BACKUP_SUFFIX = '.sqlite3.gz'
+DEFAULT_MAX_RESTARTS = 3
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def copy_database(alias, target, pages=-1, sleep=0.0, max_restarts=DEFAULT_MAX_RESTARTS):
+    """
+    Copy database ``alias`` to ``target`` (a path). Returns a ``CopyResult``.
+
+    ``pages=-1`` copies in one step. Positive values copy that many pages at
+    a time and sleep ``sleep`` seconds between steps.
+    """
+    connection = connections[alias]
+    if connection.vendor != 'sqlite':
+        raise ValueError(f'Database "{alias}" is not SQLite.')
+    connection.ensure_connection()
+
+    target = os.fspath(target)
+    partial = f'{target}.partial'
+    started_at = time.time()
+    began = time.monotonic()
+    state = {'pages': 0, 'remaining': None, 'restarts': 0}
+
+    def progress(status, remaining, total):
+        # Remaining pages going *up* means another connection wrote and SQLite restarted the copy.
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > max_restarts:
+                raise _TooManyRestarts
+        state['remaining'] = remaining
+        state['pages'] = total - remaining
+        if remaining and sleep:
+            # backup()'s own sleep only applies to BUSY retries; pace the steps here.
+            time.sleep(sleep)
+
+    def run(step_pages):
+        if os.path.exists(partial):
+            os.remove(partial)
+        destination = sqlite3.connect(partial)
+        try:
+            connection.connection.backup(destination, pages=step_pages, progress=progress)
+            destination.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            destination.close()
+
+    try:
+        run(pages)
+    except _TooManyRestarts:
+        state['remaining'] = None
+        run(-1)
+
+    # Stamp the file with the moment it reflects, for freshness checks.
+    os.utime(partial, (started_at, started_at))
+    os.replace(partial, target)
+    return CopyResult(target, state['pages'], time.monotonic() - began, started_at, state['restarts'])
+
+
+# ============================================================================
+# BACKUPS
+# ============================================================================
+
+class BackupReport:
+    """Outcome of one ``create_backup`` run."""
+
+    def __init__(self):
+        self.path = None
+        self.pages = 0
+        self.restarts = 0
+        self.size = 0
+        self.compressed_size = 0
+        self.copy_seconds = 0.0
+        self.verify_seconds = 0.0
+        self.compress_seconds = 0.0
+        self.integrity = None
+        self.removed = []
+
+    @property
+    def duration(self):
+        return self.copy_seconds + self.verify_seconds + self.compress_seconds
+
+    @property
+    def pages_per_second(self):
+        return self.pages / self.copy_seconds if self.copy_seconds else 0.0
+
+    def summary(self):
+        ratio = self.compressed_size / self.size if self.size else 0
+        return (
+            f"{self.pages} pages copied in {self.copy_seconds:.2f}s ({self.pages_per_second:.0f} pages/s, "
+            f"{self.restarts} restarts); integrity {self.integrity or 'not checked'} in {self.verify_seconds:.2f}s; "
+            f"{self.size / 1024:.0f} KB compressed to {self.compressed_size / 1024:.0f} KB ({ratio:.0%}) "
+            f"in {self.compress_seconds:.2f}s; {len(self.removed)} old snapshots removed; "
+            f"total {self.duration:.2f}s."
+        )
+
+
+class BackupError(Exception):
+    """The copy failed its integrity check; no snapshot was kept."""
+
+
+def integrity_check(path):
+    """``'ok'`` or the first problem ``PRAGMA integrity_check`` reports for ``path``."""
+    connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        return connection.execute('PRAGMA integrity_check').fetchone()[0]
+    finally:
+        connection.close()
+
+
+def list_backups(directory):
+    """Snapshot files in ``directory``, oldest first."""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    return sorted(directory.glob(f'{BACKUP_PREFIX}*{BACKUP_SUFFIX}'))
+
+
+def rotate(directory, keep):
+    """Delete all but the newest ``keep`` snapshots; returns the deleted paths."""
+    backups = list_backups(directory)
+    expired = backups[:-keep] if keep > 0 else []
+    for path in expired:
+        path.unlink()
+    return expired
+
+
+def create_backup(alias, directory, keep, pages=256, sleep=0.05, verify=True, compresslevel=6):
+    """Write a verified, gzipped snapshot of ``alias`` into ``directory``. Returns a ``BackupReport``."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    report = BackupReport()
+
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    raw = directory / f'.{BACKUP_PREFIX}{stamp}.sqlite3'
+    final = directory / f'{BACKUP_PREFIX}{stamp}{BACKUP_SUFFIX}'
+    try:
+        copied = copy_database(alias, raw, pages=pages, sleep=sleep)
+        report.pages, report.restarts, report.copy_seconds = copied.pages, copied.restarts, copied.duration
+        report.size = raw.stat().st_size
+
+        if verify:
+            began = time.monotonic()
+            report.integrity = integrity_check(raw)
+            report.verify_seconds = time.monotonic() - began
+            if report.integrity != 'ok':
+                raise BackupError(f'Integrity check failed: {report.integrity}')
+
+        began = time.monotonic()
+        partial = final.with_name(final.name + '.partial')
+        with open(raw, 'rb') as source, gzip.open(partial, 'wb', compresslevel=compresslevel) as target:
+            shutil.copyfileobj(source, target, length=1024 * 1024)
+        os.replace(partial, final)
+        report.compress_seconds = time.monotonic() - began
+        report.compressed_size = final.stat().st_size
+    finally:
+        raw.unlink(missing_ok=True)
+
+    report.path = final
+    report.removed = rotate(directory, keep)
+    return report
+
+
+def verify_backup(path):
+    """Decompress snapshot ``path`` to a temporary file and run ``integrity_check`` on it."""
+    with tempfile.TemporaryDirectory() as scratch:
+        raw = Path(scratch) / 'verify.sqlite3'
+        with gzip.open(path, 'rb') as source, open(raw, 'wb') as target:
+            shutil.copyfileobj(source, target, length=1024 * 1024)
+        return integrity_check(raw)
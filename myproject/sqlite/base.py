@@ -0,0 +1,40 @@
+import time
+
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+from . import lock_stats
+
+
+def _is_locked(error):
+    message = str(error).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Django's SQLite backend, with lock-wait metrics and retries on BEGIN."""
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.lock_retries = kwargs.pop('lock_retries', 0)
+        return kwargs
+
+    def _start_transaction_under_autocommit(self):
+        # The busy timeout has already waited once per attempt; a retry adds
+        # a short pause so a long writer can finish.
+        for attempt in range(self.lock_retries + 1):
+            started = time.monotonic()
+            try:
+                super()._start_transaction_under_autocommit()
+            # Django's cursor re-raises sqlite3's error as its own OperationalError.
+            except OperationalError as error:
+                if not _is_locked(error):
+                    raise
+                if attempt == self.lock_retries:
+                    lock_stats.record_failure()
+                    raise
+                lock_stats.record_retry()
+                time.sleep(0.05 * (2 ** attempt))
+            else:
+                lock_stats.record_begin(time.monotonic() - started)
+                return
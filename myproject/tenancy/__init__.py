@@ -0,0 +1,92 @@
+"""
+Multi-school tenancy
+====================
+One deployment can serve several schools. Each school (tenant) has its own
+SQLite file, so its data, users and sessions are fully separate. Memory,
+worker pools and releases are shared.
+
+* **Schools are files.** Every ``<slug>.sqlite3`` in ``TENANT_DIR`` is a
+  school, available as the database alias ``tenant_<slug>``. To add a
+  school, create its file, migrate it and restart the site:
+
+      touch tenants/north.sqlite3
+      python manage.py tenants --tenant north migrate
+      python manage.py tenants --tenant north createsuperuser
+
+  The ``default`` database stays the default school for requests that name
+  no school. An existing single-school install therefore works unchanged.
+* **Resolution** (``middleware.TenantMiddleware``). Checked in order:
+  ``TENANT_HOSTS`` (``{'north.example.edu': 'north'}``), then
+  ``<slug>.TENANT_DOMAIN`` subdomains, then a ``/<slug>/`` path prefix.
+  The path prefix is stripped before URL resolution and becomes the
+  script prefix, so every ``reverse()`` URL keeps it. Prefer hosts: under
+  path prefixes all schools share one cookie jar, so a browser is signed
+  in to one school at a time.
+* **Routing** (``context.use_tenant`` and ``routers.TenantRouter``). While
+  a school is active, the router sends ORM reads and writes to its alias.
+  The ``default`` connection of the current thread is also bound to the
+  school, so ``transaction.atomic()``, ``on_commit`` and raw
+  ``connection`` SQL follow it without a ``using=`` at every call site.
+  The reporting replica only mirrors the default school.
+* **Caching.** ``context.cache_key`` is the cache ``KEY_FUNCTION``, so
+  every cache key (reference-data versions, dashboard statistics, unread
+  counters) is scoped to the active school. In-process snapshots are kept
+  per school too.
+* **Workers.** ``manage.py runworker`` serves every school from one pool
+  and takes one job per school in turn, so a busy school cannot starve the
+  others.
+
+Code that runs outside a request (threads, streamed responses, commands)
+activates a school explicitly with ``use_tenant`` or ``in_tenant``.
+``manage.py tenants [--tenant SLUG] <command> ...`` runs any management
+command once per school.
+
+This module is imported by settings and must not import Django.
+"""
+
+import re
+from pathlib import Path
+
+
+ALIAS_PREFIX = 'tenant_'
+DATABASE_SUFFIX = '.sqlite3'
+SLUG_PATTERN = re.compile(r'[a-z0-9][a-z0-9-]*')
+
+
+def tenant_alias(slug):
+    return f'{ALIAS_PREFIX}{slug}'
+
+
+def discover_tenants(directory):
+    """``slug -> database path`` for every ``<slug>.sqlite3`` in ``directory``."""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return {}
+    tenants = {}
+    for path in sorted(directory.glob(f'*{DATABASE_SUFFIX}')):
+        slug = path.name[:-len(DATABASE_SUFFIX)]
+        if SLUG_PATTERN.fullmatch(slug):
+            tenants[slug] = str(path)
+    return tenants
+
+
+def parse_hosts(value):
+    """``'north.example.edu=north,south.example.edu=south'`` -> ``{host: slug}``."""
+    hosts = {}
+    for pair in filter(None, (item.strip() for item in (value or '').split(','))):
+        host, _, slug = pair.partition('=')
+        hosts[host.strip().lower()] = slug.strip()
+    return hosts
+
+
+def tenant_databases(tenants, options):
+    """``DATABASES`` entries for ``tenants``, all with the same ``OPTIONS``."""
+    return {
+        tenant_alias(slug): {
+            'ENGINE': 'myproject.sqlite',
+            'NAME': path,
+            'OPTIONS': dict(options),
+            'TEST': {'MIRROR': 'default'},
+        }
+        for slug, path in tenants.items()
+    }
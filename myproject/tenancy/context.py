@@ -0,0 +1,81 @@
+"""
+The active school of the current request, thread or task; see
+``myproject.tenancy``.
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from . import tenant_alias
+
+
+_current = ContextVar('tenant', default=None)
+# This thread's own ``default`` connection while a school's is bound in its place.
+_home = threading.local()
+
+
+class UnknownTenant(KeyError):
+    pass
+
+
+def tenants():
+    """Configured school slugs (not including the default school)."""
+    return sorted(getattr(settings, 'TENANTS', {}))
+
+
+def all_tenants():
+    """Every school, with ``None`` for the default school first."""
+    return [None, *tenants()]
+
+
+def current_tenant():
+    """Slug of the active school, or None for the default school."""
+    return _current.get()
+
+
+def current_alias():
+    tenant = _current.get()
+    return DEFAULT_DB_ALIAS if tenant is None else tenant_alias(tenant)
+
+
+@contextmanager
+def use_tenant(tenant):
+    """Run the block against school ``tenant`` (None: the default school)."""
+    if tenant is not None and tenant not in getattr(settings, 'TENANTS', {}):
+        raise UnknownTenant(tenant)
+
+    previous = connections[DEFAULT_DB_ALIAS]
+    if previous.alias == DEFAULT_DB_ALIAS:
+        _home.connection = previous
+    target = _home.connection if tenant is None else connections[tenant_alias(tenant)]
+
+    token = _current.set(tenant)
+    connections[DEFAULT_DB_ALIAS] = target
+    try:
+        yield
+    finally:
+        connections[DEFAULT_DB_ALIAS] = previous
+        _current.reset(token)
+
+
+def in_tenant(tenant, func):
+    """``func`` wrapped to run in school ``tenant``, e.g. on another thread."""
+    @wraps(func)
+    def wrapped(*args, **kwargs):
+        with use_tenant(tenant):
+            return func(*args, **kwargs)
+
+    return wrapped
+
+
+def cache_key(key, key_prefix, version):
+    """Cache ``KEY_FUNCTION``: Django's default key, scoped to the active school."""
+    tenant = _current.get()
+    if tenant is None:
+        return f'{key_prefix}:{version}:{key}'
+    return f'{key_prefix}:{version}:@{tenant}:{key}'
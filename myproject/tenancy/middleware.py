@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.http import Http404
+from django.http.request import split_domain_port
+from django.urls import get_script_prefix, set_script_prefix
+
+from .context import use_tenant
+
+
+def resolve_tenant(host, path_info):
+    """``(slug or None, path prefix or '')`` for a request to ``host`` and ``path_info``."""
+    known = getattr(settings, 'TENANTS', {})
+    host = split_domain_port(host)[0]
+
+    hosts = getattr(settings, 'TENANT_HOSTS', {})
+    if host in hosts:
+        return hosts[host], ''
+
+    domain = getattr(settings, 'TENANT_DOMAIN', '').lower()
+    if domain and host.endswith(f'.{domain}'):
+        slug = host[:-len(domain) - 1]
+        if slug not in known:
+            raise Http404(f'No school is served at {host}.')
+        return slug, ''
+
+    slug = path_info.lstrip('/').split('/', 1)[0]
+    if slug in known:
+        return slug, f'/{slug}'
+    return None, ''
+
+
+class TenantMiddleware:
+    """Serve each request from the school its host or path names; see ``myproject.tenancy``."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        tenant, prefix = resolve_tenant(request.get_host(), request.path_info)
+        request.tenant = tenant
+        if not prefix:
+            with use_tenant(tenant):
+                return self.get_response(request)
+
+        script_name = request.META.get('SCRIPT_NAME', '')
+        request.path_info = request.path_info[len(prefix):] or '/'
+        request.META['SCRIPT_NAME'] = script_name + prefix
+        previous = get_script_prefix()
+        set_script_prefix(f'{script_name}{prefix}/')
+        try:
+            with use_tenant(tenant):
+                return self.get_response(request)
+        finally:
+            set_script_prefix(previous)
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0002_class_updated_at_section_updated_at_and_more'),
+        ('student', '0013_studentresult'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentinfo',
+            index=models.Index(fields=['klass', 'session', 'section', 'roll_no'], name='student_roster_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentresult',
+            index=models.Index(fields=['klass', 'section', 'session', 'subject', 'exam_type', '-recorded_at'], name='result_grid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentresult',
+            index=models.Index(fields=['-recorded_at'], name='result_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentresult',
+            index=models.Index(fields=['student', '-recorded_at'], name='result_student_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0014_studentinfo_student_roster_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentnotification',
+            index=models.Index(fields=['student', '-created_at'], name='student_inbox_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0015_studentnotification_student_inbox_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentleave',
+            name='status_changed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.utils import timezone
 from account.models import User
+from account.sequences import allocate_admission_nos, allocate_student_user_ids
 from academic.models import Section, Class, Session, Subject
 
 class StudentInfo(models.Model):
@@ -116,34 +117,13 @@ class StudentInfo(models.Model):
     # ---------------- Auto Generate IDs ---------------- #
     def save(self, *args, **kwargs):
         now = timezone.now()
-        year = now.strftime("%y")   # 2025 -> "25"
-        month = now.strftime("%m")  # 03 -> "03"
-        
+
         # ============================================
         # Generate student_user_id (YYMMCC0001)
         # ============================================
         if not self.student_user_id and self.klass:
-            # Get class_code (2 digits max)
-            class_code = f"{self.klass.class_code:02d}"  # e.g., 1 -> "01", 10 -> "10"
-            
-            # Prefix: YYMM + class_code (e.g., "250301" for year=25, month=03, class=01)
-            prefix = f"{year}{month}{class_code}"
-            
-            # Find last student with this prefix
-            last = StudentInfo.objects.filter(
-                student_user_id__startswith=prefix
-            ).order_by("-student_user_id").first()
-            
-            # Increment counter
-            if last:
-                # Extract last 4 digits and increment
-                counter = int(last.student_user_id[-4:]) + 1
-            else:
-                counter = 1
-            
-            # Generate student_user_id: prefix + 4-digit counter
             # Format: YYMM + CC + 0001 (e.g., "2503010001")
-            self.student_user_id = f"{prefix}{counter:04d}"
+            self.student_user_id = allocate_student_user_ids(self.klass.class_code, now=now)[0]
             
             # Update User.user_id with the same student_user_id
             if self.user:
@@ -154,24 +134,7 @@ class StudentInfo(models.Model):
         # Generate admission_no (ADM-YYMM-0001)
         # ============================================
         if not self.admission_no:
-            # Prefix: ADM-YYMM (e.g., "ADM-2503")
-            admission_prefix = f"ADM-{year}{month}"
-            
-            # Find last admission number with this prefix
-            last_admission = StudentInfo.objects.filter(
-                admission_no__startswith=admission_prefix
-            ).order_by("-admission_no").first()
-            
-            # Increment counter
-            if last_admission:
-                # Extract last 4 digits after the last hyphen
-                last_counter = int(last_admission.admission_no.split('-')[-1])
-                counter = last_counter + 1
-            else:
-                counter = 1
-            
-            # Generate admission_no: ADM-YYMM-0001
-            self.admission_no = f"{admission_prefix}-{counter:04d}"
+            self.admission_no = allocate_admission_nos(now=now)[0]
         
         # ============================================
         # Auto-set roll_no from last 4 digits of student_user_id
@@ -189,6 +152,10 @@ class StudentInfo(models.Model):
         verbose_name = "Student Info"
         verbose_name_plural = "Student"
         ordering = ["session", "klass", "section", "roll_no"]
+        indexes = [
+            # Class rosters: filter by class/session(/section), order by roll.
+            models.Index(fields=['klass', 'session', 'section', 'roll_no'], name='student_roster_idx'),
+        ]
 
 
 class StudentNotification(models.Model):
@@ -204,6 +171,9 @@ class StudentNotification(models.Model):
     class Meta:
         verbose_name_plural = "Student Notifications"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=['student', '-created_at'], name='student_inbox_idx'),
+        ]
 
     def __str__(self):
         return f"Notification for {self.student.first_name} {self.student.last_name}"
@@ -252,6 +222,7 @@ class StudentLeave(models.Model):
     reason = models.TextField()
     status = models.CharField(max_length=20, choices=STATUS, default="Pending")
     created_at = models.DateTimeField(auto_now_add=True)
+    status_changed_at = models.DateTimeField(blank=True, null=True)
 
     class Meta:
         ordering = ["-created_at"]
@@ -335,6 +306,16 @@ class StudentResult(models.Model):
         verbose_name_plural = "Student Results"
         ordering = ["-recorded_at"]
         unique_together = ("student", "subject", "exam_type", "session")
+        indexes = [
+            # manage_results filters and newest-first ordering.
+            models.Index(
+                fields=['klass', 'section', 'session', 'subject', 'exam_type', '-recorded_at'],
+                name='result_grid_idx',
+            ),
+            models.Index(fields=['-recorded_at'], name='result_recent_idx'),
+            # A student's own results page.
+            models.Index(fields=['student', '-recorded_at'], name='result_student_idx'),
+        ]
 
     def __str__(self):
         subject_name = self.subject.name if self.subject else "N/A"
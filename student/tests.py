@@ -1,3 +1,88 @@
-from django.test import TestCase
+from datetime import date, datetime, timezone
 
-# Create your tests here.
+from django.test import RequestFactory, TestCase
+
+from academic.models import Class, Session
+from account.models import User
+from myproject.listing import _decode_cursor, _encode_cursor
+
+from .models import StudentInfo
+from .views import STUDENT_LIST
+
+
+class KeysetPaginationTests(TestCase):
+    # Repeated and missing first names, so pages split inside ties and NULLs.
+    NAMES = ['Ann', 'Ann', None, 'Bob', None, 'Ann', 'Cid', 'Bob', None, 'Dee', 'Ann']
+
+    @classmethod
+    def setUpTestData(cls):
+        klass = Class.objects.create(name='One', class_code=1)
+        session = Session.objects.create(name='2025-2026', start_date=date(2025, 1, 1), end_date=date(2025, 12, 31))
+        for index, name in enumerate(cls.NAMES):
+            StudentInfo.objects.create(
+                user=User.objects.create(username=f'student{index}', user_type='Student'),
+                klass=klass, session=session, first_name=name, last_name='X',
+            )
+
+    def paginate(self, query=''):
+        return STUDENT_LIST.paginate(RequestFactory().get(f'/?{query}'), StudentInfo.objects.all())
+
+    def expected(self, sort):
+        ordering = {
+            'name': lambda student: (student.first_name or '', student.last_name or '', student.id),
+            'newest': lambda student: (student.created_at, student.id),
+        }[sort]
+        return [student.id for student in sorted(StudentInfo.objects.all(), key=ordering, reverse=sort == 'newest')]
+
+    def walk(self, sort):
+        pages = [self.paginate(f'sort={sort}&per_page=3')]
+        while pages[-1].next_query:
+            pages.append(self.paginate(pages[-1].next_query))
+        return pages
+
+    def newest_fields(self):
+        return STUDENT_LIST._cursor_fields(StudentInfo, 'newest')
+
+    def test_cursor_round_trip(self):
+        cursor = _encode_cursor('newest', ['2025-03-03T10:00:00+00:00', 42])
+        self.assertNotIn('=', cursor)
+        self.assertEqual(
+            _decode_cursor(cursor, 'newest', self.newest_fields()),
+            [datetime(2025, 3, 3, 10, tzinfo=timezone.utc), 42],
+        )
+
+    def test_foreign_or_broken_cursors_start_from_the_top(self):
+        cursor = _encode_cursor('newest', ['2025-03-03T10:00:00+00:00', 42])
+        self.assertIsNone(_decode_cursor(cursor, 'name', self.newest_fields()))
+        self.assertIsNone(_decode_cursor(cursor, 'newest', self.newest_fields()[:1]))
+        self.assertIsNone(_decode_cursor('not-a-cursor!', 'newest', self.newest_fields()))
+        page = self.paginate('sort=name&after=garbage&per_page=3')
+        self.assertEqual([student.id for student in page], self.expected('name')[:3])
+
+    def test_tampered_cursor_values_start_from_the_top(self):
+        for values in [['garbage', 1], ['2025-03-03T10:00:00+00:00', 'x'], ['2025-03-03T10:00:00+00:00', [1]],
+                       [None, 1], [{}, 1]]:
+            with self.subTest(values=values):
+                for direction in ['after', 'before']:
+                    cursor = _encode_cursor('newest', values)
+                    page = self.paginate(f'sort=newest&{direction}={cursor}&per_page=3')
+                    self.assertEqual([student.id for student in page], self.expected('newest')[:3])
+
+    def test_forward_pages_cover_every_row_once(self):
+        for sort in ['name', 'newest']:
+            with self.subTest(sort=sort):
+                pages = self.walk(sort)
+                self.assertEqual([student.id for page in pages for student in page], self.expected(sort))
+                self.assertEqual([len(page) for page in pages], [3, 3, 3, 2])
+                self.assertFalse(pages[0].has_previous)
+
+    def test_backward_pages_match_the_forward_pages(self):
+        for sort in ['name', 'newest']:
+            with self.subTest(sort=sort):
+                forward = self.walk(sort)
+                page = forward[-1]
+                for previous in reversed(forward[:-1]):
+                    page = self.paginate(page.previous_query)
+                    self.assertEqual([student.id for student in page], [student.id for student in previous])
+                    self.assertTrue(page.has_next)
+                self.assertEqual(page.previous_query, '')
@@ -9,11 +9,16 @@ from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_http_methods
 
 from account.models import User
+from account.sequences import allocate_usernames
+from academic.cache import get_reference_data
 from academic.models import Session, Class, Section
-from django.db.models import Q
-from teacher.models import AttendanceRecord, Assignment, AssignmentSubmission
+from django.db.models import Count, Q
+from teacher.models import AttendanceRecord, AttendanceRollup, Assignment, AssignmentSubmission
+from teacher.rollups import student_totals
+from myproject.listing import ListFilter, ListSpec
+from administration.notifications import student_inbox, with_read_state
 
-from .models import StudentInfo, StudentNotification, StudentFeedback, StudentLeave, StudentResult
+from .models import StudentInfo, StudentFeedback, StudentLeave, StudentResult
 from .forms import StudentFeedbackForm, StudentLeaveForm, AssignmentSubmissionForm
 
 # Helpers
@@ -24,13 +29,43 @@ def _parse_int(value):
         return None
 
 
+STUDENT_LIST = ListSpec(
+    sorts={
+        'roster': ['session', 'klass', 'section', 'roll_no', 'id'],
+        'newest': ['-created_at', '-id'],
+        'name': ['first_name', 'last_name', 'id'],
+    },
+    filters=[
+        ListFilter('klass', 'klass_id', parse=int),
+        ListFilter('section', 'section_id', parse=int),
+        ListFilter('session', 'session_id', parse=int),
+        ListFilter('gender', choices=StudentInfo.GENDER),
+    ],
+    search=['first_name', 'last_name', 'student_user_id', 'admission_no', 'phone'],
+    select_related=['klass', 'section', 'session'],
+)
+
+
+# The student's own attendance history, newest first. Totals come from the
+# rollups (teacher.rollups); only one page of rows is ever loaded.
+ATTENDANCE_HISTORY = ListSpec(
+    sorts={'newest': ['-attendance__date', '-attendance__created_at', '-id']},
+    page_size=50,
+)
+
+
 # Create your views here.
 def student_list(request):
-
-    students = StudentInfo.objects.all()
+    reference = get_reference_data()
+    page = STUDENT_LIST.paginate(request, StudentInfo.objects.all())
 
     context = {
-        "students": students,
+        "students": page,
+        "page": page,
+        "filters": STUDENT_LIST.filter_values(request),
+        "classes": reference.classes,
+        "sections": reference.sections,
+        "sessions": reference.sessions,
     }
 
     return render(request, "Student/student_list.html", context)
@@ -50,9 +85,10 @@ def student_detail(request, id):
 
 def student_create(request):
     # Get all classes, sessions, and sections for the dropdowns
-    classes = Class.objects.all()
-    sessions = Session.objects.all()
-    sections = Section.objects.all()
+    reference = get_reference_data()
+    classes = reference.classes
+    sessions = reference.sessions
+    sections = reference.sections
 
     if request.method == 'POST':
         try:
@@ -93,23 +129,7 @@ def student_create(request):
             password = ''.join(secrets.choice(alphabet) for i in range(12))
 
             # Auto-generate username (student1, student2, student3, ...)
-            last_student_user = User.objects.filter(
-                user_type='Student',
-                username__startswith='student'
-            ).order_by('-id').first()
-
-            if last_student_user and last_student_user.username.startswith('student'):
-                # Extract the number from the last username
-                try:
-                    last_number = int(last_student_user.username.replace('student', ''))
-                    username = f'student{last_number + 1}'
-                except ValueError:
-                    # If extraction fails, count all student users and add 1
-                    count = User.objects.filter(user_type='Student').count()
-                    username = f'student{count + 1}'
-            else:
-                # First student
-                username = 'student1'
+            username = allocate_usernames('student')[0]
 
             # Create User account first
             user = User.objects.create_user(
@@ -189,20 +209,23 @@ def student_attendance(request):
 
     student = get_object_or_404(StudentInfo, user=request.user)
 
-    base_records = AttendanceRecord.objects.filter(student=student)
-    subject_choices = base_records.filter(
-        attendance__subject__isnull=False
-    ).values_list('attendance__subject_id', 'attendance__subject__name').distinct()
+    # The per-subject rollup rows name every subject the student has attendance in.
+    reference = get_reference_data()
+    subject_ids = set(
+        AttendanceRollup.objects.filter(student=student, subject__isnull=False)
+        .filter(Q(present_count__gt=0) | Q(absent_count__gt=0))
+        .values_list('subject_id', flat=True)
+    )
     subject_options = sorted(
         [
-            {'id': subject_id, 'name': subject_name}
-            for subject_id, subject_name in subject_choices
-            if subject_id is not None
+            {'id': subject.id, 'name': subject.name}
+            for subject in map(reference.get_subject, subject_ids)
+            if subject is not None
         ],
         key=lambda item: item['name'] or ''
     )
 
-    records = base_records.select_related(
+    records = AttendanceRecord.objects.filter(student=student).select_related(
         'attendance__teacher',
         'attendance__klass',
         'attendance__section',
@@ -252,16 +275,24 @@ def student_attendance(request):
     elif status_value:
         records = records.filter(status=status_value)
 
-    record_list = list(records.order_by('-attendance__date', '-attendance__created_at'))
+    page = ATTENDANCE_HISTORY.paginate(request, records)
 
-    total_classes = len(record_list)
-    present_count = sum(1 for rec in record_list if rec.status == AttendanceRecord.STATUS_PRESENT)
-    absent_count = sum(1 for rec in record_list if rec.status == AttendanceRecord.STATUS_ABSENT)
+    if start_date_obj or end_date_obj or status_value:
+        # Date/status windows are not pre-aggregated; count them in the database.
+        totals = records.aggregate(
+            present=Count('id', filter=Q(status=AttendanceRecord.STATUS_PRESENT)),
+            absent=Count('id', filter=Q(status=AttendanceRecord.STATUS_ABSENT)),
+        )
+        present_count, absent_count = totals['present'], totals['absent']
+    else:
+        present_count, absent_count = student_totals(student, subject_id=subject_id)
+    total_classes = present_count + absent_count
     attendance_percentage = round((present_count / total_classes) * 100, 2) if total_classes else 0.0
 
     context = {
         'student': student,
-        'records': record_list,
+        'records': page,
+        'page': page,
         'summary': {
             'total': total_classes,
             'present': present_count,
@@ -455,9 +486,10 @@ def student_edit(request, id):
     student = StudentInfo.objects.select_related('user', 'klass', 'session', 'section').get(id=id)
 
     # Get all classes, sessions, and sections for the dropdowns
-    classes = Class.objects.all()
-    sessions = Session.objects.all()
-    sections = Section.objects.all()
+    reference = get_reference_data()
+    classes = reference.classes
+    sessions = reference.sessions
+    sections = reference.sections
 
     if request.method == 'POST':
         try:
@@ -581,7 +613,7 @@ def student_notification(request):
         return HttpResponseForbidden('Only students can view notifications.')
 
     student = get_object_or_404(StudentInfo, user=request.user)
-    notifications = StudentNotification.objects.filter(student=student).order_by('-created_at')
+    notifications = with_read_state(request.user, list(student_inbox(student)))
 
     return render(request, 'Student/notifications.html', {
         'notifications': notifications,
@@ -1,4 +1,7 @@
 from django.contrib import admin
+from django.db import transaction
+
+from .attendance import recount_attendance
 from .models import (
     TeacherInfo,
     TeacherNotification,
@@ -6,7 +9,10 @@ from .models import (
     Feedback,
     Attendance,
     AttendanceRecord,
+    AttendanceRollup,
+    AttendanceSubmission,
 )
+from .rollups import remove_records
 
 
 @admin.register(TeacherInfo)
@@ -70,6 +76,8 @@ class AttendanceRecordInline(admin.TabularInline):
     model = AttendanceRecord
     extra = 0
     readonly_fields = ('student', 'status', 'marked_at')
+    # Deleting a record must also update the counters and rollups; use the record list.
+    can_delete = False
 
 
 @admin.register(Attendance)
@@ -86,3 +94,30 @@ class AttendanceRecordAdmin(admin.ModelAdmin):
     list_display = ('attendance', 'student', 'status', 'marked_at')
     list_filter = ('status',)
     search_fields = ('student__first_name', 'student__last_name', 'attendance__klass__name')
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, AttendanceRecord.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        # Keep the sheet counters and the rollups in line with the records.
+        with transaction.atomic():
+            attendance_ids = set(queryset.values_list('attendance_id', flat=True))
+            remove_records(queryset)
+            super().delete_queryset(request, queryset)
+            recount_attendance(Attendance.objects.filter(pk__in=attendance_ids))
+
+
+@admin.register(AttendanceRollup)
+class AttendanceRollupAdmin(admin.ModelAdmin):
+    list_display = ('student', 'session', 'subject', 'present_count', 'absent_count', 'updated_at')
+    list_filter = ('session', 'subject')
+    search_fields = ('student__first_name', 'student__last_name', 'student__student_user_id')
+    readonly_fields = ('present_count', 'absent_count', 'updated_at')
+
+
+@admin.register(AttendanceSubmission)
+class AttendanceSubmissionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'teacher', 'klass', 'subject', 'date', 'status', 'changed', 'created_at', 'applied_at')
+    list_filter = ('status', 'date')
+    list_select_related = ('teacher', 'klass', 'subject')
+    readonly_fields = ('attendance', 'changed', 'error', 'created_at', 'applied_at')
@@ -0,0 +1,204 @@
+"""
+Attendance persistence helpers.
+
+``save_attendance_records`` diffs a submitted roll call against the rows that
+already exist for an ``Attendance`` entry and only writes what changed:
+new students are inserted, edited statuses/remarks are bulk-updated and
+students who left the roster are deleted. Re-saving an unchanged sheet
+performs no record writes at all. The same transaction stores the sheet's
+total/present/absent counts on the ``Attendance`` row, so history pages read
+them without touching the records table, and applies the per-student status
+changes to the attendance rollups (see ``teacher.rollups``).
+
+It also decodes the compact JSON roll call posted by the take-attendance page:
+
+    {"roster_version": "3f2a9c1b7d04", "statuses": "1101...", "remarks": {"42": "Late"}}
+
+``statuses`` holds one character per student in roster order (``1`` present,
+``0`` absent) and ``remarks`` lists only the students that have one, so the
+request stays small and is not subject to DATA_UPLOAD_MAX_NUMBER_FIELDS.
+"""
+
+import hashlib
+from collections import namedtuple
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Attendance, AttendanceRecord
+from .rollups import apply_rollup_deltas, status_delta
+
+
+class AttendanceChanges(namedtuple('AttendanceChanges', 'created updated deleted unchanged')):
+    __slots__ = ()
+
+    @property
+    def changed(self):
+        return self.created + self.updated + self.deleted
+
+
+def save_attendance_records(attendance, marks):
+    """
+    Bring ``attendance.records`` in line with ``marks``.
+
+    ``marks`` maps ``student_id -> (status, remark)`` for every student on the
+    roster; existing records for students not in ``marks`` are removed.
+    Returns an ``AttendanceChanges`` with per-operation row counts.
+    """
+    with transaction.atomic():
+        existing = {
+            record.student_id: record
+            for record in AttendanceRecord.objects.filter(attendance=attendance).only(
+                'id', 'student_id', 'status', 'remark'
+            )
+        }
+
+        now = timezone.now()
+        to_create = []
+        to_update = []
+        unchanged = 0
+        deltas = {}
+
+        for student_id, (status, remark) in marks.items():
+            record = existing.pop(student_id, None)
+            if record is None:
+                to_create.append(AttendanceRecord(
+                    attendance=attendance,
+                    student_id=student_id,
+                    status=status,
+                    remark=remark,
+                ))
+                deltas[student_id] = status_delta(None, status)
+            elif record.status != status or (record.remark or None) != remark:
+                deltas[student_id] = status_delta(record.status, status)
+                record.status = status
+                record.remark = remark
+                # bulk_update() skips auto_now, so stamp the edit explicitly.
+                record.marked_at = now
+                to_update.append(record)
+            else:
+                unchanged += 1
+
+        # Whatever is left belongs to students who are no longer on the roster.
+        stale_ids = [record.id for record in existing.values()]
+        for record in existing.values():
+            deltas[record.student_id] = status_delta(record.status, None)
+        if stale_ids:
+            AttendanceRecord.objects.filter(id__in=stale_ids).delete()
+        if to_create:
+            AttendanceRecord.objects.bulk_create(to_create)
+        if to_update:
+            AttendanceRecord.objects.bulk_update(to_update, ['status', 'remark', 'marked_at'])
+        apply_rollup_deltas(attendance, deltas)
+
+        # After the diff the records mirror ``marks`` exactly, so count from it.
+        counts = {
+            'total_count': len(marks),
+            'present_count': sum(1 for status, _ in marks.values() if status == AttendanceRecord.STATUS_PRESENT),
+            'absent_count': sum(1 for status, _ in marks.values() if status == AttendanceRecord.STATUS_ABSENT),
+        }
+        if any(getattr(attendance, field) != value for field, value in counts.items()):
+            Attendance.objects.filter(pk=attendance.pk).update(**counts)
+            for field, value in counts.items():
+                setattr(attendance, field, value)
+
+    return AttendanceChanges(
+        created=len(to_create),
+        updated=len(to_update),
+        deleted=len(stale_ids),
+        unchanged=unchanged,
+    )
+
+
+def save_roll_call(teacher, klass_id, section_id, session_id, subject_id, date, note, marks):
+    """
+    Create or update the teacher's ``Attendance`` entry for the sheet and
+    store ``marks`` with ``save_attendance_records``. Returns
+    ``(attendance, changes)``.
+    """
+    with transaction.atomic():
+        attendance, _ = Attendance.objects.get_or_create(
+            teacher=teacher,
+            klass_id=klass_id,
+            session_id=session_id,
+            section_id=section_id,
+            subject_id=subject_id,
+            date=date,
+        )
+        if attendance.note != note:
+            attendance.note = note
+            attendance.save(update_fields=['note', 'updated_at'])
+
+        changes = save_attendance_records(attendance, marks)
+    return attendance, changes
+
+
+class RosterChanged(ValueError):
+    """The roster changed since the page was rendered; the client must reload."""
+
+
+STATUS_BITS = {
+    '1': AttendanceRecord.STATUS_PRESENT,
+    '0': AttendanceRecord.STATUS_ABSENT,
+}
+
+
+def roster_version(students):
+    """Short fingerprint of the ordered roster the status string is aligned to."""
+    ids = ','.join(str(student.id) for student in students)
+    return hashlib.sha1(ids.encode()).hexdigest()[:12]
+
+
+def decode_compact_marks(payload, students):
+    """
+    Turn a compact payload into the ``marks`` dict for ``save_attendance_records``.
+
+    Raises ``RosterChanged`` when the payload was built for a different roster
+    and ``ValueError`` when it is malformed.
+    """
+    if payload.get('roster_version') != roster_version(students):
+        raise RosterChanged('The student list has changed. Please reload the page.')
+
+    statuses = payload.get('statuses')
+    if not isinstance(statuses, str) or len(statuses) != len(students):
+        raise ValueError('The status string does not match the number of students.')
+    if set(statuses) - set(STATUS_BITS):
+        raise ValueError('Statuses may only contain 1 (present) or 0 (absent).')
+
+    remarks = payload.get('remarks') or {}
+    if not isinstance(remarks, dict):
+        raise ValueError('Remarks must be an object keyed by student id.')
+
+    marks = {}
+    for student, bit in zip(students, statuses):
+        remark = remarks.get(str(student.id))
+        remark = str(remark).strip()[:255] if remark else None
+        marks[student.id] = (STATUS_BITS[bit], remark or None)
+    return marks
+
+
+COUNT_FIELDS = ['total_count', 'present_count', 'absent_count']
+
+
+def recount_attendance(attendances):
+    """
+    Recompute the stored counters for ``attendances`` (a queryset) from their
+    records and fix the rows that drifted. Returns the number of rows updated.
+    """
+    counted = attendances.order_by().annotate(
+        actual_total=Count('records'),
+        actual_present=Count('records', filter=Q(records__status=AttendanceRecord.STATUS_PRESENT)),
+        actual_absent=Count('records', filter=Q(records__status=AttendanceRecord.STATUS_ABSENT)),
+    ).only('id', *COUNT_FIELDS)
+
+    stale = []
+    for attendance in counted:
+        actual = (attendance.actual_total, attendance.actual_present, attendance.actual_absent)
+        if actual != (attendance.total_count, attendance.present_count, attendance.absent_count):
+            attendance.total_count, attendance.present_count, attendance.absent_count = actual
+            stale.append(attendance)
+
+    if stale:
+        Attendance.objects.bulk_update(stale, COUNT_FIELDS)
+    return len(stale)
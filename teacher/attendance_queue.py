@@ -0,0 +1,175 @@
+"""
+Queued attendance writes
+========================
+With ``ATTENDANCE_WRITE_MODE = 'queued'`` the take-attendance page stops
+writing roll calls itself. Each request validates its roll call as usual,
+appends one ``AttendanceSubmission`` row (a single small insert) and
+answers at once. The coalescer job, ``teacher.tasks.apply_attendance_submissions``,
+then merges the queue into ``Attendance`` / ``AttendanceRecord``.
+
+``apply_pending`` drains the queue in batches of ``ATTENDANCE_COALESCE_BATCH``
+(default 200). Each batch is one write transaction, i.e. one lock acquisition
+for up to 200 roll calls instead of one per request. Within a batch only the
+newest submission per sheet (teacher, class, section, session, subject,
+date) is applied; older ones are marked ``superseded``. Each sheet runs in
+its own savepoint, so a failing sheet is marked ``failed`` without undoing
+the rest.
+
+``submit_roll_call`` queues the coalescer ``ATTENDANCE_COALESCE_DELAY``
+seconds (default 1) after the first submission of a burst. Submissions that
+arrive meanwhile join the same run. A once-a-minute sweep catches anything
+that arrives just as a run finishes.
+
+Queued mode needs ``manage.py runworker`` and ``JOBS_EAGER`` off. An eager
+coalescer would run inside the submitting request, which is the lock wait
+this mode exists to avoid, and the sweep only runs on a worker. With
+``JOBS_EAGER`` on, ``queued_mode()`` logs a warning and the page writes
+directly.
+
+The page shows each sheet's latest submission state (queued / saved /
+failed), and ``attendance_submission_status`` serves it as JSON for polling.
+"""
+
+import logging
+from collections import namedtuple
+from datetime import timedelta
+from functools import cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .attendance import save_roll_call
+from .models import AttendanceSubmission
+
+
+DEFAULT_BATCH = 200
+DEFAULT_DELAY = 1.0
+COALESCER_KEY = 'attendance:coalesce'
+
+logger = logging.getLogger(__name__)
+
+CoalesceResult = namedtuple('CoalesceResult', 'transactions submissions sheets superseded failed')
+
+
+def queued_mode():
+    if getattr(settings, 'ATTENDANCE_WRITE_MODE', 'direct') != 'queued':
+        return False
+    if getattr(settings, 'JOBS_EAGER', True):
+        _warn_eager()
+        return False
+    return True
+
+
+@cache
+def _warn_eager():
+    logger.warning(
+        "ATTENDANCE_WRITE_MODE = 'queued' needs a job worker and JOBS_EAGER off; "
+        "writing attendance directly instead."
+    )
+
+
+def _sheet(submission):
+    return (
+        submission.teacher_id, submission.klass_id, submission.section_id,
+        submission.session_id, submission.subject_id, submission.date,
+    )
+
+
+def submit_roll_call(teacher, klass_id, section_id, session_id, subject_id, date, note, marks):
+    """Queue a validated roll call (``marks`` as for ``save_attendance_records``)."""
+    from .tasks import apply_attendance_submissions
+
+    submission = AttendanceSubmission.objects.create(
+        teacher=teacher,
+        klass_id=klass_id,
+        section_id=section_id,
+        session_id=session_id,
+        subject_id=subject_id,
+        date=date,
+        note=note,
+        marks={str(student_id): [status, remark] for student_id, (status, remark) in marks.items()},
+    )
+    apply_attendance_submissions.delay(
+        delay=timedelta(seconds=getattr(settings, 'ATTENDANCE_COALESCE_DELAY', DEFAULT_DELAY)),
+        unique_key=COALESCER_KEY,
+        eager=False,
+    )
+    return submission
+
+
+def latest_submission(teacher, klass_id, section_id, session_id, subject_id, date):
+    """The teacher's most recent submission for this sheet, or None."""
+    return AttendanceSubmission.objects.filter(
+        teacher=teacher,
+        klass_id=klass_id,
+        section_id=section_id,
+        session_id=session_id,
+        subject_id=subject_id,
+        date=date,
+    ).order_by('-id').first()
+
+
+def submission_marks(submission):
+    """``student_id -> (status, remark)`` from a stored submission."""
+    return {int(student_id): (status, remark) for student_id, (status, remark) in submission.marks.items()}
+
+
+def _apply_batch(batch_size):
+    with transaction.atomic():
+        # Read inside the write transaction, so concurrent coalescers never see the same rows.
+        pending = list(
+            AttendanceSubmission.objects.filter(status=AttendanceSubmission.STATUS_QUEUED)
+            .select_related('teacher')
+            .order_by('id')[:batch_size]
+        )
+        latest = {}
+        for submission in pending:
+            latest[_sheet(submission)] = submission
+
+        now = timezone.now()
+        newest_ids = {submission.pk for submission in latest.values()}
+        superseded = [submission.pk for submission in pending if submission.pk not in newest_ids]
+        if superseded:
+            AttendanceSubmission.objects.filter(pk__in=superseded).update(
+                status=AttendanceSubmission.STATUS_SUPERSEDED, applied_at=now,
+            )
+
+        failed = 0
+        for submission in latest.values():
+            try:
+                with transaction.atomic():
+                    attendance, changes = save_roll_call(
+                        submission.teacher, *_sheet(submission)[1:], submission.note, submission_marks(submission),
+                    )
+            except Exception as exc:
+                failed += 1
+                submission.status = AttendanceSubmission.STATUS_FAILED
+                submission.error = str(exc)
+            else:
+                submission.status = AttendanceSubmission.STATUS_SAVED
+                submission.attendance = attendance
+                submission.changed = changes.changed
+            submission.applied_at = now
+        AttendanceSubmission.objects.bulk_update(
+            list(latest.values()), ['status', 'attendance', 'changed', 'error', 'applied_at'],
+        )
+    return len(pending), len(latest), len(superseded), failed
+
+
+def apply_pending(batch_size=None):
+    """Merge every queued submission; returns a ``CoalesceResult``."""
+    batch_size = batch_size or getattr(settings, 'ATTENDANCE_COALESCE_BATCH', DEFAULT_BATCH)
+    totals = [0, 0, 0, 0, 0]
+    # A plain read first: an idle run must not take the database write lock.
+    if not AttendanceSubmission.objects.filter(status=AttendanceSubmission.STATUS_QUEUED).exists():
+        return CoalesceResult(*totals)
+    while True:
+        submissions, sheets, superseded, failed = _apply_batch(batch_size)
+        if not submissions:
+            break
+        for index, value in enumerate((1, submissions, sheets, superseded, failed)):
+            totals[index] += value
+        if submissions < batch_size:
+            break
+    return CoalesceResult(*totals)
@@ -1,5 +1,6 @@
 from django import forms
 
+from academic.cache import get_reference_data
 from student.models import StudentResult
 
 from .models import TeacherLeave, Feedback, Assignment
@@ -145,6 +146,16 @@ class TeacherAssignmentForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # Render the dropdowns from the cached reference data; validation still
+        # checks the submitted ids against the database querysets.
+        reference = get_reference_data()
+        for name, options in (
+            ('klass', reference.classes),
+            ('section', reference.sections),
+            ('session', reference.sessions),
+            ('subject', reference.subjects),
+        ):
+            self.fields[name].choices = [('', '---------')] + [(obj.pk, str(obj)) for obj in options]
         for name, field in self.fields.items():
             existing = field.widget.attrs.get('class', '')
             field.widget.attrs['class'] = f"{existing} form-control".strip()
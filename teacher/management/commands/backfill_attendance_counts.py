@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from teacher.attendance import recount_attendance
+from teacher.models import Attendance
+
+
+class Command(BaseCommand):
+    help = "Recompute the total/present/absent counters stored on attendance entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Attendance entries per transaction.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+
+        last_id = 0
+        checked = 0
+        repaired = 0
+        while True:
+            ids = list(
+                Attendance.objects.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+
+            with transaction.atomic():
+                repaired += recount_attendance(Attendance.objects.filter(id__in=ids))
+            checked += len(ids)
+            last_id = ids[-1]
+
+            if options['verbosity'] >= 2:
+                self.stdout.write(f'Checked {checked} entries...')
+
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} attendance entries, repaired {repaired}.'))
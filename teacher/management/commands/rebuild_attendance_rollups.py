@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from academic.models import Session
+from teacher.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-student attendance rollups from the attendance records."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--session', type=int, help='Only rebuild this academic session (id).')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rollup rows per INSERT.')
+
+    def handle(self, *args, **options):
+        session_id = options['session']
+        if session_id and not Session.objects.filter(id=session_id).exists():
+            raise CommandError(f'Session {session_id} does not exist.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        written = rebuild_rollups(session_id=session_id, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} attendance rollup rows.'))
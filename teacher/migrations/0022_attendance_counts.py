@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:23
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counts(apps, schema_editor):
+    Attendance = apps.get_model('teacher', 'Attendance')
+    AttendanceRecord = apps.get_model('teacher', 'AttendanceRecord')
+
+    def count(**filters):
+        rows = (
+            AttendanceRecord.objects.filter(attendance=OuterRef('pk'), **filters)
+            .order_by()
+            .values('attendance')
+            .annotate(n=Count('id'))
+            .values('n')
+        )
+        return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+    Attendance.objects.update(
+        total_count=count(),
+        present_count=count(status='Present'),
+        absent_count=count(status='Absent'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teacher', '0021_assignment_assignmentsubmission'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='absent_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='present_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='total_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counts, migrations.RunPython.noop),
+    ]
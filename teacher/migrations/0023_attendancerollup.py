@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:25
+
+import django.db.models.deletion
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def build_rollups(apps, schema_editor):
+    AttendanceRecord = apps.get_model('teacher', 'AttendanceRecord')
+    AttendanceRollup = apps.get_model('teacher', 'AttendanceRollup')
+
+    grouped = (
+        AttendanceRecord.objects.filter(attendance__session__isnull=False)
+        .order_by()
+        .values('student_id', 'attendance__session_id', 'attendance__subject_id')
+        .annotate(
+            present=Count('id', filter=Q(status='Present')),
+            absent=Count('id', filter=Q(status='Absent')),
+        )
+    )
+    totals = defaultdict(lambda: [0, 0])
+    rows = []
+    for row in grouped.iterator():
+        key = (row['student_id'], row['attendance__session_id'])
+        totals[key][0] += row['present']
+        totals[key][1] += row['absent']
+        if row['attendance__subject_id']:
+            rows.append(AttendanceRollup(
+                student_id=key[0],
+                session_id=key[1],
+                subject_id=row['attendance__subject_id'],
+                present_count=row['present'],
+                absent_count=row['absent'],
+            ))
+    for (student_id, session_id), (present, absent) in totals.items():
+        rows.append(AttendanceRollup(
+            student_id=student_id,
+            session_id=session_id,
+            present_count=present,
+            absent_count=absent,
+        ))
+    AttendanceRollup.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0002_class_updated_at_section_updated_at_and_more'),
+        ('student', '0013_studentresult'),
+        ('teacher', '0022_attendance_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('present_count', models.PositiveIntegerField(default=0)),
+                ('absent_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='academic.session')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='student.studentinfo')),
+                ('subject', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='academic.subject')),
+            ],
+            options={
+                'verbose_name': 'Attendance Rollup',
+                'verbose_name_plural': 'Attendance Rollups',
+                'constraints': [models.UniqueConstraint(fields=('student', 'session', 'subject'), name='attendance_rollup_subject_unique'), models.UniqueConstraint(condition=models.Q(('subject__isnull', True)), fields=('student', 'session'), name='attendance_rollup_session_unique')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
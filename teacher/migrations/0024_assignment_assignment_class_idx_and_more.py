@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0002_class_updated_at_section_updated_at_and_more'),
+        ('student', '0014_studentinfo_student_roster_idx_and_more'),
+        ('teacher', '0023_attendancerollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['klass', 'session', 'section', '-created_at'], name='assignment_class_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['teacher', '-created_at'], name='assignment_teacher_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['teacher', '-date', '-created_at'], name='attendance_teacher_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['-date', '-created_at', '-id'], name='attendance_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancerecord',
+            index=models.Index(fields=['student', 'attendance', 'status'], name='attendance_record_student_idx'),
+        ),
+    ]
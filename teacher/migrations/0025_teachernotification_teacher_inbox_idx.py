@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teacher', '0024_assignment_assignment_class_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='teachernotification',
+            index=models.Index(fields=['teacher_id', '-created_at'], name='teacher_inbox_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0002_class_updated_at_section_updated_at_and_more'),
+        ('teacher', '0026_leave_status_changed_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('note', models.TextField(blank=True, null=True)),
+                ('marks', models.JSONField()),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('saved', 'Saved'), ('superseded', 'Replaced by a newer submission'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('changed', models.PositiveIntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('applied_at', models.DateTimeField(blank=True, null=True)),
+                ('attendance', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submissions', to='teacher.attendance')),
+                ('klass', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='academic.class')),
+                ('section', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='academic.section')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='academic.session')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='academic.subject')),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_submissions', to='teacher.teacherinfo')),
+            ],
+            options={
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['status', 'id'], name='attendance_submission_idx')],
+            },
+        ),
+    ]
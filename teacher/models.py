@@ -80,6 +80,9 @@ class TeacherNotification(models.Model):
 
     class Meta:
         verbose_name_plural = "Notifications"
+        indexes = [
+            models.Index(fields=['teacher_id', '-created_at'], name='teacher_inbox_idx'),
+        ]
 
     def __str__(self):
         return f"{self.teacher_id.first_name} {self.teacher_id.last_name}"
@@ -118,6 +121,7 @@ class TeacherLeave(models.Model):
     )
 
     created_at = models.DateTimeField(auto_now_add=True)
+    status_changed_at = models.DateTimeField(blank=True, null=True)
     
     def __str__(self):
         return f"{self.teacher.first_name} {self.teacher.last_name}"
@@ -181,12 +185,22 @@ class Attendance(models.Model):
     )
     date = models.DateField()
     note = models.TextField(blank=True, null=True)
+    # Maintained by teacher.attendance.save_attendance_records; repair with
+    # `manage.py backfill_attendance_counts`.
+    total_count = models.PositiveIntegerField(default=0)
+    present_count = models.PositiveIntegerField(default=0)
+    absent_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('teacher', 'klass', 'section', 'session', 'subject', 'date')
         ordering = ['-date', '-created_at']
+        indexes = [
+            # Teacher history page and the admin overview's keyset pagination.
+            models.Index(fields=['teacher', '-date', '-created_at'], name='attendance_teacher_date_idx'),
+            models.Index(fields=['-date', '-created_at', '-id'], name='attendance_date_idx'),
+        ]
         verbose_name = "Attendance Entry"
         verbose_name_plural = "Attendance Entries"
 
@@ -196,6 +210,63 @@ class Attendance(models.Model):
         return f"{self.date} - {klass_name} ({subject_name})"
 
 
+class AttendanceSubmission(models.Model):
+    """
+    A validated roll call waiting to be merged into ``Attendance`` (queued
+    write mode, see ``teacher.attendance_queue``). Append-only until the
+    coalescer records the outcome.
+    """
+
+    STATUS_QUEUED = "queued"
+    STATUS_SAVED = "saved"
+    STATUS_SUPERSEDED = "superseded"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_SAVED, "Saved"),
+        (STATUS_SUPERSEDED, "Replaced by a newer submission"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    teacher = models.ForeignKey(
+        TeacherInfo,
+        on_delete=models.CASCADE,
+        related_name="attendance_submissions",
+    )
+    klass = models.ForeignKey(Class, on_delete=models.CASCADE, related_name="+")
+    section = models.ForeignKey(Section, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name="+")
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name="+")
+    date = models.DateField()
+    note = models.TextField(blank=True, null=True)
+    # {"<student id>": [status, remark]} for every student on the roster.
+    marks = models.JSONField()
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attendance = models.ForeignKey(
+        Attendance,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="submissions",
+    )
+    changed = models.PositiveIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    applied_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            # The coalescer drains queued rows in arrival order.
+            models.Index(fields=['status', 'id'], name='attendance_submission_idx'),
+        ]
+
+    def __str__(self):
+        return f"Roll call #{self.pk} for {self.date} ({self.status})"
+
+
 class AttendanceRecord(models.Model):
     STATUS_PRESENT = "Present"
     STATUS_ABSENT = "Absent"
@@ -205,15 +276,19 @@ class AttendanceRecord(models.Model):
         (STATUS_ABSENT, "Absent"),
     ]
 
+    # No single-column FK indexes: the unique (attendance, student) index and
+    # attendance_record_student_idx lead with these columns already.
     attendance = models.ForeignKey(
         Attendance,
         on_delete=models.CASCADE,
         related_name="records",
+        db_index=False,
     )
     student = models.ForeignKey(
         StudentInfo,
         on_delete=models.CASCADE,
         related_name="attendance_records",
+        db_index=False,
     )
     status = models.CharField(
         max_length=10,
@@ -230,6 +305,12 @@ class AttendanceRecord(models.Model):
     class Meta:
         unique_together = ('attendance', 'student')
         ordering = ['student__roll_no', 'student__first_name']
+        indexes = [
+            # A student's history (check_query_plans: "SEARCH ... USING INDEX
+            # attendance_record_student_idx (student_id=?)"); also covers the
+            # status counts without touching the table.
+            models.Index(fields=['student', 'attendance', 'status'], name='attendance_record_student_idx'),
+        ]
         verbose_name = "Attendance Record"
         verbose_name_plural = "Attendance Records"
 
@@ -237,6 +318,64 @@ class AttendanceRecord(models.Model):
         return f"{self.student} - {self.attendance.date} ({self.status})"
 
 
+class AttendanceRollup(models.Model):
+    """
+    Running present/absent totals for one student.
+
+    Rows with a ``subject`` hold the (student, session, subject) totals; the
+    row with ``subject=None`` holds the (student, session) total across all
+    subjects. Maintained by ``teacher.rollups``.
+    """
+    student = models.ForeignKey(
+        StudentInfo,
+        on_delete=models.CASCADE,
+        related_name="attendance_rollups",
+    )
+    session = models.ForeignKey(
+        Session,
+        on_delete=models.CASCADE,
+        related_name="attendance_rollups",
+    )
+    subject = models.ForeignKey(
+        Subject,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="attendance_rollups",
+    )
+    present_count = models.PositiveIntegerField(default=0)
+    absent_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['student', 'session', 'subject'],
+                name='attendance_rollup_subject_unique',
+            ),
+            models.UniqueConstraint(
+                fields=['student', 'session'],
+                condition=models.Q(subject__isnull=True),
+                name='attendance_rollup_session_unique',
+            ),
+        ]
+        verbose_name = "Attendance Rollup"
+        verbose_name_plural = "Attendance Rollups"
+
+    def __str__(self):
+        subject_name = self.subject.name if self.subject else "All Subjects"
+        return f"{self.student} - {self.session} ({subject_name})"
+
+    @property
+    def total_count(self):
+        return self.present_count + self.absent_count
+
+    @property
+    def percentage(self):
+        total = self.total_count
+        return round(self.present_count / total * 100, 2) if total else 0.0
+
+
 class Assignment(models.Model):
     teacher = models.ForeignKey(
         TeacherInfo,
@@ -280,6 +419,11 @@ class Assignment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Student assignment list: filter by class/session/section, newest first.
+            models.Index(fields=['klass', 'session', 'section', '-created_at'], name='assignment_class_idx'),
+            models.Index(fields=['teacher', '-created_at'], name='assignment_teacher_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.klass} - {self.subject})"
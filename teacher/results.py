@@ -0,0 +1,100 @@
+"""
+Result persistence helpers shared by the marks entry views.
+
+``bulk_save_results`` writes a whole grid of ``StudentResult`` rows with one
+``bulk_create`` and one ``bulk_update`` inside a single transaction, instead of
+an ``update_or_create`` / ``save()`` round trip per student. The ``parse_*``
+helpers normalize single cell values the same way for the full-form views and
+the autosave endpoint.
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from student.models import StudentResult
+
+
+RESULT_UPDATE_FIELDS = [
+    'klass',
+    'section',
+    'total_marks',
+    'obtained_marks',
+    'grade',
+    'remarks',
+    'updated_at',
+]
+
+
+GRADE_MAX_LENGTH = StudentResult._meta.get_field('grade').max_length
+REMARK_MAX_LENGTH = 1000
+
+
+def format_marks(value):
+    """Decimal('45.50') -> '45.5', Decimal('40.00') -> '40'."""
+    if value is None or value == '':
+        return ''
+    if not isinstance(value, Decimal):
+        return str(value)
+    return format(value.normalize(), 'f').rstrip('0').rstrip('.') or '0'
+
+
+def parse_marks(raw, total_marks):
+    """Parse obtained marks; raises ValueError with the grid's error message."""
+    try:
+        obtained = Decimal(str(raw).strip())
+    except (InvalidOperation, TypeError):
+        raise ValueError('Enter a valid number.')
+    if not obtained.is_finite():
+        raise ValueError('Enter a valid number.')
+    if obtained < 0 or (total_marks is not None and obtained > total_marks):
+        raise ValueError('Must be between 0 and total marks.')
+    return obtained.quantize(Decimal('0.01'))
+
+
+def parse_total_marks(raw):
+    try:
+        total = Decimal(str(raw).strip())
+    except (InvalidOperation, TypeError):
+        raise ValueError('Enter a valid Total Marks value.')
+    if not total.is_finite() or total <= 0:
+        raise ValueError('Total Marks must be greater than zero.')
+    if total >= 10000:
+        raise ValueError('Total Marks must be less than 10000.')
+    return total.quantize(Decimal('0.01'))
+
+
+def parse_grade(raw):
+    grade = str(raw or '').strip()
+    if len(grade) > GRADE_MAX_LENGTH:
+        raise ValueError(f'Grade must be at most {GRADE_MAX_LENGTH} characters.')
+    return grade or None
+
+
+def parse_remark(raw):
+    remark = str(raw or '').strip()
+    if len(remark) > REMARK_MAX_LENGTH:
+        raise ValueError(f'Remark must be at most {REMARK_MAX_LENGTH} characters.')
+    return remark or None
+
+
+def result_changed(result, values):
+    """True when any of ``values`` differs from what ``result`` holds."""
+    return any(getattr(result, field) != value for field, value in values.items())
+
+
+def bulk_save_results(new_results, changed_results, fields=RESULT_UPDATE_FIELDS):
+    """Insert ``new_results`` and update ``fields`` on ``changed_results`` atomically."""
+    now = timezone.now()
+    for result in changed_results:
+        # bulk_update() skips auto_now, so stamp the edit explicitly.
+        result.updated_at = now
+
+    with transaction.atomic():
+        if new_results:
+            StudentResult.objects.bulk_create(new_results)
+        if changed_results:
+            StudentResult.objects.bulk_update(changed_results, fields)
+
+    return len(new_results) + len(changed_results)
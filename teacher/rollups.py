@@ -0,0 +1,186 @@
+"""
+Per-student attendance rollups.
+
+``AttendanceRollup`` keeps running present/absent totals per
+(student, session, subject) plus one (student, session) row across all
+subjects, so attendance percentages never need a scan of
+``AttendanceRecord``.
+
+``apply_rollup_deltas`` is called by ``save_attendance_records`` in the same
+transaction as the record diff and adjusts only the students whose status
+changed, using a handful of ``UPDATE ... SET present_count = present_count + n``
+statements. Deleting an ``Attendance`` (directly or by cascade, e.g. with
+its teacher) takes its records out of the rollups first through
+``remove_records`` (see ``teacher.signals``). ``rebuild_rollups``
+recomputes everything from the records and backs the
+``rebuild_attendance_rollups`` management command.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import AttendanceRecord, AttendanceRollup
+
+
+STATUS_DELTAS = {
+    AttendanceRecord.STATUS_PRESENT: (1, 0),
+    AttendanceRecord.STATUS_ABSENT: (0, 1),
+}
+
+
+def status_delta(old_status, new_status):
+    """(present, absent) change when a record goes from ``old_status`` to ``new_status``."""
+    old = STATUS_DELTAS.get(old_status, (0, 0))
+    new = STATUS_DELTAS.get(new_status, (0, 0))
+    return new[0] - old[0], new[1] - old[1]
+
+
+def _scopes(subject_id):
+    # Every sheet counts towards the session total; sheets with a subject
+    # also count towards that subject's row.
+    return [None, subject_id] if subject_id else [None]
+
+
+def apply_rollup_deltas(attendance, deltas):
+    """
+    Add ``deltas`` (``student_id -> (present, absent)``) to the rollups of
+    ``attendance``'s session and subject. Call inside the transaction that
+    changed the records.
+    """
+    _apply_deltas(attendance.session_id, attendance.subject_id, deltas)
+
+
+def remove_records(records):
+    """
+    Take ``records`` (an ``AttendanceRecord`` queryset about to be deleted)
+    out of the rollups. ``save_attendance_records`` does this itself for the
+    rows it drops; this covers cascades from ``Attendance`` and admin deletes.
+    """
+    grouped = (
+        records.filter(attendance__session__isnull=False)
+        .order_by()
+        .values('attendance__session_id', 'attendance__subject_id', 'student_id')
+        .annotate(
+            present=Count('id', filter=Q(status=AttendanceRecord.STATUS_PRESENT)),
+            absent=Count('id', filter=Q(status=AttendanceRecord.STATUS_ABSENT)),
+        )
+    )
+    by_scope = defaultdict(dict)
+    for row in grouped:
+        scope = (row['attendance__session_id'], row['attendance__subject_id'])
+        by_scope[scope][row['student_id']] = (-row['present'], -row['absent'])
+    for (session_id, subject_id), deltas in by_scope.items():
+        _apply_deltas(session_id, subject_id, deltas)
+
+
+def _apply_deltas(session_id, subject_id, deltas):
+    if not session_id:
+        return
+
+    by_delta = defaultdict(list)
+    for student_id, delta in deltas.items():
+        if delta != (0, 0):
+            by_delta[delta].append(student_id)
+    if not by_delta:
+        return
+
+    student_ids = [student_id for ids in by_delta.values() for student_id in ids]
+    scopes = _scopes(subject_id)
+    rollups = AttendanceRollup.objects.filter(session_id=session_id)
+
+    with transaction.atomic():
+        existing = set(
+            rollups.filter(student_id__in=student_ids)
+            .filter(Q(subject__isnull=True) | Q(subject_id=subject_id))
+            .values_list('student_id', 'subject_id')
+        )
+        missing = [
+            AttendanceRollup(student_id=student_id, session_id=session_id, subject_id=scope)
+            for student_id in student_ids
+            for scope in scopes
+            if (student_id, scope) not in existing
+        ]
+        if missing:
+            AttendanceRollup.objects.bulk_create(missing, ignore_conflicts=True)
+
+        now = timezone.now()
+        for (present, absent), ids in by_delta.items():
+            for scope in scopes:
+                scoped = rollups.filter(student_id__in=ids)
+                scoped = scoped.filter(subject__isnull=True) if scope is None else scoped.filter(subject_id=scope)
+                # Clamp at zero so drift from out-of-band deletes cannot block a save.
+                scoped.update(
+                    present_count=Greatest(F('present_count') + present, Value(0)),
+                    absent_count=Greatest(F('absent_count') + absent, Value(0)),
+                    updated_at=now,
+                )
+
+
+def rebuild_rollups(session_id=None, batch_size=1000):
+    """Recompute rollups from the records (all sessions, or one). Returns rows written."""
+    records = AttendanceRecord.objects.filter(attendance__session__isnull=False)
+    rollups = AttendanceRollup.objects.all()
+    if session_id:
+        records = records.filter(attendance__session_id=session_id)
+        rollups = rollups.filter(session_id=session_id)
+
+    grouped = (
+        records.order_by()
+        .values('student_id', 'attendance__session_id', 'attendance__subject_id')
+        .annotate(
+            present=Count('id', filter=Q(status=AttendanceRecord.STATUS_PRESENT)),
+            absent=Count('id', filter=Q(status=AttendanceRecord.STATUS_ABSENT)),
+        )
+    )
+
+    session_totals = defaultdict(lambda: [0, 0])
+    rows = []
+    for row in grouped.iterator():
+        key = (row['student_id'], row['attendance__session_id'])
+        session_totals[key][0] += row['present']
+        session_totals[key][1] += row['absent']
+        if row['attendance__subject_id']:
+            rows.append(AttendanceRollup(
+                student_id=row['student_id'],
+                session_id=row['attendance__session_id'],
+                subject_id=row['attendance__subject_id'],
+                present_count=row['present'],
+                absent_count=row['absent'],
+            ))
+    for (student_id, row_session_id), (present, absent) in session_totals.items():
+        rows.append(AttendanceRollup(
+            student_id=student_id,
+            session_id=row_session_id,
+            present_count=present,
+            absent_count=absent,
+        ))
+
+    with transaction.atomic():
+        rollups.delete()
+        AttendanceRollup.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def session_rollups(student_ids, session_id, subject_id=None):
+    """``student_id -> AttendanceRollup`` for one session (and optionally one subject)."""
+    rollups = AttendanceRollup.objects.filter(student_id__in=student_ids, session_id=session_id)
+    if subject_id:
+        rollups = rollups.filter(subject_id=subject_id)
+    else:
+        rollups = rollups.filter(subject__isnull=True)
+    return {rollup.student_id: rollup for rollup in rollups}
+
+
+def student_totals(student, subject_id=None):
+    """(present, absent) for ``student`` across all sessions, optionally for one subject."""
+    rollups = AttendanceRollup.objects.filter(student=student)
+    if subject_id:
+        rollups = rollups.filter(subject_id=subject_id)
+    else:
+        rollups = rollups.filter(subject__isnull=True)
+    totals = rollups.aggregate(present=Sum('present_count'), absent=Sum('absent_count'))
+    return totals['present'] or 0, totals['absent'] or 0
@@ -0,0 +1,11 @@
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from .models import Attendance, AttendanceRecord
+from .rollups import remove_records
+
+
+@receiver(pre_delete, sender=Attendance)
+def attendance_deleted(sender, instance, **kwargs):
+    # Runs before the cascade removes the records, inside the delete's transaction.
+    remove_records(AttendanceRecord.objects.filter(attendance=instance))
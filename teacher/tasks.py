@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from administration.jobs import task
+
+from .attendance_queue import apply_pending, queued_mode
+
+
+# Only scheduled in queued mode; in direct mode nothing is ever queued.
+@task(every=timedelta(minutes=1), priority=10, when=queued_mode)
+def apply_attendance_submissions():
+    """Merge queued roll calls into Attendance (see teacher.attendance_queue)."""
+    result = apply_pending()
+    return (
+        f"{result.submissions} submissions merged into {result.sheets} sheets in "
+        f"{result.transactions} transactions ({result.superseded} superseded, {result.failed} failed)."
+    )
@@ -1,3 +1,363 @@
-from django.test import TestCase
+import json
+from datetime import date
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from academic.models import Class, Section, Session, Subject
+from account.models import User
+from student.models import StudentInfo, StudentResult
+
+from administration.models import Job
+
+from .attendance import RosterChanged, decode_compact_marks, recount_attendance, roster_version, save_roll_call
+from .attendance_queue import COALESCER_KEY, _apply_batch, _warn_eager, apply_pending, queued_mode, submit_roll_call
+from .models import Attendance, AttendanceRecord, AttendanceRollup, AttendanceSubmission, TeacherInfo
+from .rollups import student_totals
+
+
+PRESENT = AttendanceRecord.STATUS_PRESENT
+ABSENT = AttendanceRecord.STATUS_ABSENT
+
+
+class AttendanceTestData(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.klass = Class.objects.create(name='One', class_code=1)
+        cls.session = Session.objects.create(
+            name='2025-2026', start_date=date(2025, 1, 1), end_date=date(2025, 12, 31),
+        )
+        cls.section = Section.objects.create(name='A')
+        cls.subject = Subject.objects.create(name='Math', code='M1')
+        user = User.objects.create(username='teacher1', user_type='Teacher')
+        cls.teacher = TeacherInfo.objects.create(user=user, first_name='T', last_name='One', email='t@example.com')
+        cls.students = [
+            StudentInfo.objects.create(
+                user=User.objects.create(username=f'student{index}', user_type='Student'),
+                klass=cls.klass, session=cls.session, section=cls.section,
+                first_name=f'S{index}', last_name='X',
+            )
+            for index in range(4)
+        ]
+
+    def save(self, marks, day=date(2025, 3, 3)):
+        return save_roll_call(
+            self.teacher, self.klass.id, self.section.id, self.session.id, self.subject.id, day, None, marks,
+        )
+
+    def rollup(self, student, subject=None):
+        row = AttendanceRollup.objects.get(student=student, session=self.session, subject=subject)
+        return row.present_count, row.absent_count
+
+
+class CompactMarksTests(AttendanceTestData):
+    def payload(self, students, statuses, **extra):
+        return {'roster_version': roster_version(students), 'statuses': statuses, **extra}
+
+    def test_decodes_statuses_in_roster_order(self):
+        first, second, third, fourth = self.students
+        payload = self.payload(self.students, '1011', remarks={str(second.id): '  Sick  '})
+        self.assertEqual(decode_compact_marks(payload, self.students), {
+            first.id: (PRESENT, None),
+            second.id: (ABSENT, 'Sick'),
+            third.id: (PRESENT, None),
+            fourth.id: (PRESENT, None),
+        })
+
+    def test_roster_version_depends_on_order(self):
+        self.assertNotEqual(roster_version(self.students), roster_version(self.students[::-1]))
+
+    def test_payload_for_another_roster_is_a_conflict(self):
+        # Built before a fifth student joined the class.
+        payload = self.payload(self.students[:3], '111')
+        with self.assertRaises(RosterChanged):
+            decode_compact_marks(payload, self.students)
+
+    def test_conflict_is_checked_before_the_statuses(self):
+        with self.assertRaises(RosterChanged):
+            decode_compact_marks({'roster_version': 'stale', 'statuses': '1'}, self.students)
+
+    def test_malformed_payloads_are_rejected(self):
+        for statuses in ['111', '11111', '1x11', None]:
+            with self.subTest(statuses=statuses), self.assertRaises(ValueError) as caught:
+                decode_compact_marks(self.payload(self.students, statuses), self.students)
+            self.assertNotIsInstance(caught.exception, RosterChanged)
+        with self.assertRaises(ValueError):
+            decode_compact_marks(self.payload(self.students, '1111', remarks=['Late']), self.students)
+
+
+class SaveAttendanceRecordsTests(AttendanceTestData):
+    def test_first_save_creates_records_counts_and_rollups(self):
+        first, second, third, _ = self.students
+        attendance, changes = self.save({
+            first.id: (PRESENT, None), second.id: (ABSENT, 'Sick'), third.id: (PRESENT, None),
+        })
+
+        self.assertEqual((changes.created, changes.updated, changes.deleted, changes.unchanged), (3, 0, 0, 0))
+        attendance.refresh_from_db()
+        self.assertEqual((attendance.total_count, attendance.present_count, attendance.absent_count), (3, 2, 1))
+        self.assertEqual(self.rollup(second), (0, 1))
+        self.assertEqual(self.rollup(second, self.subject), (0, 1))
+
+    def test_resave_applies_only_the_diff(self):
+        first, second, third, fourth = self.students
+        attendance, _ = self.save({first.id: (PRESENT, None), second.id: (ABSENT, None), third.id: (PRESENT, None)})
+
+        # Second student marked present, third dropped, fourth added.
+        attendance, changes = self.save({
+            first.id: (PRESENT, None), second.id: (PRESENT, 'Late'), fourth.id: (ABSENT, None),
+        })
+
+        self.assertEqual((changes.created, changes.updated, changes.deleted, changes.unchanged), (1, 1, 1, 1))
+        records = dict(AttendanceRecord.objects.filter(attendance=attendance).values_list('student_id', 'status'))
+        self.assertEqual(records, {first.id: PRESENT, second.id: PRESENT, fourth.id: ABSENT})
+        self.assertEqual(AttendanceRecord.objects.get(attendance=attendance, student=second).remark, 'Late')
+
+        attendance.refresh_from_db()
+        self.assertEqual((attendance.total_count, attendance.present_count, attendance.absent_count), (3, 2, 1))
+        self.assertEqual(self.rollup(second), (1, 0))
+        self.assertEqual(self.rollup(third), (0, 0))
+        self.assertEqual(self.rollup(fourth), (0, 1))
+
+    def test_unchanged_resave_writes_no_records(self):
+        marks = {student.id: (PRESENT, None) for student in self.students}
+        self.save(marks)
+        marked_at = dict(AttendanceRecord.objects.values_list('student_id', 'marked_at'))
+
+        _, changes = self.save(marks)
+
+        self.assertEqual(changes.changed, 0)
+        self.assertEqual(changes.unchanged, len(self.students))
+        self.assertEqual(dict(AttendanceRecord.objects.values_list('student_id', 'marked_at')), marked_at)
+
+    def test_recount_fixes_drifted_counters(self):
+        attendance, _ = self.save({student.id: (ABSENT, None) for student in self.students})
+        Attendance.objects.filter(pk=attendance.pk).update(total_count=0, present_count=9, absent_count=0)
+
+        self.assertEqual(recount_attendance(Attendance.objects.all()), 1)
+        self.assertEqual(recount_attendance(Attendance.objects.all()), 0)
+        attendance.refresh_from_db()
+        self.assertEqual((attendance.total_count, attendance.present_count, attendance.absent_count), (4, 0, 4))
+
+
+class RollupDeleteTests(AttendanceTestData):
+    def setUp(self):
+        first, second, third, fourth = self.students
+        self.monday, _ = self.save({first.id: (PRESENT, None), second.id: (ABSENT, None)})
+        self.tuesday, _ = self.save({first.id: (ABSENT, None), second.id: (ABSENT, None)}, day=date(2025, 3, 4))
+
+    def test_deleting_a_sheet_takes_it_out_of_the_rollups(self):
+        first, second, _, _ = self.students
+        self.monday.delete()
+
+        self.assertEqual(self.rollup(first), (0, 1))
+        self.assertEqual(self.rollup(second, self.subject), (0, 1))
+
+    def test_deleting_the_teacher_clears_the_rollups(self):
+        self.teacher.delete()
+
+        self.assertFalse(AttendanceRecord.objects.exists())
+        for student in self.students[:2]:
+            self.assertEqual(student_totals(student), (0, 0))
+            self.assertEqual(student_totals(student, self.subject.id), (0, 0))
+
+    def test_admin_record_delete_updates_counters_and_rollups(self):
+        first, second, _, _ = self.students
+        record_admin = admin.site._registry[AttendanceRecord]
+
+        record_admin.delete_queryset(None, AttendanceRecord.objects.filter(student=first))
+
+        self.assertEqual(self.rollup(first), (0, 0))
+        self.assertEqual(self.rollup(second), (0, 2))
+        self.monday.refresh_from_db()
+        self.assertEqual((self.monday.total_count, self.monday.present_count, self.monday.absent_count), (1, 0, 1))
+
+
+class TakeAttendanceCompactTests(AttendanceTestData):
+    def post(self, payload):
+        self.client.force_login(self.teacher.user)
+        body = {
+            'klass': self.klass.id, 'section': self.section.id, 'session': self.session.id,
+            'subject': self.subject.id, 'attendance_date': '2025-03-03', **payload,
+        }
+        return self.client.post(reverse('take_attendance'), json.dumps(body), content_type='application/json')
+
+    def test_stale_roster_is_refused_with_the_current_version(self):
+        response = self.post({'roster_version': roster_version(self.students[:3]), 'statuses': '111'})
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['roster_version'], roster_version(self.students))
+        self.assertFalse(AttendanceRecord.objects.exists())
+
+    def test_current_roster_is_saved(self):
+        response = self.post({'roster_version': roster_version(self.students), 'statuses': '1101'})
+
+        self.assertNotEqual(response.status_code, 409)
+        self.assertEqual(AttendanceRecord.objects.filter(status=ABSENT).get().student, self.students[2])
+
+
+@override_settings(ATTENDANCE_WRITE_MODE='queued', JOBS_EAGER=False)
+class AttendanceQueueTests(AttendanceTestData):
+    def submit(self, statuses, day=date(2025, 3, 3)):
+        marks = {student.id: (status, None) for student, status in zip(self.students, statuses)}
+        return submit_roll_call(
+            self.teacher, self.klass.id, self.section.id, self.session.id, self.subject.id, day, None, marks,
+        )
+
+    def statuses(self, day=date(2025, 3, 3)):
+        records = AttendanceRecord.objects.filter(attendance__date=day).order_by('student_id')
+        return [record.status for record in records]
+
+    def test_queued_mode_needs_eager_off(self):
+        self.assertTrue(queued_mode())
+        _warn_eager.cache_clear()
+        with override_settings(JOBS_EAGER=True), self.assertLogs('teacher.attendance_queue', 'WARNING'):
+            self.assertFalse(queued_mode())
+
+    def test_submission_queues_one_coalescer_that_never_runs_eagerly(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.submit([PRESENT] * 4)
+            self.submit([ABSENT] * 4)
+
+        self.assertEqual(callbacks, [])
+        job = Job.objects.get(unique_key=COALESCER_KEY)
+        self.assertEqual(job.status, Job.STATUS_QUEUED)
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_newest_submission_per_sheet_wins(self):
+        older = self.submit([PRESENT] * 4)
+        newer = self.submit([ABSENT] * 4)
+        other_day = self.submit([PRESENT] * 4, day=date(2025, 3, 4))
+
+        self.assertEqual(_apply_batch(10), (3, 2, 1, 0))
+
+        self.assertEqual(AttendanceSubmission.objects.get(pk=older.pk).status, AttendanceSubmission.STATUS_SUPERSEDED)
+        for submission in (newer, other_day):
+            submission.refresh_from_db()
+            self.assertEqual(submission.status, AttendanceSubmission.STATUS_SAVED)
+            self.assertIsNotNone(submission.attendance_id)
+        self.assertEqual(self.statuses(), [ABSENT] * 4)
+        self.assertEqual(self.statuses(date(2025, 3, 4)), [PRESENT] * 4)
+
+    def test_failed_sheet_is_rolled_back_alone(self):
+        good = self.submit([PRESENT] * 4)
+        bad = self.submit([ABSENT] * 4, day=date(2025, 3, 4))
+
+        def save_then_fail(*args):
+            result = save_roll_call(*args)
+            if args[5] == date(2025, 3, 4):
+                raise RuntimeError('disk full')
+            return result
+
+        with mock.patch('teacher.attendance_queue.save_roll_call', side_effect=save_then_fail):
+            self.assertEqual(_apply_batch(10), (2, 2, 0, 1))
+
+        bad.refresh_from_db()
+        self.assertEqual((bad.status, bad.error), (AttendanceSubmission.STATUS_FAILED, 'disk full'))
+        self.assertFalse(Attendance.objects.filter(date=date(2025, 3, 4)).exists())
+        self.assertEqual(AttendanceSubmission.objects.get(pk=good.pk).status, AttendanceSubmission.STATUS_SAVED)
+        self.assertEqual(self.statuses(), [PRESENT] * 4)
+
+    def test_batches_leave_the_rest_queued(self):
+        for day in range(1, 6):
+            self.submit([PRESENT] * 4, day=date(2025, 3, day))
+
+        self.assertEqual(_apply_batch(2), (2, 2, 0, 0))
+        self.assertEqual(AttendanceSubmission.objects.filter(status=AttendanceSubmission.STATUS_QUEUED).count(), 3)
+
+        result = apply_pending(batch_size=2)
+        self.assertEqual((result.transactions, result.submissions, result.sheets), (2, 3, 3))
+        self.assertEqual(Attendance.objects.count(), 5)
+        self.assertEqual(_apply_batch(2), (0, 0, 0, 0))
+
+
+class AutosaveResultsTests(AttendanceTestData):
+    def post(self, cells, **payload):
+        self.client.force_login(self.teacher.user)
+        body = {
+            'klass': self.klass.id, 'section': self.section.id, 'session': self.session.id,
+            'subject': self.subject.id, 'exam_type': 'Midterm', 'total_marks': '50', 'cells': cells, **payload,
+        }
+        return self.client.post(reverse('autosave_results'), json.dumps(body), content_type='application/json')
+
+    def existing(self, student, marks='30'):
+        return StudentResult.objects.create(
+            student=student, klass=self.klass, section=self.section, session=self.session, subject=self.subject,
+            exam_type='Midterm', total_marks=Decimal('50'), obtained_marks=Decimal(marks),
+        )
+
+    def test_single_cell_creates_the_result(self):
+        response = self.post([{'student': self.students[0].id, 'marks': '45.50', 'grade': ' A '}])
+
+        self.assertEqual(response.status_code, 200)
+        result = StudentResult.objects.get()
+        self.assertEqual((result.obtained_marks, result.total_marks, result.grade), (Decimal('45.5'), 50, 'A'))
+        self.assertEqual(response.json(), {'saved': 1, 'cells': [{
+            'index': 0, 'ok': True, 'result': result.id, 'student': self.students[0].id,
+            'marks': '45.5', 'grade': 'A', 'remark': '', 'updated_at': result.updated_at.isoformat(),
+        }]})
+
+    def test_batch_saves_valid_cells_and_reports_the_rest(self):
+        kept = self.existing(self.students[1])
+        response = self.post([
+            {'student': self.students[0].id, 'marks': '40'},
+            {'student': self.students[1].id, 'marks': '20'},
+            {'student': self.students[2].id, 'marks': '51'},
+            {'student': self.students[3].id, 'marks': 'abc'},
+            {'student': self.students[3].id, 'grade': 'B'},
+        ])
+
+        cells = response.json()['cells']
+        self.assertEqual(response.json()['saved'], 2)
+        self.assertEqual([cell['ok'] for cell in cells], [True, True, False, False, False])
+        self.assertEqual([cell.get('error') for cell in cells[2:]], [
+            'Must be between 0 and total marks.', 'Enter a valid number.', 'Enter marks to create a result.',
+        ])
+        self.assertEqual(cells[1]['result'], kept.id)
+        self.assertEqual(
+            dict(StudentResult.objects.values_list('student_id', 'obtained_marks')),
+            {self.students[0].id: Decimal('40'), self.students[1].id: Decimal('20')},
+        )
+
+    def test_result_keyed_cell_changes_only_the_keys_it_sends(self):
+        result = self.existing(self.students[0])
+        before = result.updated_at
+
+        response = self.post([{'result': result.id, 'remark': 'Improving'}, {'result': 0, 'grade': 'A'}],
+                             session=None, subject=None, exam_type=None, total_marks=None)
+
+        cells = response.json()['cells']
+        result.refresh_from_db()
+        self.assertEqual((result.obtained_marks, result.remarks), (Decimal('30'), 'Improving'))
+        self.assertGreater(result.updated_at, before)
+        self.assertEqual(cells[0]['updated_at'], result.updated_at.isoformat())
+        self.assertEqual(cells[1], {'index': 1, 'ok': False, 'error': 'Result not found.'})
+
+    def test_unchanged_cell_is_not_saved_again(self):
+        result = self.existing(self.students[0])
+
+        response = self.post([{'result': result.id, 'marks': '30'}])
+
+        self.assertEqual(response.json()['saved'], 0)
+        self.assertEqual(response.json()['cells'][0]['updated_at'], result.updated_at.isoformat())
+
+    def test_conflicting_write_is_a_409(self):
+        with mock.patch('teacher.views.bulk_save_results', side_effect=IntegrityError):
+            response = self.post([{'student': self.students[0].id, 'marks': '40'}])
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(StudentResult.objects.exists())
+
+    def test_bad_requests_are_refused(self):
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(self.post(['45']).status_code, 400)
+        self.assertEqual(self.post([{'student': self.students[0].id, 'marks': '1'}], exam_type='Oral').status_code, 400)
+        self.assertEqual(self.post([{'student': self.students[0].id, 'marks': '1'}], total_marks='0').status_code, 400)
+
+        self.client.force_login(self.students[0].user)
+        response = self.client.post(reverse('autosave_results'), '{"cells": []}', content_type='application/json')
+        self.assertEqual(response.status_code, 403)
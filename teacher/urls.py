@@ -11,8 +11,10 @@ urlpatterns = [
     path('dashboard/', teacher_dashboard, name='teacher_dashboard'),
     path('take-attendance/', take_attendance, name='take_attendance'),
     path('attendance-history/', view_update_attendance, name='view_update_attendance'),
+    path('attendance-submissions/<int:pk>/', attendance_submission_status, name='attendance_submission_status'),
     path('add-result/', add_result, name='add_result'),
     path('manage-results/', manage_results, name='manage_results'),
+    path('results/autosave/', autosave_results, name='autosave_results'),
     path('assignments/', teacher_assignment_list, name='teacher_assignment_list'),
     path('assignments/add/', assignment_create, name='assignment_create'),
     path('assignments/<int:pk>/', assignment_detail, name='assignment_detail'),
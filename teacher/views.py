@@ -1,3 +1,4 @@
+import json
 from datetime import datetime, date
 from urllib.parse import urlencode
 
@@ -6,29 +7,45 @@ import string
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db import transaction, IntegrityError
-from django.http import HttpResponseForbidden
+from django.db import IntegrityError
+from django.http import HttpResponseForbidden, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.views.decorators.http import require_http_methods
 
 from account.models import User
-from academic.models import Class, Section, Session, Subject
-from decimal import Decimal, InvalidOperation
+from account.sequences import allocate_usernames
+from academic.cache import get_reference_data
+from decimal import Decimal
+from myproject.listing import ListFilter, ListSpec
+from myproject.routers import reads_from_replica
+from administration.notifications import teacher_inbox, with_read_state
 
 from student.models import StudentInfo, StudentResult
 
+from .attendance import RosterChanged, decode_compact_marks, roster_version, save_roll_call
+from .attendance_queue import latest_submission, queued_mode, submission_marks, submit_roll_call
+from .rollups import session_rollups
 from .forms import TeacherFeedbackForm, TeacherLeaveForm, StudentResultForm, TeacherAssignmentForm
 from .models import (
     Attendance,
     AttendanceRecord,
+    AttendanceSubmission,
     Feedback,
     TeacherInfo,
     TeacherLeave,
-    TeacherNotification,
     Assignment,
     AssignmentSubmission,
 )
+from .results import (
+    bulk_save_results,
+    format_marks,
+    parse_grade,
+    parse_marks,
+    parse_remark,
+    parse_total_marks,
+    result_changed,
+)
 
 
 def _parse_int(value):
@@ -38,12 +55,26 @@ def _parse_int(value):
         return None
 
 
+TEACHER_LIST = ListSpec(
+    sorts={
+        'name': ['first_name', 'last_name', 'id'],
+        'newest': ['-created_at', '-id'],
+    },
+    filters=[
+        ListFilter('gender', choices=TeacherInfo.GENDER),
+    ],
+    search=['first_name', 'last_name', 'teacher_user_id', 'email', 'phone', 'designation'],
+)
+
+
 # Create your views here.
 def teacher_list(request):
-    teachers = TeacherInfo.objects.all()
+    page = TEACHER_LIST.paginate(request, TeacherInfo.objects.all())
 
     context = {
-        "teachers": teachers,
+        "teachers": page,
+        "page": page,
+        "filters": TEACHER_LIST.filter_values(request),
     }
 
     return render(request, 'Teacher/teacher_list.html', context)
@@ -96,23 +127,7 @@ def add_teacher(request):
             password = ''.join(secrets.choice(alphabet) for i in range(12))
 
             # Auto-generate username (teacher1, teacher2, teacher3, ...)
-            last_teacher_user = User.objects.filter(
-                user_type='Teacher',
-                username__startswith='teacher'
-            ).order_by('-id').first()
-
-            if last_teacher_user and last_teacher_user.username.startswith('teacher'):
-                # Extract the number from the last username
-                try:
-                    last_number = int(last_teacher_user.username.replace('teacher', ''))
-                    username = f'teacher{last_number + 1}'
-                except ValueError:
-                    # If extraction fails, count all teacher users and add 1
-                    count = User.objects.filter(user_type='Teacher').count()
-                    username = f'teacher{count + 1}'
-            else:
-                # First teacher
-                username = 'teacher1'
+            username = allocate_usernames('teacher')[0]
 
             # Create User account first
             user = User.objects.create_user(
@@ -167,16 +182,29 @@ def take_attendance(request):
         return HttpResponseForbidden('Only teachers can take attendance.')
 
     teacher = get_object_or_404(TeacherInfo, user=request.user)
-    classes = Class.objects.all().order_by('class_code')
-    sections = Section.objects.all().order_by('name')
-    sessions = Session.objects.all().order_by('-start_date')
-    subjects = Subject.objects.all().order_by('name')
+    reference = get_reference_data()
+    classes = reference.classes
+    sections = reference.sections
+    sessions = reference.sessions
+    subjects = reference.subjects
+
+    # Compact submissions arrive as a JSON body (see teacher/attendance.py);
+    # the classic form post keeps using request.POST with the same field names.
+    compact = request.method == 'POST' and request.content_type == 'application/json'
+    post_data = request.POST
+    if compact:
+        try:
+            post_data = json.loads(request.body)
+        except ValueError:
+            post_data = None
+        if not isinstance(post_data, dict):
+            return JsonResponse({'error': 'Invalid JSON body.'}, status=400)
 
-    selected_class_id = _parse_int(request.GET.get('klass') or request.POST.get('klass'))
-    selected_section_id = _parse_int(request.GET.get('section') or request.POST.get('section'))
-    selected_session_id = _parse_int(request.GET.get('session') or request.POST.get('session'))
-    selected_subject_id = _parse_int(request.GET.get('subject') or request.POST.get('subject'))
-    selected_date = request.GET.get('date') or request.POST.get('attendance_date') or date.today().isoformat()
+    selected_class_id = _parse_int(request.GET.get('klass') or post_data.get('klass'))
+    selected_section_id = _parse_int(request.GET.get('section') or post_data.get('section'))
+    selected_session_id = _parse_int(request.GET.get('session') or post_data.get('session'))
+    selected_subject_id = _parse_int(request.GET.get('subject') or post_data.get('subject'))
+    selected_date = request.GET.get('date') or post_data.get('attendance_date') or date.today().isoformat()
 
     try:
         selected_date_obj = datetime.strptime(selected_date, "%Y-%m-%d").date()
@@ -189,6 +217,7 @@ def take_attendance(request):
 
     students = []
     existing_attendance = None
+    submission = None
     attendance_note = ''
     filter_submitted = False
     valid_statuses = {choice[0] for choice in AttendanceRecord.STATUS_CHOICES}
@@ -204,47 +233,38 @@ def take_attendance(request):
 
     if request.method == 'POST':
         if not filter_ready:
-            messages.error(request, 'Class, Session, and Subject are required before submitting attendance.')
+            error = 'Class, Session, and Subject are required before submitting attendance.'
+            if compact:
+                return JsonResponse({'error': error}, status=400)
+            messages.error(request, error)
         else:
             students_qs = _student_queryset()
             student_list = list(students_qs)
             if not student_list:
+                if compact:
+                    return JsonResponse({'error': 'No students found for the selected filters.'}, status=400)
                 messages.warning(request, 'No students found for the selected filters.')
             else:
-                note_value = request.POST.get('note', '').strip() or None
-                attendance, _ = Attendance.objects.get_or_create(
-                    teacher=teacher,
-                    klass_id=selected_class_id,
-                    session_id=selected_session_id,
-                    section_id=selected_section_id,
-                    subject_id=selected_subject_id,
-                    date=selected_date_obj,
-                )
-                if attendance.note != note_value:
-                    attendance.note = note_value
-                    attendance.save(update_fields=['note', 'updated_at'])
-
-                records = []
-                for student in student_list:
-                    status = request.POST.get(f'status_{student.id}', AttendanceRecord.STATUS_PRESENT)
-                    if status not in valid_statuses:
-                        status = AttendanceRecord.STATUS_PRESENT
-                    remark = request.POST.get(f'remark_{student.id}', '').strip() or None
-                    records.append(AttendanceRecord(
-                        attendance=attendance,
-                        student=student,
-                        status=status,
-                        remark=remark,
-                    ))
-
-                with transaction.atomic():
-                    AttendanceRecord.objects.filter(attendance=attendance).delete()
-                    AttendanceRecord.objects.bulk_create(records)
-
-                messages.success(
-                    request,
-                    f"Attendance saved for {selected_date_obj.strftime('%d %b %Y')}."
-                )
+                note_value = str(post_data.get('note') or '').strip() or None
+
+                if compact:
+                    try:
+                        marks = decode_compact_marks(post_data, student_list)
+                    except RosterChanged as exc:
+                        return JsonResponse(
+                            {'error': str(exc), 'roster_version': roster_version(student_list)},
+                            status=409,
+                        )
+                    except ValueError as exc:
+                        return JsonResponse({'error': str(exc)}, status=400)
+                else:
+                    marks = {}
+                    for student in student_list:
+                        status = request.POST.get(f'status_{student.id}', AttendanceRecord.STATUS_PRESENT)
+                        if status not in valid_statuses:
+                            status = AttendanceRecord.STATUS_PRESENT
+                        remark = request.POST.get(f'remark_{student.id}', '').strip() or None
+                        marks[student.id] = (status, remark)
 
                 query_params = {
                     'klass': selected_class_id,
@@ -254,7 +274,38 @@ def take_attendance(request):
                 }
                 if selected_section_id:
                     query_params['section'] = selected_section_id
-                return redirect(f"{reverse('take_attendance')}?{urlencode(query_params)}")
+                sheet = (
+                    teacher, selected_class_id, selected_section_id, selected_session_id,
+                    selected_subject_id, selected_date_obj,
+                )
+
+                if queued_mode():
+                    # Acknowledge now; the coalescer merges it within seconds.
+                    submission = submit_roll_call(*sheet, note_value, marks)
+                    messages.info(
+                        request,
+                        f"Attendance for {selected_date_obj.strftime('%d %b %Y')} is queued and will be saved shortly."
+                    )
+                    redirect_url = f"{reverse('take_attendance')}?{urlencode(query_params)}"
+                    if compact:
+                        return JsonResponse({
+                            'queued': True,
+                            'submission': submission.pk,
+                            'status_url': reverse('attendance_submission_status', args=[submission.pk]),
+                            'redirect': redirect_url,
+                        })
+                    return redirect(redirect_url)
+
+                _, changes = save_roll_call(*sheet, note_value, marks)
+                messages.success(
+                    request,
+                    f"Attendance saved for {selected_date_obj.strftime('%d %b %Y')} "
+                    f"({changes.changed} record{'s' if changes.changed != 1 else ''} changed)."
+                )
+                redirect_url = f"{reverse('take_attendance')}?{urlencode(query_params)}"
+                if compact:
+                    return JsonResponse({'saved': True, 'changed': changes.changed, 'redirect': redirect_url})
+                return redirect(redirect_url)
 
         # Preserve selections and entered data when errors occur.
         if filter_ready:
@@ -286,8 +337,19 @@ def take_attendance(request):
                 subject_id=selected_subject_id,
                 date=selected_date_obj,
             ).prefetch_related('records__student').first()
+            if queued_mode():
+                submission = latest_submission(
+                    teacher, selected_class_id, selected_section_id, selected_session_id,
+                    selected_subject_id, selected_date_obj,
+                )
 
-            if existing_attendance:
+            if submission is not None and submission.status == AttendanceSubmission.STATUS_QUEUED:
+                # Show the queued roll call rather than the not-yet-updated sheet.
+                marks = submission_marks(submission)
+                status_map = {student_id: status for student_id, (status, _) in marks.items()}
+                remark_map = {student_id: remark or '' for student_id, (_, remark) in marks.items()}
+                attendance_note = submission.note or ''
+            elif existing_attendance:
                 status_map = {
                     record.student_id: record.status
                     if record.status in valid_statuses else AttendanceRecord.STATUS_PRESENT
@@ -307,10 +369,16 @@ def take_attendance(request):
                 student.current_remark = remark_map.get(student.id, '')
             filter_submitted = True
 
-    selected_class = Class.objects.filter(id=selected_class_id).first() if selected_class_id else None
-    selected_section = Section.objects.filter(id=selected_section_id).first() if selected_section_id else None
-    selected_session = Session.objects.filter(id=selected_session_id).first() if selected_session_id else None
-    selected_subject = Subject.objects.filter(id=selected_subject_id).first() if selected_subject_id else None
+    if students:
+        # Subject attendance so far this session, from the rollups (one query).
+        rollups = session_rollups([student.id for student in students], selected_session_id, selected_subject_id)
+        for student in students:
+            student.attendance_rollup = rollups.get(student.id)
+
+    selected_class = reference.get_class(selected_class_id)
+    selected_section = reference.get_section(selected_section_id)
+    selected_session = reference.get_session(selected_session_id)
+    selected_subject = reference.get_subject(selected_subject_id)
 
     context = {
         'classes': classes,
@@ -330,19 +398,35 @@ def take_attendance(request):
         'selected_session': selected_session,
         'selected_subject': selected_subject,
         'status_choices': AttendanceRecord.STATUS_CHOICES,
+        'roster_version': roster_version(students) if students else '',
+        'submission': submission,
     }
     return render(request, 'Teacher/take_attendance.html', context)
 
 
 @login_required
+def attendance_submission_status(request, pk):
+    """JSON state of one of the teacher's queued roll calls, polled by the take-attendance page."""
+    submission = get_object_or_404(AttendanceSubmission, pk=pk, teacher__user=request.user)
+    return JsonResponse({
+        'status': submission.status,
+        'label': submission.get_status_display(),
+        'changed': submission.changed,
+        'error': submission.error,
+    })
+
+
+@login_required
+@reads_from_replica
 def view_update_attendance(request):
     if request.user.user_type != 'Teacher':
         return HttpResponseForbidden('Only teachers can view attendance history.')
 
     teacher = get_object_or_404(TeacherInfo, user=request.user)
-    classes = Class.objects.all().order_by('class_code')
-    sessions = Session.objects.all().order_by('-start_date')
-    subjects = Subject.objects.all().order_by('name')
+    reference = get_reference_data()
+    classes = reference.classes
+    sessions = reference.sessions
+    subjects = reference.subjects
 
     selected_class_id = _parse_int(request.GET.get('class'))
     selected_session_id = _parse_int(request.GET.get('session'))
@@ -352,7 +436,6 @@ def view_update_attendance(request):
     attendances = (
         Attendance.objects.filter(teacher=teacher)
         .select_related('klass', 'section', 'session')
-        .prefetch_related('records')
         .order_by('-date', '-created_at')
     )
 
@@ -370,18 +453,11 @@ def view_update_attendance(request):
             messages.error(request, 'Invalid date filter. Showing all records.')
             selected_date = None
 
-    attendance_list = list(attendances)
-    for attendance in attendance_list:
-        records = list(attendance.records.all())
-        attendance.summary_total = len(records)
-        attendance.summary_present = sum(1 for record in records if record.status == AttendanceRecord.STATUS_PRESENT)
-        attendance.summary_absent = sum(1 for record in records if record.status == AttendanceRecord.STATUS_ABSENT)
-
     context = {
         'classes': classes,
         'sessions': sessions,
         'subjects': subjects,
-        'attendances': attendance_list,
+        'attendances': attendances,
         'selected_class_id': selected_class_id,
         'selected_session_id': selected_session_id,
         'selected_subject_id': selected_subject_id,
@@ -486,9 +562,7 @@ def teacher_delete(request, id):
 @login_required
 def teacher_notification(request):
     teacher = get_object_or_404(TeacherInfo, user=request.user)
-    notifications = TeacherNotification.objects.filter(
-        teacher_id=teacher
-    ).order_by('-created_at')
+    notifications = with_read_state(request.user, list(teacher_inbox(teacher)))
 
     return render(request, 'Teacher/notifications.html', {
         'notifications': notifications
@@ -557,10 +631,11 @@ def add_result(request):
         return HttpResponseForbidden('Only teachers can add results.')
 
     teacher = get_object_or_404(TeacherInfo, user=request.user)
-    classes = Class.objects.all().order_by('class_code')
-    sections = Section.objects.all().order_by('name')
-    sessions = Session.objects.all().order_by('-start_date')
-    subjects = Subject.objects.all().order_by('name')
+    reference = get_reference_data()
+    classes = reference.classes
+    sections = reference.sections
+    sessions = reference.sessions
+    subjects = reference.subjects
     exam_type_choices = StudentResult.EXAM_TYPES
     recent_results = (
         StudentResult.objects.select_related('student', 'subject', 'session')
@@ -574,10 +649,10 @@ def add_result(request):
     selected_exam_type = request.GET.get('exam_type') or request.POST.get('exam_type') or ''
     total_marks_value = request.POST.get('total_marks') if request.method == 'POST' else ''
 
-    selected_class = Class.objects.filter(id=selected_class_id).first() if selected_class_id else None
-    selected_section = Section.objects.filter(id=selected_section_id).first() if selected_section_id else None
-    selected_session = Session.objects.filter(id=selected_session_id).first() if selected_session_id else None
-    selected_subject = Subject.objects.filter(id=selected_subject_id).first() if selected_subject_id else None
+    selected_class = reference.get_class(selected_class_id)
+    selected_section = reference.get_section(selected_section_id)
+    selected_session = reference.get_session(selected_session_id)
+    selected_subject = reference.get_subject(selected_subject_id)
 
     filter_submitted = bool(selected_class_id or selected_session_id or selected_section_id)
 
@@ -625,64 +700,90 @@ def add_result(request):
             messages.warning(request, 'No students found for the selected filters.')
         else:
             try:
-                total_marks_decimal = Decimal(str(total_marks_value))
-            except (InvalidOperation, TypeError):
-                messages.error(request, 'Enter a valid Total Marks value.')
+                total_marks_decimal = parse_total_marks(total_marks_value)
+            except ValueError as exc:
+                messages.error(request, str(exc))
             else:
-                if total_marks_decimal <= 0:
-                    messages.error(request, 'Total Marks must be greater than zero.')
-                else:
-                    for student in students:
-                        raw_marks = request.POST.get(f'marks_{student.id}', '').strip()
-                        grade_value = request.POST.get(f'grade_{student.id}', '').strip() or None
-                        remark_value = request.POST.get(f'remark_{student.id}', '').strip() or None
-
-                        if raw_marks == '':
-                            continue
-
-                        try:
-                            obtained_decimal = Decimal(raw_marks)
-                        except (InvalidOperation, TypeError):
-                            student_errors[student.id] = 'Enter a valid number.'
-                            continue
-
-                        if obtained_decimal < 0 or obtained_decimal > total_marks_decimal:
-                            student_errors[student.id] = 'Must be between 0 and total marks.'
-                            continue
-
-                        result, created = StudentResult.objects.update_or_create(
+                new_results = []
+                changed_results = []
+                unchanged_count = 0
+                for student in students:
+                    raw_marks = request.POST.get(f'marks_{student.id}', '').strip()
+                    if raw_marks == '':
+                        continue
+
+                    # The same rules as the autosave endpoint (teacher.results).
+                    try:
+                        obtained_decimal = parse_marks(raw_marks, total_marks_decimal)
+                        grade_value = parse_grade(request.POST.get(f'grade_{student.id}'))
+                        remark_value = parse_remark(request.POST.get(f'remark_{student.id}'))
+                    except ValueError as exc:
+                        student_errors[student.id] = str(exc)
+                        continue
+
+                    values = {
+                        'klass_id': selected_class.id if selected_class else None,
+                        'section_id': selected_section.id if selected_section else None,
+                        'total_marks': total_marks_decimal,
+                        'obtained_marks': obtained_decimal,
+                        'grade': grade_value,
+                        'remarks': remark_value,
+                    }
+                    existing = existing_results_map.get(student.id)
+                    if existing is None:
+                        new_results.append(StudentResult(
                             student=student,
                             subject=selected_subject,
                             session=selected_session,
                             exam_type=selected_exam_type,
-                            defaults={
-                                'klass': selected_class,
-                                'section': selected_section,
-                                'total_marks': total_marks_decimal,
-                                'obtained_marks': obtained_decimal,
-                                'grade': grade_value,
-                                'remarks': remark_value,
-                            },
-                        )
-                        saved_count += 1
-                        existing_results_map[student.id] = result
+                            **values,
+                        ))
+                    elif result_changed(existing, values):
+                        for field, value in values.items():
+                            setattr(existing, field, value)
+                        changed_results.append(existing)
+                    else:
+                        unchanged_count += 1
 
-                    if saved_count:
-                        messages.success(
-                            request,
-                            f"Results saved for {saved_count} student{'s' if saved_count != 1 else ''}.",
-                        )
-                        query_params = {
-                            'klass': selected_class_id,
-                            'session': selected_session_id,
-                        }
-                        if selected_section_id:
-                            query_params['section'] = selected_section_id
-                        if selected_subject_id:
-                            query_params['subject'] = selected_subject_id
-                        if selected_exam_type:
-                            query_params['exam_type'] = selected_exam_type
-                        return redirect(f"{reverse('add_result')}?{urlencode(query_params)}")
+                try:
+                    saved_count = bulk_save_results(new_results, changed_results)
+                except IntegrityError:
+                    messages.error(
+                        request,
+                        'Results for this exam were changed by someone else while saving. Please try again.',
+                    )
+                    saved_count = 0
+                    unchanged_count = 0
+                else:
+                    # The rows below render from the map; include what was just inserted.
+                    existing_results_map.update((result.student_id, result) for result in new_results)
+
+                if not saved_count and unchanged_count and not student_errors:
+                    messages.info(request, 'No changes detected to save.')
+
+                if saved_count:
+                    messages.success(
+                        request,
+                        f"Results saved for {saved_count} student{'s' if saved_count != 1 else ''}.",
+                    )
+                if saved_count and not student_errors:
+                    query_params = {
+                        'klass': selected_class_id,
+                        'session': selected_session_id,
+                    }
+                    if selected_section_id:
+                        query_params['section'] = selected_section_id
+                    if selected_subject_id:
+                        query_params['subject'] = selected_subject_id
+                    if selected_exam_type:
+                        query_params['exam_type'] = selected_exam_type
+                    return redirect(f"{reverse('add_result')}?{urlencode(query_params)}")
+                if student_errors:
+                    messages.error(
+                        request,
+                        f"{len(student_errors)} row{'s' if len(student_errors) != 1 else ''} "
+                        "not saved; fix the highlighted marks and submit again.",
+                    )
 
     for student in students:
         existing = existing_results_map.get(student.id)
@@ -732,16 +833,18 @@ def add_result(request):
 
 @login_required
 @require_http_methods(["GET", "POST"])
+@reads_from_replica
 def manage_results(request):
     if request.user.user_type != 'Teacher':
         return HttpResponseForbidden('Only teachers can manage results.')
 
     TeacherInfo.objects.filter(user=request.user).exists()  # ensure teacher exists for context if needed
 
-    classes = Class.objects.all().order_by('class_code')
-    sections = Section.objects.all().order_by('name')
-    sessions = Session.objects.all().order_by('-start_date')
-    subjects = Subject.objects.all().order_by('name')
+    reference = get_reference_data()
+    classes = reference.classes
+    sections = reference.sections
+    sessions = reference.sessions
+    subjects = reference.subjects
     exam_type_choices = StudentResult.EXAM_TYPES
 
     selected_class_id = _parse_int(request.GET.get('klass') or request.POST.get('klass'))
@@ -768,17 +871,16 @@ def manage_results(request):
     result_list = list(results)
     saved_count = 0
     if request.method == 'POST' and result_list:
+        changed_results = []
         for result in result_list:
             marks_value = request.POST.get(f'marks_{result.id}', '').strip()
-            grade_value = request.POST.get(f'grade_{result.id}', '').strip() or None
-            remark_value = request.POST.get(f'remark_{result.id}', '').strip() or None
             if not marks_value:
                 continue
             try:
-                obtained_decimal = Decimal(marks_value)
-            except (InvalidOperation, TypeError):
-                continue
-            if obtained_decimal < 0 or obtained_decimal > result.total_marks:
+                obtained_decimal = parse_marks(marks_value, result.total_marks)
+                grade_value = parse_grade(request.POST.get(f'grade_{result.id}'))
+                remark_value = parse_remark(request.POST.get(f'remark_{result.id}'))
+            except ValueError:
                 continue
             if (
                 obtained_decimal != result.obtained_marks
@@ -788,8 +890,11 @@ def manage_results(request):
                 result.obtained_marks = obtained_decimal
                 result.grade = grade_value
                 result.remarks = remark_value
-                result.save(update_fields=['obtained_marks', 'grade', 'remarks', 'updated_at'])
-                saved_count += 1
+                changed_results.append(result)
+
+        saved_count = bulk_save_results(
+            [], changed_results, fields=['obtained_marks', 'grade', 'remarks', 'updated_at']
+        )
 
         if saved_count:
             messages.success(
@@ -829,6 +934,165 @@ def manage_results(request):
     return render(request, 'Teacher/manage_results.html', context)
 
 
+MAX_AUTOSAVE_CELLS = 50
+
+
+def _autosave_cell_response(index, result):
+    return {
+        'index': index,
+        'ok': True,
+        'result': result.id,
+        'student': result.student_id,
+        'marks': format_marks(result.obtained_marks),
+        'grade': result.grade or '',
+        'remark': result.remarks or '',
+        'updated_at': result.updated_at.isoformat() if result.updated_at else None,
+    }
+
+
+@login_required
+@require_http_methods(["POST"])
+def autosave_results(request):
+    """
+    JSON endpoint for the results grid: saves one or a few cells at a time.
+
+    Body: {"klass", "section", "session", "subject", "exam_type", "total_marks",
+    "cells": [{"student": 12, "marks": "45", "grade": "A", "remark": "..."}]}.
+    A cell may name an existing row with "result" instead of "student"; only the
+    keys present in a cell are changed. Returns the normalized values and the
+    row's updated_at per cell.
+    """
+    if request.user.user_type != 'Teacher':
+        return JsonResponse({'error': 'Only teachers can edit results.'}, status=403)
+
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict) or not isinstance(payload.get('cells'), list):
+        return JsonResponse({'error': 'Expected a JSON object with a "cells" list.'}, status=400)
+
+    cells = payload['cells']
+    if not cells or len(cells) > MAX_AUTOSAVE_CELLS:
+        return JsonResponse({'error': f'Send between 1 and {MAX_AUTOSAVE_CELLS} cells per request.'}, status=400)
+    if not all(isinstance(cell, dict) for cell in cells):
+        return JsonResponse({'error': 'Each cell must be an object.'}, status=400)
+
+    class_id = _parse_int(payload.get('klass'))
+    section_id = _parse_int(payload.get('section'))
+    session_id = _parse_int(payload.get('session'))
+    subject_id = _parse_int(payload.get('subject'))
+    exam_type = payload.get('exam_type') or ''
+
+    result_ids = [_parse_int(cell.get('result')) for cell in cells if 'result' in cell]
+    student_ids = [_parse_int(cell.get('student')) for cell in cells if 'result' not in cell]
+
+    existing_by_id = StudentResult.objects.in_bulk([rid for rid in result_ids if rid])
+    students = {}
+    existing_by_student = {}
+    total_marks = None
+
+    if student_ids:
+        if not (session_id and subject_id):
+            return JsonResponse({'error': 'Session and Subject are required.'}, status=400)
+        if exam_type not in {choice[0] for choice in StudentResult.EXAM_TYPES}:
+            return JsonResponse({'error': 'Please choose a valid exam type.'}, status=400)
+        if payload.get('total_marks') not in (None, ''):
+            try:
+                total_marks = parse_total_marks(payload['total_marks'])
+            except ValueError as exc:
+                return JsonResponse({'error': str(exc)}, status=400)
+
+        students_qs = StudentInfo.objects.filter(
+            id__in=[sid for sid in student_ids if sid],
+            session_id=session_id,
+        )
+        if class_id:
+            students_qs = students_qs.filter(klass_id=class_id)
+        students = students_qs.in_bulk()
+        existing_by_student = {
+            result.student_id: result
+            for result in StudentResult.objects.filter(
+                student_id__in=list(students),
+                subject_id=subject_id,
+                session_id=session_id,
+                exam_type=exam_type,
+            )
+        }
+
+    responses = []
+    touched = {}   # id(result) -> (result, is_new)
+    cell_results = []
+
+    for index, cell in enumerate(cells):
+        try:
+            if 'result' in cell:
+                result = existing_by_id.get(_parse_int(cell.get('result')))
+                if result is None:
+                    raise ValueError('Result not found.')
+                cell_total = result.total_marks
+            else:
+                student = students.get(_parse_int(cell.get('student')))
+                if student is None:
+                    raise ValueError('Student not found for the selected class and session.')
+                result = existing_by_student.get(student.id)
+                cell_total = total_marks or (result.total_marks if result else None)
+                if result is None:
+                    if cell_total is None:
+                        raise ValueError('Enter Total Marks before entering marks.')
+                    if str(cell.get('marks') or '').strip() == '':
+                        raise ValueError('Enter marks to create a result.')
+                    result = StudentResult(
+                        student=student,
+                        subject_id=subject_id,
+                        session_id=session_id,
+                        exam_type=exam_type,
+                        klass_id=class_id or student.klass_id,
+                        section_id=section_id or student.section_id,
+                    )
+
+            values = {}
+            if 'marks' in cell:
+                if str(cell['marks'] or '').strip() == '':
+                    raise ValueError('Marks cannot be empty.')
+                values['obtained_marks'] = parse_marks(cell['marks'], cell_total)
+            elif result.obtained_marks is not None and cell_total is not None and result.obtained_marks > cell_total:
+                raise ValueError('Must be between 0 and total marks.')
+            if 'grade' in cell:
+                values['grade'] = parse_grade(cell['grade'])
+            if 'remark' in cell:
+                values['remarks'] = parse_remark(cell['remark'])
+            if cell_total is not None:
+                values['total_marks'] = cell_total
+        except ValueError as exc:
+            responses.append({'index': index, 'ok': False, 'error': str(exc)})
+            continue
+
+        is_new = result.pk is None
+        if is_new:
+            # Only a valid cell creates the row later cells for this student edit.
+            existing_by_student[result.student_id] = result
+        if is_new or result_changed(result, values):
+            for field, value in values.items():
+                setattr(result, field, value)
+            touched[id(result)] = (result, is_new)
+        cell_results.append((index, result))
+
+    new_results = [result for result, is_new in touched.values() if is_new]
+    changed_results = [result for result, is_new in touched.values() if not is_new]
+    try:
+        bulk_save_results(new_results, changed_results)
+    except IntegrityError:
+        return JsonResponse(
+            {'error': 'These results were changed by someone else. Please reload the page.'},
+            status=409,
+        )
+
+    responses.extend(_autosave_cell_response(index, result) for index, result in cell_results)
+    responses.sort(key=lambda item: item['index'])
+    return JsonResponse({'cells': responses, 'saved': len(touched)})
+
+
 @login_required
 @require_http_methods(["GET", "POST"])
 def assignment_create(request):
@@ -873,12 +1137,13 @@ def teacher_assignment_list(request):
         assignments = assignments.filter(subject_id=selected_subject_id)
 
     assignments = assignments.order_by('-created_at')
+    reference = get_reference_data()
 
     context = {
         'assignments': assignments,
-        'classes': Class.objects.all().order_by('class_code'),
-        'sessions': Session.objects.all().order_by('-start_date'),
-        'subjects': Subject.objects.all().order_by('name'),
+        'classes': reference.classes,
+        'sessions': reference.sessions,
+        'subjects': reference.subjects,
         'selected_class_id': selected_class_id,
         'selected_session_id': selected_session_id,
         'selected_subject_id': selected_subject_id,